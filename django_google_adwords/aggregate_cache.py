@@ -0,0 +1,70 @@
+"""
+A cache of the period aggregates of the daily metrics, see PeriodAggregateQuerySet.
+
+Entries are keyed by the account, level and a generation counter per account and level,
+Account.finish_*_sync bumps the generation when new data has been imported so stale
+entries are never read again (and expire) without scanning for keys.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_aggregate_cache():
+    """
+    Returns the cache as configured by GOOGLEADWORDS_AGGREGATE_CACHE, or None if the cache
+    is disabled.
+    """
+    if not settings.GOOGLEADWORDS_AGGREGATE_CACHE:
+        return None
+    return caches[settings.GOOGLEADWORDS_AGGREGATE_CACHE_ALIAS]
+
+
+def generation_key(account_pk, level):
+    return 'googleadwords-aggregate-generation-%s-%s' % (account_pk, level)
+
+
+def initial_generation():
+    # Not 1, a generation evicted from the cache must not come back as one already used.
+    return int(time.time() * 1000)
+
+
+def get_generation(cache, account_pk, level):
+    key = generation_key(account_pk, level)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, initial_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate(account_pk, level):
+    """
+    Invalidate the cached aggregates of account_pk at level, ie.. after a sync.
+    """
+    cache = get_aggregate_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(generation_key(account_pk, level))
+    except ValueError:
+        cache.set(generation_key(account_pk, level), initial_generation(), None)
+
+
+def get_or_compute(account_pk, level, key, compute):
+    """
+    Returns the cached value for key (a string describing the aggregate) of account_pk at
+    level, calling compute and caching its result on a miss.
+    """
+    cache = get_aggregate_cache()
+    if cache is None:
+        return compute()
+    cache_key = 'googleadwords-aggregate-%s-%s-%s-%s' % (account_pk, level, get_generation(cache, account_pk, level),
+                                                       hashlib.md5(key.encode('utf-8')).hexdigest())
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, settings.GOOGLEADWORDS_AGGREGATE_CACHE_TIMEOUT)
+    return value
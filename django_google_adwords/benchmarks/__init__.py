@@ -0,0 +1,3 @@
+"""
+Import benchmarks, run with the gadapi_benchmark management command or runbenchmarks.py.
+"""
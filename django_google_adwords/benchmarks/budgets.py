@@ -0,0 +1,133 @@
+"""
+Query and cache operation budgets for the Account.sync_* tasks.
+
+The budgets are the most queries (and cache operations, ie.. the lock traffic of the
+CacheLockBackend) each row of a report may cost to import, plus a fixed allowance per
+import. Lower them as the populate path gets cheaper so that improvements stay in place.
+"""
+from functools import wraps
+import re
+import time
+
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django_google_adwords.models import Account
+
+
+# A get and a save for each model populated per row
+QUERY_BUDGETS = {
+    Account.LEVEL_ACCOUNT: 4,
+    Account.LEVEL_CAMPAIGN: 6,
+    Account.LEVEL_AD_GROUP: 8,
+    Account.LEVEL_AD: 10,
+}
+# Plus a get and a save of the MetricsCoverage of the sync
+FIXED_QUERIES = 2
+
+# An add and a delete (lock and release) for each model populated per row
+CACHE_OPERATION_BUDGETS = {
+    Account.LEVEL_ACCOUNT: 4,
+    Account.LEVEL_CAMPAIGN: 6,
+    Account.LEVEL_AD_GROUP: 8,
+    Account.LEVEL_AD: 10,
+}
+# Plus the lock of the MetricsCoverage of the sync
+FIXED_CACHE_OPERATIONS = 2
+
+# Transaction control statements, which aren't counted against the budgets. Django logs a
+# BEGIN for each atomic block (ie.. each save) on some versions and databases.
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+# Django 1.9 and earlier log the statements run on SQLite as QUERY = u'...' - PARAMS = (...)
+WRAPPED_SQL = re.compile(r"^QUERY = u?(['\"])(.*)\1 - PARAMS = .*$", re.DOTALL)
+
+
+def unwrap_sql(sql):
+    """
+    Returns the statement of sql as logged by CaptureQueriesContext, without the
+    QUERY = u'...' - PARAMS = (...) wrapper some Django versions add.
+    """
+    match = WRAPPED_SQL.match(sql)
+    return match.group(2) if match else sql
+
+
+def is_transaction_statement(sql):
+    sql = unwrap_sql(sql).strip().upper()
+    return any(sql == statement or sql.startswith('%s ' % statement) for statement in TRANSACTION_STATEMENTS)
+
+
+class CaptureCacheOperations(object):
+    """
+    Context manager that records the operations made on the default cache by this thread.
+    """
+    OPERATIONS = ('add', 'get', 'set', 'delete', 'get_many', 'set_many', 'delete_many', 'incr', 'decr', 'has_key')
+
+    def __init__(self):
+        self.operations = []
+        self._depth = 0
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __enter__(self):
+        self.cache = caches[DEFAULT_CACHE_ALIAS]
+        for name in self.OPERATIONS:
+            setattr(self.cache, name, self._record(name, getattr(self.cache, name)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for name in self.OPERATIONS:
+            delattr(self.cache, name)
+
+    def _record(self, name, method):
+        @wraps(method)
+        def inner(*args, **kwargs):
+            # Only record the outermost operation, ie.. not the get calls made by get_many.
+            if self._depth == 0:
+                self.operations.append(name)
+            self._depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+        return inner
+
+
+def measure_import(account, level, report_file):
+    """
+    Import report_file with the sync task for level, returning a dict of the rows imported,
+    seconds taken, queries (other than transaction control statements) and cache operations
+    made.
+    """
+    sync = getattr(account, 'sync_%s' % level)
+    with CaptureQueriesContext(connection) as queries, CaptureCacheOperations() as cache_operations:
+        started = time.time()
+        result = sync(report_file=report_file)
+        seconds = time.time() - started
+    return {
+        'rows': result['rows'],
+        'seconds': seconds,
+        'queries': len([query for query in queries.captured_queries if not is_transaction_statement(query['sql'])]),
+        'cache_operations': len(cache_operations),
+    }
+
+
+def check_budgets(level, rows, queries, cache_operations,
+                  query_budgets=QUERY_BUDGETS, cache_operation_budgets=CACHE_OPERATION_BUDGETS):
+    """
+    Returns a list of messages describing the budgets for level exceeded by an import of
+    rows that made queries and cache_operations, empty if within budget.
+    """
+    exceeded = []
+    query_budget = query_budgets[level] * rows + FIXED_QUERIES
+    if queries > query_budget:
+        exceeded.append("sync_%s made %s queries importing %s rows, the budget is %s (%s per row)."
+                        % (level, queries, rows, query_budget, query_budgets[level]))
+    cache_budget = cache_operation_budgets[level] * rows + FIXED_CACHE_OPERATIONS
+    if cache_operations > cache_budget:
+        exceeded.append("sync_%s made %s cache operations importing %s rows, the budget is %s (%s per row)."
+                        % (level, cache_operations, rows, cache_budget, cache_operation_budgets[level]))
+    return exceeded
@@ -0,0 +1,252 @@
+"""
+A local stand in for the AdWords API for load testing downloads and paging.
+
+FakeAdWordsServer is a threaded HTTP server on localhost that serves generated gzipped
+reports and paged service responses, with configurable latency, bandwidth and injected
+RateExceededError responses. FakeAdWordsClient talks to it over HTTP and raises errors
+shaped like those of googleads, set GOOGLEADWORDS_CLIENT_FACTORY to
+'django_google_adwords.benchmarks.fake_api.fake_client_factory' and
+GOOGLEADWORDS_FAKE_API_URL to FakeAdWordsServer.url to use it in place of AdWordsClient.
+
+The googleads client itself can't be pointed at the server, it requires the SOAP WSDLs
+and report definition schema served by Google.
+"""
+import io
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.utils.six.moves import BaseHTTPServer, socketserver
+from django.utils.six.moves.urllib.error import HTTPError
+from django.utils.six.moves.urllib.request import Request, urlopen
+from googleads.errors import GoogleAdsError
+
+from django_google_adwords.benchmarks.generator import ReportGenerator
+from django_google_adwords.models import Account
+
+
+REPORT_TYPE_LEVELS = {
+    'ACCOUNT_PERFORMANCE_REPORT': Account.LEVEL_ACCOUNT,
+    'CAMPAIGN_PERFORMANCE_REPORT': Account.LEVEL_CAMPAIGN,
+    'ADGROUP_PERFORMANCE_REPORT': Account.LEVEL_AD_GROUP,
+    'AD_PERFORMANCE_REPORT': Account.LEVEL_AD,
+}
+
+REPORT_DOWNLOAD_PATH = '/api/adwords/reportdownload'
+SERVICE_PATH = '/api/adwords/cm/'
+CHUNK_SIZE = 16 * 1024
+
+
+class Namespace(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeGoogleAdsError(GoogleAdsError):
+    """
+    A GoogleAdsError with a fault shaped like the SOAP fault of a RateExceededError.
+    """
+
+    def __init__(self, message, retry_after_seconds):
+        super(FakeGoogleAdsError, self).__init__(message)
+        error = Namespace(retryAfterSeconds=str(retry_after_seconds))
+        setattr(error, 'ApiError.Type', 'RateExceededError')
+        self.fault = Namespace(detail=Namespace(ApiExceptionFault=Namespace(errors=[error])))
+
+
+class FakeAdWordsRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server.api
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.rate_exceeded():
+            return self.send_json(400, {'error': 'RateExceededError',
+                                        'retryAfterSeconds': server.retry_after_seconds})
+
+        if self.path.startswith(REPORT_DOWNLOAD_PATH):
+            level = REPORT_TYPE_LEVELS.get(body['report_definition'].get('reportType'))
+            if level is None:
+                return self.send_json(400, {'error': 'ReportDefinitionError'})
+            return self.send_bytes(200, 'application/x-gzip', server.report(level))
+
+        if self.path.startswith(SERVICE_PATH):
+            paging = body.get('paging', {})
+            start = int(paging.get('startIndex', 0))
+            number = int(paging.get('numberResults', 100))
+            return self.send_json(200, {'totalNumEntries': server.entries,
+                                        'entries': [{'id': i, 'name': 'Entry #%s' % i}
+                                                    for i in range(start, min(start + number, server.entries))]})
+
+        self.send_json(404, {'error': 'NotFound'})
+
+    def send_json(self, status, data):
+        self.send_bytes(status, 'application/json', json.dumps(data).encode('utf-8'))
+
+    def send_bytes(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        bandwidth = self.server.api.bandwidth
+        for offset in range(0, len(data), CHUNK_SIZE):
+            chunk = data[offset:offset + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(float(len(chunk)) / bandwidth)
+
+
+class ThreadedHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeAdWordsServer(object):
+    """
+    Serves reports and paged service responses on localhost from a background thread.
+
+    :param generator: ReportGenerator to generate reports with (from the first account).
+    :param entries: Total entries returned by paged services.
+    :param latency: Seconds to wait before responding to each request.
+    :param bandwidth: Bytes per second to send responses at, unlimited if None.
+    :param rate_exceeded_every: Respond to every nth request with a RateExceededError.
+    :param retry_after_seconds: The retryAfterSeconds of injected RateExceededErrors.
+
+    Use as a context manager or call start() and stop().
+    """
+
+    def __init__(self, generator=None, entries=1000, latency=0, bandwidth=None,
+                 rate_exceeded_every=None, retry_after_seconds=1):
+        self.generator = generator or ReportGenerator()
+        self.entries = entries
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_exceeded_every = rate_exceeded_every
+        self.retry_after_seconds = retry_after_seconds
+        self.request_count = 0
+        self.rate_exceeded_count = 0
+        self._lock = threading.Lock()
+        self._reports = {}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self._httpd.server_address[:2]
+
+    def start(self):
+        self._httpd = ThreadedHTTPServer(('127.0.0.1', 0), FakeAdWordsRequestHandler)
+        self._httpd.api = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def rate_exceeded(self):
+        """
+        Count a request, returning True if it should be answered with a RateExceededError.
+        """
+        with self._lock:
+            self.request_count += 1
+            if self.rate_exceeded_every and self.request_count % self.rate_exceeded_every == 0:
+                self.rate_exceeded_count += 1
+                return True
+            return False
+
+    def report(self, level):
+        with self._lock:
+            if level not in self._reports:
+                f = io.BytesIO()
+                self.generator.write(f, level)
+                self._reports[level] = f.getvalue()
+            return self._reports[level]
+
+
+class FakeAdWordsClient(object):
+    """
+    A stand in for googleads.adwords.AdWordsClient that uses a FakeAdWordsServer.
+    """
+
+    def __init__(self, url, client_customer_id=None):
+        self.url = url
+        self.client_customer_id = client_customer_id
+
+    def GetReportDownloader(self, version=None, server=None):
+        return FakeReportDownloader(self, version)
+
+    def GetService(self, service_name, version=None, server=None):
+        return FakeService(self, service_name, version)
+
+    def post(self, path, data):
+        request = Request(self.url + path, data=json.dumps(data, default=str).encode('utf-8'),
+                          headers={'Content-Type': 'application/json'})
+        try:
+            return urlopen(request)
+        except HTTPError as e:
+            error = json.loads(e.read().decode('utf-8'))
+            if error.get('error') == 'RateExceededError':
+                raise FakeGoogleAdsError('RateExceededError', error['retryAfterSeconds'])
+            raise GoogleAdsError(error.get('error'))
+
+
+class FakeReportDownloader(object):
+
+    def __init__(self, client, version):
+        self.client = client
+        self.version = version or settings.GOOGLEADWORDS_CLIENT_VERSION
+
+    def DownloadReport(self, report_definition, output, include_zero_impressions=True, **kwargs):
+        response = self.client.post('%s/%s' % (REPORT_DOWNLOAD_PATH, self.version),
+                                    {'report_definition': report_definition,
+                                     'client_customer_id': self.client.client_customer_id,
+                                     'include_zero_impressions': include_zero_impressions})
+        try:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                output.write(chunk)
+        finally:
+            response.close()
+
+
+class FakeService(object):
+
+    def __init__(self, client, service_name, version):
+        self.client = client
+        self.service_name = service_name
+        self.version = version or settings.GOOGLEADWORDS_CLIENT_VERSION
+
+    def get(self, selector):
+        response = self.client.post('%s%s/%s' % (SERVICE_PATH, self.version, self.service_name), selector)
+        try:
+            data = json.loads(response.read().decode('utf-8'))
+        finally:
+            response.close()
+        return Namespace(totalNumEntries=data['totalNumEntries'],
+                         entries=[Namespace(**entry) for entry in data['entries']])
+
+
+def fake_client_factory(client_customer_id=None):
+    """
+    A GOOGLEADWORDS_CLIENT_FACTORY returning a FakeAdWordsClient for GOOGLEADWORDS_FAKE_API_URL.
+    """
+    return FakeAdWordsClient(settings.GOOGLEADWORDS_FAKE_API_URL, client_customer_id)
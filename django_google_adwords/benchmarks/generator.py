@@ -0,0 +1,227 @@
+from datetime import date, timedelta
+import csv
+import gzip
+import io
+import random
+
+from django.db import models
+from django.db.models.fields import FieldDoesNotExist
+from django.utils import six
+from djmoney.models.fields import MoneyField
+
+from django_google_adwords.models import attribute_to_field_name, Account, \
+    DailyAccountMetrics, Campaign, DailyCampaignMetrics, AdGroup, \
+    DailyAdGroupMetrics, Ad, DailyAdMetrics, ReportFile
+
+
+ACCOUNT_REPORT_HEADERS = (
+    'Currency', 'Account', 'Avg. CPC', 'Avg. CPM', 'Avg. position', 'Clicks', 'Content Lost IS (budget)',
+    'Content Impr. share', 'Content Lost IS (rank)', 'Click conversion rate', 'Conv. rate', 'Total conv. value',
+    'Converted clicks', 'Conversions', 'Cost', 'Cost / converted click', 'Cost / conv.', 'Cost / est. total conv.',
+    'CTR', 'Device', 'Est. cross-device conv.', 'Est. total conv. rate', 'Est. total conv. value',
+    'Est. total conv. value / click', 'Est. total conv. value / cost', 'Est. total conv.', 'Impressions',
+    'Invalid click rate', 'Invalid clicks', 'Search Lost IS (budget)', 'Search Exact match IS', 'Search Impr. share',
+    'Search Lost IS (rank)', 'Day',
+)
+
+CAMPAIGN_REPORT_HEADERS = (
+    'Currency', 'Account', 'Budget', 'Avg. CPC', 'Avg. CPM', 'Avg. position', 'Bid Strategy ID', 'Bid Strategy Name',
+    'Bid Strategy Type', 'Campaign ID', 'Campaign', 'Campaign state', 'Clicks', 'Content Lost IS (budget)',
+    'Content Impr. share', 'Content Lost IS (rank)', 'Click conversion rate', 'Conv. rate', 'Total conv. value',
+    'Converted clicks', 'Conversions', 'Cost', 'Cost / converted click', 'Cost / conv.', 'Cost / est. total conv.',
+    'CTR', 'Est. cross-device conv.', 'Est. total conv. rate', 'Est. total conv.', 'Est. total conv. value',
+    'Est. total conv. value / click', 'Est. total conv. value / cost', 'Impressions', 'Invalid click rate',
+    'Invalid clicks', 'Search Lost IS (budget)', 'Search Exact match IS', 'Search Impr. share',
+    'Search Lost IS (rank)', 'Day',
+)
+
+AD_GROUP_REPORT_HEADERS = (
+    'Currency', 'Account', 'Ad group ID', 'Ad group', 'Ad group state', 'Campaign ID', 'Campaign', 'Campaign state',
+    'Max. CPA (converted clicks)', 'Value / est. total conv.', 'Bid Strategy ID', 'Bid Strategy Name',
+    'Bid Strategy Type', 'Content Impr. share', 'Content Lost IS (rank)', 'Cost / est. total conv.',
+    'Est. cross-device conv.', 'Est. total conv. rate', 'Est. total conv. value', 'Est. total conv. value / click',
+    'Est. total conv. value / cost', 'Est. total conv.', 'Search Exact match IS', 'Search Impr. share',
+    'Search Lost IS (rank)', 'Value / converted click', 'Value / conv.', 'View-through conv.', 'Avg. CPC',
+    'Avg. CPM', 'Avg. position', 'Clicks', 'Click conversion rate', 'Conv. rate', 'Total conv. value',
+    'Converted clicks', 'Conversions', 'Cost', 'Cost / converted click', 'Cost / conv.', 'CTR', 'Impressions', 'Day',
+)
+
+AD_REPORT_HEADERS = (
+    'Currency', 'Account', 'Ad group ID', 'Ad group', 'Ad group state', 'Ad type', 'Avg. CPC', 'Avg. CPM',
+    'Avg. position', 'Campaign ID', 'Campaign', 'Campaign state', 'Clicks', 'Click conversion rate', 'Conv. rate',
+    'Total conv. value', 'Converted clicks', 'Conversions', 'Cost', 'Cost / converted click', 'Cost / conv.',
+    'Ad Approval Status', 'Destination URL', 'CTR', 'Description line 1', 'Description line 2', 'Display URL', 'Ad',
+    'Ad ID', 'Impressions', 'Ad state', 'Value / converted click', 'Value / conv.', 'View-through conv.', 'Day',
+)
+
+# Report name, headers and the models (most specific first) whose fields determine the
+# values generated for each level.
+REPORTS = {
+    Account.LEVEL_ACCOUNT: ('Account Performance Report', ACCOUNT_REPORT_HEADERS,
+                            (DailyAccountMetrics, Account)),
+    Account.LEVEL_CAMPAIGN: ('Campaign Performance Report', CAMPAIGN_REPORT_HEADERS,
+                             (DailyCampaignMetrics, Campaign, Account)),
+    Account.LEVEL_AD_GROUP: ('Ad Group Performance Report', AD_GROUP_REPORT_HEADERS,
+                             (DailyAdGroupMetrics, AdGroup, Campaign, Account)),
+    Account.LEVEL_AD: ('Ad Performance Report', AD_REPORT_HEADERS,
+                       (DailyAdMetrics, Ad, AdGroup, Campaign, Account)),
+}
+
+DEVICES = [device for device, _ in DailyAccountMetrics.DEVICE_CHOICES]
+
+
+class ReportGenerator(object):
+    """
+    Generates realistic gzipped CSV reports, as downloaded from the AdWords API, for
+    benchmarking imports.
+
+    The same arguments always generate the same reports. Each account has campaigns, each
+    campaign ad_groups and each ad group ads. Account reports have a row per device per day,
+    the other reports a row per campaign, ad group or ad per day.
+
+    Values are generated according to the type of the model field each column is imported
+    into, money in micros and percentages as the API formats them.
+    """
+
+    def __init__(self, accounts=1, campaigns=5, ad_groups=5, ads=4, days=30, devices=3,
+                 start=date(2017, 1, 1), currency='AUD', seed=0):
+        self.accounts = accounts
+        self.campaigns = campaigns
+        self.ad_groups = ad_groups
+        self.ads = ads
+        self.days = days
+        self.devices = DEVICES[:devices]
+        self.start = start
+        self.currency = currency
+        self.seed = seed
+        self._fields = {}
+
+    def account_id(self, account_index):
+        return 1000000000 + account_index
+
+    def get_or_create_accounts(self):
+        """
+        Returns the Account for each generated account, creating them if required.
+        """
+        return [Account.objects.get_or_create(account_id=self.account_id(i))[0] for i in range(self.accounts)]
+
+    def row_count(self, level):
+        """
+        Returns the number of data rows in each report (per account) for level.
+        """
+        per_day = {
+            Account.LEVEL_ACCOUNT: len(self.devices),
+            Account.LEVEL_CAMPAIGN: self.campaigns,
+            Account.LEVEL_AD_GROUP: self.campaigns * self.ad_groups,
+            Account.LEVEL_AD: self.campaigns * self.ad_groups * self.ads,
+        }[level]
+        return per_day * self.days
+
+    def field(self, level, header):
+        """
+        Returns the model field that header is imported into at level or None.
+        """
+        key = (level, header)
+        if key not in self._fields:
+            self._fields[key] = None
+            field_name = attribute_to_field_name(header)
+            for model in REPORTS[level][2]:
+                try:
+                    self._fields[key] = model._meta.get_field(field_name)
+                    break
+                except FieldDoesNotExist:
+                    continue
+        return self._fields[key]
+
+    def value(self, rng, level, header):
+        field = self.field(level, header)
+        if field is None:
+            return ' --'
+        if isinstance(field, MoneyField):
+            return str(rng.randint(0, 5000000))
+        if isinstance(field, models.DecimalField):
+            return '%.2f%%' % rng.uniform(0, 100)
+        if isinstance(field, (models.IntegerField, models.BigIntegerField)):
+            return str(rng.randint(0, 1000))
+        if field.choices:
+            return rng.choice(field.choices)[0]
+        if isinstance(field, models.URLField):
+            return 'http://example.com/%s' % rng.randint(0, 1000)
+        return 'Generated %s' % rng.randint(0, 1000)
+
+    def entities(self, level, account_index):
+        """
+        Yields a dict of the identifying columns of each row for a day at level.
+        """
+        if level == Account.LEVEL_ACCOUNT:
+            for device in self.devices:
+                yield {'Device': device}
+            return
+
+        for c in range(self.campaigns):
+            campaign_id = self.account_id(account_index) * 1000 + c
+            campaign = {'Campaign ID': str(campaign_id),
+                        'Campaign': 'Campaign #%s' % c,
+                        'Campaign state': Campaign.STATE_ENABLED}
+            if level == Account.LEVEL_CAMPAIGN:
+                yield campaign
+                continue
+
+            for g in range(self.ad_groups):
+                ad_group_id = campaign_id * 1000 + g
+                ad_group = dict(campaign, **{'Ad group ID': str(ad_group_id),
+                                             'Ad group': 'AdGroup #%s' % g,
+                                             'Ad group state': AdGroup.STATE_ENABLED})
+                if level == Account.LEVEL_AD_GROUP:
+                    yield ad_group
+                    continue
+
+                for a in range(self.ads):
+                    yield dict(ad_group, **{'Ad ID': str(ad_group_id * 1000 + a),
+                                            'Ad': 'Ad #%s' % a,
+                                            'Ad state': Ad.STATE_ENABLED,
+                                            'Ad type': Ad.TYPE_TEXT_AD})
+
+    def rows(self, level, account_index=0):
+        """
+        Yields each data row of the report for level as a list of values.
+        """
+        headers = REPORTS[level][1]
+        rng = random.Random(self.seed * 1000003 + Account.SYNC_LEVELS.index(level) * 1009 + account_index)
+        entities = list(self.entities(level, account_index))
+        for offset in range(self.days):
+            day = (self.start + timedelta(days=offset)).isoformat()
+            for entity in entities:
+                fixed = {'Currency': self.currency,
+                         'Account': 'Account #%s' % account_index,
+                         'Day': day}
+                fixed.update(entity)
+                yield [fixed[header] if header in fixed else self.value(rng, level, header)
+                       for header in headers]
+
+    def write(self, f, level, account_index=0):
+        """
+        Write the gzipped CSV report for level to the binary file like object f.
+        """
+        name, headers, _ = REPORTS[level]
+        finish = self.start + timedelta(days=self.days - 1)
+        with gzip.GzipFile(fileobj=f, mode='wb') as gzip_file:
+            text = gzip_file if six.PY2 else io.TextIOWrapper(gzip_file, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(['%s (%s-%s)' % (name, self.start.strftime('%b %d, %Y'), finish.strftime('%b %d, %Y'))])
+            writer.writerow(headers)
+            for row in self.rows(level, account_index):
+                writer.writerow(row)
+            writer.writerow(['Total'] + [' --'] * (len(headers) - 1))
+            if not six.PY2:
+                text.flush()
+                text.detach()
+
+    def report_file(self, level, account_index=0):
+        """
+        Returns a ReportFile containing the report for level.
+        """
+        report_file = ReportFile.objects.create()
+        with report_file.file_manager('%s.gz' % report_file.pk) as f:
+            self.write(f, level, account_index)
+        return report_file
@@ -0,0 +1,226 @@
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+import os
+import platform
+import subprocess
+import time
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+from django_google_adwords.benchmarks.budgets import check_budgets, measure_import
+from django_google_adwords.errors import RateExceededError
+from django_google_adwords.indexes import missing_indexes
+from django_google_adwords.memory import peak_rss
+from django_google_adwords.models import Account, Campaign, AdGroup, Ad, ReportFile
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover - Python 2
+    tracemalloc = None
+
+
+PASS_INSERT = 'insert'
+PASS_UPDATE = 'update'
+PASSES = (PASS_INSERT, PASS_UPDATE,)
+
+
+def git_revision():
+    """
+    Returns the git commit the benchmarks are run against, or None if unknown.
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def meta(generator):
+    """
+    Returns a dict describing the environment and generator a benchmark is run with.
+    """
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'import_mode': settings.GOOGLEADWORDS_IMPORT_MODE,
+        'generator': {
+            'accounts': generator.accounts,
+            'campaigns': generator.campaigns,
+            'ad_groups': generator.ad_groups,
+            'ads': generator.ads,
+            'days': generator.days,
+            'devices': len(generator.devices),
+            'seed': generator.seed,
+        },
+    }
+
+
+class ImportBenchmark(object):
+    """
+    Benchmarks the Account.sync_* tasks against reports from a ReportGenerator.
+
+    For each level the reports of every generated account are imported twice, the first
+    pass inserts and the second updates the same rows. Each import is measured for rows
+    per second, queries and cache operations per row and peak memory. When trace_memory is set (and tracemalloc
+    is available) the peak Python allocations of each import are traced, which is accurate
+    but slows the import so rows per second should be compared with it unset.
+    """
+
+    def __init__(self, generator, levels=Account.SYNC_LEVELS, passes=PASSES, trace_memory=False):
+        self.generator = generator
+        self.levels = levels
+        self.passes = passes
+        self.trace_memory = trace_memory and tracemalloc is not None
+
+    def run(self):
+        """
+        Returns a dict of the meta data of the run and a list of results, one per level and pass.
+        """
+        results = []
+        accounts = self.generator.get_or_create_accounts()
+        for level in self.levels:
+            report_files = [self.generator.report_file(level, i) for i in range(len(accounts))]
+            try:
+                for name in self.passes:
+                    results.append(self.run_pass(level, name, accounts, report_files))
+            finally:
+                for report_file in report_files:
+                    report_file.delete()
+        return {'meta': meta(self.generator), 'results': results}
+
+    def run_pass(self, level, name, accounts, report_files):
+        rows = 0
+        seconds = 0.0
+        queries = 0
+        cache_operations = 0
+        traced_peak = None
+
+        for account, report_file in zip(accounts, report_files):
+            if self.trace_memory:
+                tracemalloc.start()
+            try:
+                measurement = measure_import(account, level, report_file)
+                if self.trace_memory:
+                    traced_peak = max(traced_peak or 0, tracemalloc.get_traced_memory()[1])
+            finally:
+                if self.trace_memory:
+                    tracemalloc.stop()
+            rows += measurement['rows']
+            seconds += measurement['seconds']
+            queries += measurement['queries']
+            cache_operations += measurement['cache_operations']
+
+        return {
+            'level': level,
+            'pass': name,
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else None,
+            'queries': queries,
+            'queries_per_row': float(queries) / rows if rows else None,
+            'cache_operations': cache_operations,
+            'cache_operations_per_row': float(cache_operations) / rows if rows else None,
+            'peak_rss': peak_rss(),
+            'traced_peak': traced_peak,
+        }
+
+    def check_budgets(self, results):
+        """
+        Returns a list of messages describing the query and cache operation budgets (see
+        budgets) exceeded by results, as returned by run, empty if all are within budget.
+        """
+        exceeded = []
+        for result in results['results']:
+            for message in check_budgets(result['level'], result['rows'], result['queries'],
+                                         result['cache_operations']):
+                exceeded.append('%s pass: %s' % (result['pass'], message))
+        return exceeded
+
+    def check_indexes(self):
+        """
+        Returns a list of messages describing the indexes of the daily metrics the period
+        queries depend on (see indexes) missing from the database, empty if all exist.
+        """
+        return missing_indexes(connection, apps)
+
+SELECTORS = {
+    Account.LEVEL_ACCOUNT: Account.get_selector,
+    Account.LEVEL_CAMPAIGN: Campaign.get_selector,
+    Account.LEVEL_AD_GROUP: AdGroup.get_selector,
+    Account.LEVEL_AD: Ad.get_selector,
+}
+
+
+class DownloadBenchmark(object):
+    """
+    Benchmarks concurrent report downloads by ReportFile.objects.request from a
+    FakeAdWordsServer (see fake_api).
+
+    Downloads cycle through levels, concurrency at a time. A download that hits a
+    RateExceededError is retried after its retry_after_seconds, as create_report_file does.
+    """
+
+    def __init__(self, server, levels=Account.SYNC_LEVELS, downloads=20, concurrency=4):
+        self.server = server
+        self.levels = levels
+        self.downloads = downloads
+        self.concurrency = concurrency
+
+    def download(self, level):
+        retries = 0
+        try:
+            while True:
+                try:
+                    report_file = ReportFile.objects.request(report_definition=SELECTORS[level](),
+                                                             client_customer_id=self.server.generator.account_id(0))
+                    break
+                except RateExceededError as exc:
+                    retries += 1
+                    time.sleep(exc.retry_after_seconds)
+            size = report_file.file.size
+            report_file.delete()
+            return size, retries
+        finally:
+            connection.close()
+
+    def run(self):
+        """
+        Returns a dict of the meta data of the run and a list with the download result.
+        """
+        levels = [self.levels[i % len(self.levels)] for i in range(self.downloads)]
+        size = 0
+        retries = 0
+
+        with override_settings(GOOGLEADWORDS_CLIENT_FACTORY='django_google_adwords.benchmarks.fake_api.fake_client_factory',
+                               GOOGLEADWORDS_FAKE_API_URL=self.server.url):
+            pool = ThreadPool(self.concurrency)
+            try:
+                started = time.time()
+                for download_size, download_retries in pool.imap_unordered(self.download, levels):
+                    size += download_size
+                    retries += download_retries
+                seconds = time.time() - started
+            finally:
+                pool.close()
+                pool.join()
+
+        return {'meta': meta(self.server.generator),
+                'results': [{
+                    'downloads': self.downloads,
+                    'concurrency': self.concurrency,
+                    'bytes': size,
+                    'seconds': seconds,
+                    'bytes_per_second': size / seconds if seconds else None,
+                    'downloads_per_second': self.downloads / seconds if seconds else None,
+                    'retries': retries,
+                    'requests': self.server.request_count,
+                    'latency': self.server.latency,
+                    'bandwidth': self.server.bandwidth,
+                }]}
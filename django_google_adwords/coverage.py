@@ -0,0 +1,80 @@
+"""
+Run-length ranges of days, used by MetricsCoverage to record the days an account has
+metrics for.
+
+Ranges are kept as a sorted list of disjoint, non adjacent [first, last] day ordinals
+(see date.toordinal), an account synced every day has a single range.
+"""
+from bisect import bisect_right
+from datetime import date
+
+from .rollups import to_date
+
+
+def merge_days(ranges, days):
+    """
+    Returns ranges with days added.
+    """
+    ordinals = sorted(set(to_date(day).toordinal() for day in days))
+    runs = []
+    for ordinal in ordinals:
+        if runs and runs[-1][1] + 1 == ordinal:
+            runs[-1][1] = ordinal
+        else:
+            runs.append([ordinal, ordinal])
+
+    merged = []
+    for first, last in sorted([list(r) for r in ranges] + runs):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def covers(ranges, start, finish):
+    """
+    Returns True if every day from start to finish inclusive is in ranges.
+    """
+    start, finish = to_date(start).toordinal(), to_date(finish).toordinal()
+    i = bisect_right([first for first, _ in ranges], start) - 1
+    return i >= 0 and ranges[i][1] >= finish
+
+
+def gaps(ranges, start, finish):
+    """
+    Returns a list of the (start, finish) dates of the runs of days from start to finish
+    inclusive that aren't in ranges.
+    """
+    start, finish = to_date(start).toordinal(), to_date(finish).toordinal()
+    missing = []
+    cursor = start
+    for first, last in ranges:
+        if last < cursor:
+            continue
+        if first > finish:
+            break
+        if first > cursor:
+            missing.append((cursor, first - 1))
+        cursor = last + 1
+        if cursor > finish:
+            break
+    if cursor <= finish:
+        missing.append((cursor, finish))
+    return [(date.fromordinal(first), date.fromordinal(last)) for first, last in missing]
+
+
+def days_before(ranges, before):
+    """
+    Returns ranges without the days from the day before on.
+    """
+    before = to_date(before).toordinal()
+    return [[first, min(last, before - 1)] for first, last in ranges if first < before]
+
+
+def trim_days(ranges, before):
+    """
+    Returns ranges without the days before the day before.
+    """
+    before = to_date(before).toordinal()
+    return [[max(first, before), last] for first, last in ranges if last >= before]
@@ -43,3 +43,25 @@ class NoAccountCurrencyCodeError(Exception):
 
 class AdWordsDataInconsistencyError(Exception):
     pass
+
+
+class ImportMemoryLimitError(Exception):
+    """
+    Raised when an import exceeds GOOGLEADWORDS_IMPORT_MEMORY_LIMIT.
+    """
+
+    def __init__(self, memory_limit, rss):
+        self.memory_limit = memory_limit
+        self.rss = rss
+        Exception.__init__(self, memory_limit, rss)
+
+
+class LockTimeoutError(Exception):
+    """
+    Raised when a lock isn't acquired within GOOGLEADWORDS_LOCK_ACQUIRE_TIMEOUT.
+    """
+
+    def __init__(self, model, identifier):
+        self.model = model
+        self.identifier = identifier
+        Exception.__init__(self, model, identifier)
@@ -0,0 +1,204 @@
+"""
+Money fields of the daily metrics, see GOOGLEADWORDS_MONEY_MICROS.
+
+By default money is a djmoney MoneyField, a decimal amount of dollars and cents plus a
+currency column per field per row. With GOOGLEADWORDS_MONEY_MICROS it's a
+MicrosMoneyField, the integer micros (millionths of the currency) the AdWords API
+reports, in the currency of the account. Sums and averages are computed on the integers
+and converted to amounts once (see from_micros), Money is only constructed when the
+field is accessed.
+"""
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connections, models, router
+from django.db.migrations.operations.base import Operation
+from djmoney.models.fields import MoneyField
+from moneyed import Money
+
+MICROS = 1000000
+
+# The currency of money whose account (or its currency) isn't known, as MoneyField defaults to
+NO_CURRENCY = 'XYZ'
+
+# The money fields of the daily metrics models
+MONEY_FIELDS = ('avg_cpc', 'avg_cpm', 'cost', 'cost_converted_click', 'cost_conv',)
+
+
+def to_micros(amount):
+    if amount is None:
+        return None
+    return int((Decimal(amount) * MICROS).to_integral_value())
+
+
+def from_micros(value):
+    """
+    Returns the amount of value micros, a float for a float (ie.. an average) otherwise a
+    Decimal.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return value / MICROS
+    return Decimal(value) / MICROS
+
+
+def money_aggregate(aggregate):
+    """
+    Returns aggregate (ie.. Sum('cost') or Avg('metrics__avg_cpc')) of a money field of the
+    daily metrics for an annotation, converted from micros to an amount in the database with
+    GOOGLEADWORDS_MONEY_MICROS. The literal is numeric on PostgreSQL, so sums stay exact.
+    """
+    if not settings.GOOGLEADWORDS_MONEY_MICROS:
+        return aggregate
+    # Expressions over aggregates need Django 1.8, see money_field
+    from django.db.models import Func
+    return Func(aggregate, template='(%(expressions)s * 0.000001)',
+                output_field=models.DecimalField(max_digits=24, decimal_places=6))
+
+
+class MicrosMoneyDescriptor(object):
+    """
+    Returns the Money of the micros of field (held in its attname) in the currency of the
+    account, ie.. row.cost for row.cost_micros. Setting a Money or an amount stores its micros.
+
+    The currency is read through the foreign keys of field.currency_from, so the first access
+    on a row queries its account (and the campaign first at the campaign level) unless they
+    were select_related. Django caches the related objects on the row, later accesses don't
+    query.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def currency(self, instance):
+        obj = instance
+        for name in self.field.currency_from.split('.'):
+            obj = getattr(obj, name, None)
+            if obj is None:
+                return NO_CURRENCY
+        return getattr(obj, 'currency', None) or NO_CURRENCY
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        micros = getattr(instance, self.field.attname)
+        if micros is None:
+            return None
+        return Money(from_micros(micros), self.currency(instance))
+
+    def __set__(self, instance, value):
+        if isinstance(value, Money):
+            value = value.amount
+        setattr(instance, self.field.attname, to_micros(value))
+
+
+class MicrosMoneyField(models.BigIntegerField):
+    """
+    Money stored as integer micros in the column of the field's name, with the currency of
+    the Account at the dotted attribute path currency_from. The micros are the attname
+    (ie.. cost_micros, like the _id of a foreign key) and the field's name is a
+    MicrosMoneyDescriptor. Lookups, values() and aggregates are in micros.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.currency_from = kwargs.pop('currency_from', 'account')
+        super(MicrosMoneyField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(MicrosMoneyField, self).deconstruct()
+        kwargs['currency_from'] = self.currency_from
+        return name, path, args, kwargs
+
+    def get_attname(self):
+        return '%s_micros' % self.name
+
+    def get_attname_column(self):
+        return self.get_attname(), self.db_column or self.name
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(MicrosMoneyField, self).contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, name, MicrosMoneyDescriptor(self))
+
+
+def money_field(help_text, currency_from='account'):
+    """
+    Returns a money field of the daily metrics, a MicrosMoneyField with
+    GOOGLEADWORDS_MONEY_MICROS otherwise a MoneyField.
+    """
+    if settings.GOOGLEADWORDS_MONEY_MICROS:
+        if django.VERSION < (1, 8):
+            # money_aggregate converts the micros with expressions over aggregates
+            raise ImproperlyConfigured('GOOGLEADWORDS_MONEY_MICROS needs Django 1.8 or later.')
+        return MicrosMoneyField(currency_from=currency_from, default=0, help_text=help_text, null=True, blank=True)
+    return MoneyField(max_digits=12, decimal_places=2, default=0, help_text=help_text, null=True, blank=True)
+
+
+class IfMoneyMicros(Operation):
+    """
+    A migration operation applying operation only with GOOGLEADWORDS_MONEY_MICROS. The setting
+    is checked when the migration is applied or unapplied (and its state built) rather than
+    when it's loaded, so the operations of the migration are the same whatever the setting.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.reversible = operation.reversible
+        self.reduces_to_sql = operation.reduces_to_sql
+        self.atomic = getattr(operation, 'atomic', False)
+
+    def state_forwards(self, app_label, state):
+        if settings.GOOGLEADWORDS_MONEY_MICROS:
+            self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if settings.GOOGLEADWORDS_MONEY_MICROS:
+            self.operation.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if settings.GOOGLEADWORDS_MONEY_MICROS:
+            self.operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return '%s with GOOGLEADWORDS_MONEY_MICROS' % self.operation.describe()
+
+
+@checks.register()
+def check_money_micros(app_configs, **kwargs):
+    """
+    Returns an error if migration 0016_money_micros has been applied with
+    GOOGLEADWORDS_MONEY_MICROS set differently, ie.. the setting was changed after
+    migrating and the money columns no longer match the models.
+    """
+    from django.db.migrations.recorder import MigrationRecorder
+    from .models import DailyAccountMetrics
+
+    connection = connections[router.db_for_write(DailyAccountMetrics)]
+    table = DailyAccountMetrics._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            if table not in tables or MigrationRecorder.Migration._meta.db_table not in tables:
+                return []
+            if not MigrationRecorder.Migration.objects.using(connection.alias) \
+                    .filter(app='django_google_adwords', name='0016_money_micros').exists():
+                return []
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+    except DatabaseError:
+        return []
+
+    # The MoneyFields have a currency column, the MicrosMoneyFields don't
+    migrated_micros = 'cost_currency' not in columns
+    if migrated_micros == settings.GOOGLEADWORDS_MONEY_MICROS:
+        return []
+    return [checks.Error(
+        'GOOGLEADWORDS_MONEY_MICROS is %s but 0016_money_micros was migrated with it %s.' % (
+            settings.GOOGLEADWORDS_MONEY_MICROS, migrated_micros),
+        hint='Set GOOGLEADWORDS_MONEY_MICROS back to %s, migrate django_google_adwords '
+             '0015_daily_metrics_unique_together, then set it to %s and migrate.' % (
+                 migrated_micros, settings.GOOGLEADWORDS_MONEY_MICROS),
+        id='django_google_adwords.E001',
+    )]
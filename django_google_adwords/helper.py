@@ -2,8 +2,11 @@ from googleads.adwords import AdWordsClient
 from googleads.oauth2 import GoogleRefreshTokenClient
 from googleads.errors import GoogleAdsError
 from django.conf import settings
+from django.utils.module_loading import import_string
+from django_google_adwords.instrumentation import stage
 from time import sleep
 import logging
+import socket
 
 logger = logging.getLogger(__name__)
 
@@ -12,22 +15,72 @@ def adwords_service(client_customer_id=None):
     """
     Get an instance of GoogleRefreshTokenClient with configuration as per defined settings
     and use that to create an instance of AdWordsClient.
+
+    If GOOGLEADWORDS_CLIENT_FACTORY is set the client is instead created by calling it with
+    client_customer_id, see benchmarks.fake_api.fake_client_factory.
     """
     if not client_customer_id:
         client_customer_id = settings.GOOGLEADWORDS_CLIENT_CUSTOMER_ID
 
-    oauth2_client = GoogleRefreshTokenClient(
-        client_id=settings.GOOGLEADWORDS_CLIENT_ID,
-        client_secret=settings.GOOGLEADWORDS_CLIENT_SECRET,
-        refresh_token=settings.GOOGLEADWORDS_REFRESH_TOKEN
-    )
-
-    return AdWordsClient(
-        developer_token=settings.GOOGLEADWORDS_DEVELOPER_TOKEN,
-        oauth2_client=oauth2_client,
-        user_agent=settings.GOOGLEADWORDS_USER_AGENT,
-        client_customer_id=client_customer_id
-    )
+    with stage('auth'):
+        if settings.GOOGLEADWORDS_CLIENT_FACTORY:
+            return import_string(settings.GOOGLEADWORDS_CLIENT_FACTORY)(client_customer_id)
+
+        oauth2_client = GoogleRefreshTokenClient(
+            client_id=settings.GOOGLEADWORDS_CLIENT_ID,
+            client_secret=settings.GOOGLEADWORDS_CLIENT_SECRET,
+            refresh_token=settings.GOOGLEADWORDS_REFRESH_TOKEN
+        )
+
+        return AdWordsClient(
+            developer_token=settings.GOOGLEADWORDS_DEVELOPER_TOKEN,
+            oauth2_client=oauth2_client,
+            user_agent=settings.GOOGLEADWORDS_USER_AGENT,
+            client_customer_id=client_customer_id
+        )
+
+
+def local_data_import_queue(hostname=None):
+    """
+    Returns the name of the data import queue for hostname (defaults to this host).
+    """
+    return settings.GOOGLEADWORDS_DATA_IMPORT_LOCAL_QUEUE % {
+        'queue': settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE,
+        'hostname': hostname or socket.gethostname(),
+    }
+
+
+def data_import_queue():
+    """
+    Returns the queue that the import of a report downloaded by this process should be sent to.
+
+    When GOOGLEADWORDS_DATA_IMPORT_LOCAL_ROUTING is enabled and the current worker consumes
+    its per host queue (see local_data_import_queue) that queue is returned so the report is
+    read from local disk. Otherwise, ie.. the worker does not consume a local queue, the
+    shared GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE is returned and the report is read from
+    shared storage by whichever worker picks it up.
+
+    Should the host's worker die before consuming an import routed to its queue the import
+    is rerouted to the shared queue by Account.reroute_import (see queue_consumed).
+    """
+    if settings.GOOGLEADWORDS_DATA_IMPORT_LOCAL_ROUTING:
+        from celery import current_app
+        queue = local_data_import_queue()
+        if queue in current_app.amqp.queues.consume_from:
+            return queue
+        logger.debug("Worker does not consume '%s', routing import to shared queue.", queue)
+    return settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE
+
+
+def queue_consumed(queue, timeout=1.0):
+    """
+    Returns True if a live worker consumes queue, asking the workers over the broker (see
+    celery's inspect active_queues). Workers that don't reply within timeout seconds are
+    considered gone.
+    """
+    from celery import current_app
+    replies = current_app.control.inspect(timeout=timeout).active_queues() or {}
+    return any(consumed['name'] == queue for queues in replies.values() for consumed in queues)
 
 
 def paged_request(service, selector={}, number_results=100, start_index=0, retry=True, number_pages=False):
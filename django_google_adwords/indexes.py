@@ -0,0 +1,82 @@
+"""
+Covering indexes of the daily metrics on PostgreSQL, see migration 0011_metrics_indexes.
+
+The (parent, day) indexes the period queries filter by are the unique_together (the
+natural key, see loaders.CopyLoader) and index_together of the daily metrics models. On
+PostgreSQL 11 and later those of the account (or the campaign at the campaign level)
+also INCLUDE the columns the period sums are over, so
+account.metrics.total_cost_for_period and the like are answered by index only scans.
+"""
+
+# The columns the hot period aggregates sum
+INCLUDE_FIELDS = ('cost', 'clicks', 'impressions', 'conversions',)
+
+# The (model name, key fields) of each covering index
+COVERING_INDEXES = (
+    ('DailyAccountMetrics', ('account', 'day',)),
+    ('DailyCampaignMetrics', ('campaign', 'day',)),
+    ('DailyAdGroupMetrics', ('account', 'day',)),
+    ('DailyAdMetrics', ('account', 'day',)),
+)
+
+
+def supports_covering_indexes(connection):
+    return connection.vendor == 'postgresql' and connection.pg_version >= 110000
+
+
+def covering_index_name(model, fields):
+    return 'googleadwords_%s_%s_covering' % (model._meta.model_name, '_'.join(fields))
+
+
+def covering_indexes(apps):
+    """
+    Yields the (model, index name, key fields) of each covering index.
+    """
+    for model_name, fields in COVERING_INDEXES:
+        model = apps.get_model('django_google_adwords', model_name)
+        yield model, covering_index_name(model, fields), fields
+
+
+def create_covering_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if not supports_covering_indexes(connection):
+        return
+    quote_name = connection.ops.quote_name
+    for model, name, fields in covering_indexes(apps):
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s) INCLUDE (%s)' % (
+            quote_name(name),
+            quote_name(model._meta.db_table),
+            ', '.join(quote_name(model._meta.get_field(field).column) for field in fields),
+            ', '.join(quote_name(model._meta.get_field(field).column) for field in INCLUDE_FIELDS),
+        ))
+
+
+def drop_covering_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if not supports_covering_indexes(connection):
+        return
+    for _, name, _ in covering_indexes(apps):
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % connection.ops.quote_name(name))
+
+
+def missing_indexes(connection, apps):
+    """
+    Returns a list of messages describing the unique_together and index_together of the
+    daily metrics models, and where supported the covering indexes, missing from the
+    database of connection.
+    """
+    missing = []
+    covering = dict((model_name, covering_index_name(apps.get_model('django_google_adwords', model_name), fields))
+                    for model_name, fields in COVERING_INDEXES)
+    with connection.cursor() as cursor:
+        for model_name, _ in COVERING_INDEXES:
+            model = apps.get_model('django_google_adwords', model_name)
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+            indexed = [tuple(constraint['columns']) for constraint in constraints.values() if constraint['index']]
+            for fields in tuple(model._meta.unique_together) + tuple(model._meta.index_together):
+                columns = tuple(model._meta.get_field(field).column for field in fields)
+                if columns not in indexed:
+                    missing.append('%s: no index on (%s)' % (model_name, ', '.join(columns)))
+            if supports_covering_indexes(connection) and covering[model_name] not in constraints:
+                missing.append('%s: no covering index %s' % (model_name, covering[model_name]))
+    return missing
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+import time
+
+from django.conf import settings
+from django_google_adwords.metrics import get_metrics_backend
+
+
+_local = threading.local()
+
+
+class SyncStats(object):
+    """
+    Per stage timings and counters for the sync of an account at a level.
+
+    Stages are recorded by the code being timed (see stage and timed_iteration) into the
+    SyncStats collected by the current thread (see collect_stats). The stages are:
+
+    - auth: Creating the AdWords client.
+    - download: Downloading a report, counts bytes.
+    - import: Importing a report, the wall clock time of the sync_* task.
+    - parse: Reading, decompressing and parsing a report, counts rows.
+    - db_read: Retrieving existing models during populate.
+    - db_write: Saving models during populate, counts inserted and updated in total and
+      per model (ie.. dailyaccountmetrics_inserted).
+    - finish: The finish_*_sync conditional UPDATE of *_last_synced (see
+      Account.update_last_synced) and invalidation of the cached aggregates.
+    """
+
+    def __init__(self, account_id=None, level=None):
+        self.account_id = account_id
+        self.level = level
+        self.stages = OrderedDict()
+
+    def add(self, name, seconds=0.0, **counters):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'seconds': 0.0, 'calls': 0}
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+        for counter, value in counters.items():
+            stage[counter] = stage.get(counter, 0) + value
+
+    def seconds(self, name):
+        """
+        Returns the seconds recorded for stage name, or None if it wasn't recorded.
+        """
+        stage = self.stages.get(name)
+        return stage['seconds'] if stage is not None else None
+
+    def counter(self, name, counter):
+        """
+        Returns the value of counter for stage name, or None if it wasn't recorded.
+        """
+        return self.stages.get(name, {}).get(counter)
+
+    def result(self):
+        """
+        Returns a dict of the stages, suitable for a task result.
+        """
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            for counter in ('rows', 'bytes'):
+                if counter in stage and stage['seconds']:
+                    stage['%s_per_second' % counter] = stage[counter] / stage['seconds']
+            stages[name] = stage
+        return {'account': self.account_id, 'level': self.level, 'stages': stages}
+
+    def emit(self, metrics):
+        """
+        Send the stages to metrics as sync.<stage> timings and sync.<stage>.<counter> counters,
+        tagged with the level and, with GOOGLEADWORDS_METRICS_ACCOUNT_TAG, the account.
+        """
+        tags = {'level': self.level}
+        if settings.GOOGLEADWORDS_METRICS_ACCOUNT_TAG:
+            tags['account'] = self.account_id
+        for name, stage in self.stages.items():
+            metrics.timing('sync.%s' % name, stage['seconds'], tags=tags)
+            for counter, value in stage.items():
+                if counter != 'seconds':
+                    metrics.incr('sync.%s.%s' % (name, counter), value, tags=tags)
+
+
+def current_stats():
+    """
+    Returns the SyncStats being collected by this thread or None.
+    """
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def collect_stats(account_id, level):
+    """
+    Collect the stages recorded by this thread for the block into a SyncStats, which is
+    sent to the metrics backend on leaving the block.
+    """
+    previous = current_stats()
+    stats = _local.stats = SyncStats(account_id, level)
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+        metrics = get_metrics_backend()
+        if metrics.enabled:
+            stats.emit(metrics)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time the block as stage name. Yields a dict, counters added to it are recorded with
+    the stage. Nothing is recorded if this thread isn't collecting stats.
+    """
+    stats = current_stats()
+    counters = {}
+    started = time.time()
+    try:
+        yield counters
+    finally:
+        if stats is not None:
+            stats.add(name, time.time() - started, **counters)
+
+
+def timed_iteration(name, iterable):
+    """
+    Returns an iterator over iterable that records the time spent producing items as
+    stage name, counting rows. Returns iterable untouched if this thread isn't collecting stats.
+    """
+    stats = current_stats()
+    if stats is None:
+        return iterable
+    return _timed_iteration(stats, name, iterable)
+
+
+def _timed_iteration(stats, name, iterable):
+    iterator = iter(iterable)
+    seconds = 0.0
+    rows = 0
+    try:
+        while True:
+            started = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.time() - started
+            rows += 1
+            yield item
+    finally:
+        stats.add(name, seconds, rows=rows)
@@ -0,0 +1,317 @@
+"""
+Loaders of the daily metrics rows of a report, used by the Account.sync_* tasks.
+
+GOOGLEADWORDS_IMPORT_MODE selects the loader:
+
+- 'populate': Each row is retrieved and inserted or updated by the daily metrics
+  queryset's populate, rows missing from the report are left alone.
+- 'replace': The report is authoritative for the days from its first to its last day.
+  The rows are spooled to a temporary file and on finish, in one transaction, the
+  account's rows of those days are deleted and the new rows copied into a temporary
+  staging table (using COPY on PostgreSQL and batched INSERTs elsewhere) from which the
+  last row of each natural key is inserted, so rows that disappeared upstream are
+  removed. Repeated keys are resolved by the database rather than held in memory.
+- 'copy': On PostgreSQL 9.5 and later the rows are streamed to a temporary file in the
+  COPY format. On finish they are copied into a temporary staging table and merged into
+  the daily metrics table on its natural key (its unique_together, the last of any
+  repeated key) with a single INSERT ... ON CONFLICT DO UPDATE, counting the rows
+  inserted and updated as populate does. Other databases fall back to populate.
+"""
+from datetime import timedelta
+import tempfile
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import AutoField
+from django.utils import six
+from django.utils.six.moves import cPickle as pickle, range
+
+from .instrumentation import stage
+from .partitioning import MonthlyPartitions
+from .rollups import to_date
+
+
+IMPORT_MODE_POPULATE = 'populate'
+IMPORT_MODE_REPLACE = 'replace'
+IMPORT_MODE_COPY = 'copy'
+IMPORT_MODES = (IMPORT_MODE_POPULATE, IMPORT_MODE_REPLACE, IMPORT_MODE_COPY,)
+
+# Bytes of rows ReplaceLoader and CopyLoader hold in memory before spilling to disk
+SPOOL_SIZE = 8 * 1024 * 1024
+
+# Column of a staging table numbering the rows in the order they were loaded
+ROW_COLUMN = 'loaded_row'
+
+
+def supports_copy(connection):
+    return connection.vendor == 'postgresql'
+
+
+def supports_upsert(connection):
+    return connection.vendor == 'postgresql' and connection.pg_version >= 90500
+
+
+def insert_fields(model):
+    """
+    Returns the concrete fields of model that are inserted, all but the auto primary key.
+    """
+    return [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+
+
+def conflict_fields(model):
+    """
+    Returns the fields of the natural key of model, its first unique_together.
+    """
+    return [model._meta.get_field(name) for name in model._meta.unique_together[0]]
+
+
+def copy_value(value):
+    """
+    Returns value in the COPY text format.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    value = six.text_type(value)
+    for character, escaped in (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')):
+        value = value.replace(character, escaped)
+    return value
+
+
+def insert_values(connection, fields, instance):
+    """
+    Returns a list of the values of fields of instance (an unsaved model instance) as they
+    would be inserted.
+    """
+    return [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+
+
+def copy_line(values):
+    """
+    Returns the line of values (see insert_values) in the COPY text format.
+    """
+    return '\t'.join(copy_value(value) for value in values) + '\n'
+
+
+def copy_from(cursor, table, columns, data):
+    """
+    COPY data, a file of lines in the COPY text format, into columns (names) of table.
+    """
+    quote_name = cursor.db.ops.quote_name
+    cursor.copy_expert('COPY %s (%s) FROM STDIN' % (
+        quote_name(table), ', '.join(quote_name(column) for column in columns)), data)
+
+
+def insert_rows(cursor, table, columns, rows, batch_size):
+    """
+    Insert rows, lists of the values of columns (names), into table with batch_size rows
+    per executemany.
+    """
+    quote_name = cursor.db.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote_name(table), ', '.join(quote_name(column) for column in columns), ', '.join(['%s'] * len(columns)))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+class PopulateLoader(object):
+    """
+    Loads each row with the daily metrics queryset's populate.
+    """
+
+    def __init__(self, queryset, account):
+        self.queryset = queryset
+        self.account = account
+        self.partitions = MonthlyPartitions.for_model(queryset.model)
+
+    def ensure_partition(self, data):
+        """
+        Create the partition of the day of data (a row of the report) before it's loaded,
+        with GOOGLEADWORDS_PARTITION_METRICS.
+        """
+        if self.partitions is not None:
+            self.partitions.ensure(data.get('Day'))
+
+    def load(self, data, **parent):
+        self.ensure_partition(data)
+        return self.queryset.populate(data, **parent)
+
+    def finish(self):
+        """
+        :return: The days whose rows were deleted, none.
+        """
+        return set()
+
+
+class ReplaceLoader(PopulateLoader):
+    """
+    Replaces the account's rows of the days from the first to the last day of the rows
+    loaded, see the module docstring.
+    """
+
+    def __init__(self, queryset, account, batch_size=None):
+        super(ReplaceLoader, self).__init__(queryset, account)
+        self.batch_size = batch_size or settings.GOOGLEADWORDS_IMPORT_CHUNK_SIZE
+        self.using = router.db_for_write(queryset.model)
+        self.connection = connections[self.using]
+        self.fields = insert_fields(queryset.model)
+        self.key = conflict_fields(queryset.model)
+        self.data = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.rows = 0
+        self.first = None
+        self.last = None
+
+    def load(self, data, **parent):
+        self.ensure_partition(data)
+        instance = self.queryset.build(data, **parent)
+        pickle.dump([self.rows] + insert_values(self.connection, self.fields, instance), self.data,
+                    pickle.HIGHEST_PROTOCOL)
+        self.rows += 1
+        day = to_date(instance.day)
+        self.first = day if self.first is None else min(self.first, day)
+        self.last = day if self.last is None else max(self.last, day)
+        return instance
+
+    def values(self):
+        """
+        Yields the values of the rows loaded, their index followed by their values (see
+        insert_values).
+        """
+        self.data.seek(0)
+        for _ in range(self.rows):
+            yield pickle.load(self.data)
+
+    def finish(self):
+        """
+        Delete the account's rows of the days loaded and insert the rows loaded.
+
+        :return: The days whose rows were deleted, every day from the first to the last
+                 day loaded.
+        """
+        try:
+            if not self.rows:
+                return set()
+            self.replace()
+        finally:
+            self.data.close()
+        return set(self.first + timedelta(days=i) for i in range((self.last - self.first).days + 1))
+
+    def replace(self):
+        model = self.queryset.model
+        table = model._meta.db_table
+        staging = '%s_staging' % table
+        quote_name = self.connection.ops.quote_name
+        columns = ', '.join(quote_name(field.column) for field in self.fields)
+        key_columns = ', '.join(quote_name(field.column) for field in self.key)
+        staging_columns = [ROW_COLUMN] + [field.column for field in self.fields]
+
+        with stage('db_write') as counters, transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            self.queryset.using(self.using).account(self.account).within_period(self.first, self.last).delete()
+            cursor.execute('CREATE TEMPORARY TABLE %s AS SELECT 0 AS %s, %s FROM %s WHERE 1 = 0' % (
+                quote_name(staging), quote_name(ROW_COLUMN), columns, quote_name(table)))
+            if supports_copy(self.connection):
+                with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as data:
+                    for values in self.values():
+                        data.write(copy_line(values).encode('utf-8'))
+                    data.seek(0)
+                    copy_from(cursor, staging, staging_columns, data)
+            else:
+                insert_rows(cursor, staging, staging_columns, self.values(), self.batch_size)
+            # The last row loaded of each natural key
+            cursor.execute('INSERT INTO %s (%s) SELECT %s FROM %s WHERE %s IN (SELECT MAX(%s) FROM %s GROUP BY %s)' % (
+                quote_name(table), columns, columns, quote_name(staging),
+                quote_name(ROW_COLUMN), quote_name(ROW_COLUMN), quote_name(staging), key_columns))
+            inserted = cursor.rowcount
+            cursor.execute('DROP TABLE %s' % quote_name(staging))
+            counters['inserted'] = inserted
+            counters['%s_inserted' % model._meta.model_name] = inserted
+
+
+class CopyLoader(PopulateLoader):
+    """
+    Merges the rows loaded into the table on its natural key through a staging table, see
+    the module docstring.
+    """
+
+    def __init__(self, queryset, account, using):
+        super(CopyLoader, self).__init__(queryset, account)
+        self.using = using
+        self.connection = connections[using]
+        self.fields = insert_fields(queryset.model)
+        self.data = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.rows = 0
+
+    def load(self, data, **parent):
+        self.ensure_partition(data)
+        instance = self.queryset.build(data, **parent)
+        self.data.write(copy_line([self.rows] + insert_values(self.connection, self.fields, instance)).encode('utf-8'))
+        self.rows += 1
+        return instance
+
+    def finish(self):
+        """
+        Copy the rows loaded into a staging table and merge them into the table.
+
+        :return: The days whose rows were deleted, none.
+        """
+        try:
+            if self.rows:
+                self.merge()
+        finally:
+            self.data.close()
+        return set()
+
+    def merge(self):
+        model = self.queryset.model
+        table = model._meta.db_table
+        staging = '%s_staging' % table
+        quote_name = self.connection.ops.quote_name
+        key = conflict_fields(model)
+        columns = ', '.join(quote_name(field.column) for field in self.fields)
+        key_columns = ', '.join(quote_name(field.column) for field in key)
+        updates = ', '.join('%s = EXCLUDED.%s' % (quote_name(field.column), quote_name(field.column))
+                            for field in self.fields if field not in key and not getattr(field, 'auto_now_add', False))
+
+        self.data.seek(0)
+        with stage('db_write') as counters, transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE %s ON COMMIT DROP AS SELECT 0::bigint AS %s, %s FROM %s WITH NO DATA' % (
+                quote_name(staging), quote_name(ROW_COLUMN), columns, quote_name(table)))
+            copy_from(cursor, staging, [ROW_COLUMN] + [field.column for field in self.fields], self.data)
+            # A report has a row per key, DISTINCT ON guards the merge against any repeats keeping
+            # the last row loaded (as ReplaceLoader does). The rows inserted (rather than updated)
+            # are those without an xmax.
+            cursor.execute('WITH merged AS (INSERT INTO %s (%s) SELECT DISTINCT ON (%s) %s FROM %s ORDER BY %s, %s DESC '
+                           'ON CONFLICT (%s) DO UPDATE SET %s RETURNING (xmax = 0) AS inserted) '
+                           'SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged' % (
+                               quote_name(table), columns, key_columns, columns, quote_name(staging),
+                               key_columns, quote_name(ROW_COLUMN), key_columns, updates))
+            inserted, updated = cursor.fetchone()
+            counters['inserted'] = inserted
+            counters['%s_inserted' % model._meta.model_name] = inserted
+            counters['updated'] = updated
+            counters['%s_updated' % model._meta.model_name] = updated
+
+
+def get_metrics_loader(queryset, account):
+    """
+    Returns the loader of GOOGLEADWORDS_IMPORT_MODE for the rows of queryset (the daily
+    metrics of a level) of account.
+    """
+    mode = settings.GOOGLEADWORDS_IMPORT_MODE
+    if mode == IMPORT_MODE_POPULATE:
+        return PopulateLoader(queryset, account)
+    if mode == IMPORT_MODE_REPLACE:
+        return ReplaceLoader(queryset, account)
+    if mode == IMPORT_MODE_COPY:
+        using = router.db_for_write(queryset.model)
+        if supports_upsert(connections[using]):
+            return CopyLoader(queryset, account, using)
+        return PopulateLoader(queryset, account)
+    raise ValueError('GOOGLEADWORDS_IMPORT_MODE must be one of %s, not %r' % (', '.join(IMPORT_MODES), mode))
@@ -1,6 +1,23 @@
+from contextlib import contextmanager
+import logging
+import math
+import threading
+import time
+import uuid
+import zlib
+
 from django.core.cache import cache
 from django.conf import settings
+from django.db import OperationalError, connections, transaction
 from django.template.defaultfilters import slugify
+from django.utils.module_loading import import_string
+
+from django_google_adwords.errors import LockTimeoutError
+from django_google_adwords.metrics import get_metrics_backend
+
+
+# The logger name predates the lock module, keep it so existing LOGGING config applies
+logger = logging.getLogger('django_google_adwords.models.locker')
 
 
 def get_googleadwords_lock_id(model, identifier):
@@ -8,12 +25,224 @@ def get_googleadwords_lock_id(model, identifier):
     return '%s-%s-%s' % (settings.GOOGLEADWORDS_LOCK_ID, model.__name__, _identifier)
 
 
-def acquire_googleadwords_lock(model, idenitier):
-    # cache.add fails if if the key already exists
-    return cache.add(get_googleadwords_lock_id(model, idenitier), "true", settings.GOOGLEADWORDS_LOCK_TIMEOUT)
+class BaseLockBackend(object):
+    """
+    A lock backend acquires and releases the locks that serialise the populate methods.
+    """
+
+    def acquire(self, model, identifier, blocking=False, timeout=None):
+        """
+        Acquire the lock for model and identifier.
+
+        :param blocking: Wait for the lock to be released if it is held.
+        :param timeout: Seconds to wait when blocking, None waits forever.
+        :return: True if the lock was acquired.
+        """
+        raise NotImplementedError
+
+    def release(self, model, identifier):
+        raise NotImplementedError
+
+
+class CacheLockBackend(BaseLockBackend):
+    """
+    Locks using cache.add, which fails if the key already exists.
+
+    The cache can't notify waiters of a release so a blocking acquire polls, backing off
+    from MIN_WAIT up to GOOGLEADWORDS_LOCK_WAIT seconds between attempts.
+    """
+    MIN_WAIT = 0.005
+
+    def acquire(self, model, identifier, blocking=False, timeout=None):
+        lock_id = get_googleadwords_lock_id(model, identifier)
+        deadline = None if timeout is None else time.time() + timeout
+        wait = self.MIN_WAIT
+
+        while True:
+            if cache.add(lock_id, "true", settings.GOOGLEADWORDS_LOCK_TIMEOUT):
+                return True
+            if not blocking:
+                return False
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+            wait = min(wait * 2, settings.GOOGLEADWORDS_LOCK_WAIT)
+
+    def release(self, model, identifier):
+        # memcache delete is very slow, but we have to use it to take
+        # advantage of using add() for atomic locking
+        return cache.delete(get_googleadwords_lock_id(model, identifier))
+
+
+class RedisLockBackend(BaseLockBackend):
+    """
+    Locks using Redis SET NX with waiters blocking on BLPOP of a notification list that
+    release pushes to, so a waiter wakes as soon as the lock is released.
+
+    Requires the redis package and GOOGLEADWORDS_LOCK_REDIS_URL. A waiter never blocks for
+    longer than GOOGLEADWORDS_LOCK_WAIT (rounded up to a whole second) before trying the
+    lock again, in case another waiter consumed the notification.
+    """
+    RELEASE_SCRIPT = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            redis.call('del', KEYS[1], KEYS[2])
+            redis.call('rpush', KEYS[2], 1)
+            redis.call('pexpire', KEYS[2], ARGV[2])
+            return 1
+        end
+        return 0
+    """
+
+    def __init__(self):
+        import redis
+        self.client = redis.StrictRedis.from_url(settings.GOOGLEADWORDS_LOCK_REDIS_URL)
+        self.release_script = self.client.register_script(self.RELEASE_SCRIPT)
+        self.local = threading.local()
+
+    def tokens(self):
+        if not hasattr(self.local, 'tokens'):
+            self.local.tokens = {}
+        return self.local.tokens
+
+    def acquire(self, model, identifier, blocking=False, timeout=None):
+        lock_id = get_googleadwords_lock_id(model, identifier)
+        token = uuid.uuid4().hex
+        deadline = None if timeout is None else time.time() + timeout
+
+        while True:
+            if self.client.set(lock_id, token, nx=True, px=settings.GOOGLEADWORDS_LOCK_TIMEOUT * 1000):
+                self.tokens()[lock_id] = token
+                return True
+            if not blocking:
+                return False
+            wait = settings.GOOGLEADWORDS_LOCK_WAIT
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self.client.blpop('%s-released' % lock_id, timeout=max(1, int(math.ceil(wait))))
+
+    def release(self, model, identifier):
+        lock_id = get_googleadwords_lock_id(model, identifier)
+        token = self.tokens().pop(lock_id, None)
+        if token is None:
+            return False
+        return bool(self.release_script(keys=[lock_id, '%s-released' % lock_id],
+                                        args=[token, settings.GOOGLEADWORDS_LOCK_TIMEOUT * 1000]))
+
+
+class PostgreSQLAdvisoryLockBackend(BaseLockBackend):
+    """
+    Locks using PostgreSQL session level advisory locks on GOOGLEADWORDS_LOCK_DATABASE,
+    PostgreSQL wakes a waiter as soon as the lock is released.
+
+    The lock key is the crc32 of the model name and of the identifier, so two identifiers
+    may (very rarely) share a lock.
+    """
+
+    def keys(self, model, identifier):
+        def crc32(value):
+            checksum = zlib.crc32(value.encode('utf-8')) & 0xffffffff
+            return checksum - 0x100000000 if checksum > 0x7fffffff else checksum
+        return [crc32(model.__name__), crc32(slugify(identifier))]
+
+    def acquire(self, model, identifier, blocking=False, timeout=None):
+        using = settings.GOOGLEADWORDS_LOCK_DATABASE
+        keys = self.keys(model, identifier)
+
+        with connections[using].cursor() as cursor:
+            if not blocking:
+                cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", keys)
+                return cursor.fetchone()[0]
+
+            if timeout is None:
+                cursor.execute("SELECT pg_advisory_lock(%s, %s)", keys)
+                return True
+
+            try:
+                # Session level advisory locks survive the (savepoint) transaction that is
+                # only needed to scope the lock_timeout.
+                with transaction.atomic(using=using):
+                    cursor.execute("SET LOCAL lock_timeout = %s", ['%dms' % max(1, timeout * 1000)])
+                    cursor.execute("SELECT pg_advisory_lock(%s, %s)", keys)
+                    cursor.execute("SET LOCAL lock_timeout TO DEFAULT")
+                return True
+            except OperationalError:
+                return False
+
+    def release(self, model, identifier):
+        with connections[settings.GOOGLEADWORDS_LOCK_DATABASE].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s, %s)", self.keys(model, identifier))
+            return cursor.fetchone()[0]
+
+
+_lock_backends = {}
+
+
+def get_lock_backend():
+    """
+    Returns the lock backend specified by GOOGLEADWORDS_LOCK_BACKEND.
+    """
+    path = settings.GOOGLEADWORDS_LOCK_BACKEND
+    if path not in _lock_backends:
+        _lock_backends[path] = import_string(path)()
+    return _lock_backends[path]
+
+
+def acquire_googleadwords_lock(model, idenitier, blocking=False, timeout=None):
+    return get_lock_backend().acquire(model, idenitier, blocking=blocking, timeout=timeout)
 
 
 def release_googleadwords_lock(model, idenitier):
-    # memcache delete is very slow, but we have to use it to take
-    # advantage of using add() for atomic locking
-    return cache.delete(get_googleadwords_lock_id(model, idenitier))
+    return get_lock_backend().release(model, idenitier)
+
+
+@contextmanager
+def googleadwords_lock(model, identifier, timeout=None):
+    """
+    Hold the lock for model and identifier for the duration of the block, waiting for it
+    to be released if it is held.
+
+    When a metrics backend is enabled the lock.acquired, lock.contended and lock.timeout
+    counters and lock.wait and lock.held timings are recorded, tagged with the model.
+
+    :param timeout: Seconds to wait for the lock, defaults to GOOGLEADWORDS_LOCK_ACQUIRE_TIMEOUT.
+    :raises LockTimeoutError: If the lock wasn't acquired within timeout.
+    """
+    if timeout is None:
+        timeout = settings.GOOGLEADWORDS_LOCK_ACQUIRE_TIMEOUT
+
+    metrics = get_metrics_backend()
+    if metrics.enabled:
+        tags = {'model': model.__name__}
+        started = time.time()
+
+    acquired = acquire_googleadwords_lock(model, identifier)
+    if not acquired:
+        logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", model.__name__, identifier)
+        if metrics.enabled:
+            metrics.incr('lock.contended', tags=tags)
+        acquired = acquire_googleadwords_lock(model, identifier, blocking=True, timeout=timeout)
+
+    if not acquired:
+        if metrics.enabled:
+            metrics.incr('lock.timeout', tags=tags)
+        raise LockTimeoutError(model, identifier)
+
+    if metrics.enabled:
+        acquired_at = time.time()
+        metrics.incr('lock.acquired', tags=tags)
+        metrics.timing('lock.wait', acquired_at - started, tags=tags)
+
+    try:
+        logger.debug("Success acquire_googleadwords_lock: %s:%s", model.__name__, identifier)
+        yield
+    finally:
+        logger.debug("Releasing acquire_googleadwords_lock: %s:%s", model.__name__, identifier)
+        release_googleadwords_lock(model, identifier)
+        if metrics.enabled:
+            metrics.timing('lock.held', time.time() - acquired_at, tags=tags)
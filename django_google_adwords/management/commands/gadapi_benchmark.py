@@ -0,0 +1,104 @@
+from optparse import make_option
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from ...loaders import IMPORT_MODES
+from ...models import Account
+
+
+class Command(BaseCommand):
+    help = "Benchmark importing generated reports, results are written as JSON."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--levels', default=','.join(Account.SYNC_LEVELS),
+                    help="Comma separated levels to benchmark, default '%default'."),
+        make_option('--accounts', type='int', default=1),
+        make_option('--campaigns', type='int', default=5, help="Campaigns per account."),
+        make_option('--ad-groups', type='int', default=5, dest='ad_groups', help="Ad groups per campaign."),
+        make_option('--ads', type='int', default=4, help="Ads per ad group."),
+        make_option('--days', type='int', default=30),
+        make_option('--devices', type='int', default=3, help="Devices in account reports."),
+        make_option('--seed', type='int', default=0),
+        make_option('--trace-memory', action='store_true', default=False, dest='trace_memory',
+                    help="Trace the peak memory of each import, slows imports."),
+        make_option('--download', action='store_true', default=False,
+                    help="Benchmark downloading reports from a local fake AdWords API instead of importing."),
+        make_option('--downloads', type='int', default=20),
+        make_option('--concurrency', type='int', default=4, help="Concurrent downloads."),
+        make_option('--latency', type='float', default=0, help="Seconds the fake API waits before responding."),
+        make_option('--bandwidth', type='int', default=None, help="Bytes per second the fake API responds at."),
+        make_option('--rate-exceeded-every', type='int', default=None, dest='rate_exceeded_every',
+                    help="Respond to every nth fake API request with a RateExceededError."),
+        make_option('--retry-after', type='int', default=1, dest='retry_after',
+                    help="The retryAfterSeconds of RateExceededErrors."),
+        make_option('--import-mode', default=None, dest='import_mode',
+                    help="GOOGLEADWORDS_IMPORT_MODE to import with, ie.. copy, default the setting."),
+        make_option('--check-budgets', action='store_true', default=False, dest='check_budgets',
+                    help="Fail if an import exceeds its query or cache operation budget."),
+        make_option('--check-indexes', action='store_true', default=False, dest='check_indexes',
+                    help="Fail if an index the period queries depend on is missing."),
+        make_option('--output', default=None, help="File to write results to, default stdout."),
+        make_option('--noinput', action='store_false', dest='interactive', default=True,
+                    help="Destroy an existing benchmark database without prompting."),
+    )
+
+    def handle(self, *args, **options):
+        from ...benchmarks.fake_api import FakeAdWordsServer
+        from ...benchmarks.generator import ReportGenerator
+        from ...benchmarks.suite import DownloadBenchmark, ImportBenchmark
+
+        levels = [level for level in options['levels'].split(',') if level]
+        if options['import_mode'] and options['import_mode'] not in IMPORT_MODES:
+            raise CommandError("Unknown import mode '%s', expected one of %s." % (options['import_mode'], ', '.join(IMPORT_MODES)))
+        for level in levels:
+            if level not in Account.SYNC_LEVELS:
+                raise CommandError("Unknown level '%s', expected one of %s." % (level, ', '.join(Account.SYNC_LEVELS)))
+
+        generator = ReportGenerator(accounts=options['accounts'],
+                                    campaigns=options['campaigns'],
+                                    ad_groups=options['ad_groups'],
+                                    ads=options['ads'],
+                                    days=options['days'],
+                                    devices=options['devices'],
+                                    seed=options['seed'])
+
+        # Benchmark against a throw away database, like the test runner does.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=not options['interactive'])
+        try:
+            if options['download']:
+                server = FakeAdWordsServer(generator,
+                                           latency=options['latency'],
+                                           bandwidth=options['bandwidth'],
+                                           rate_exceeded_every=options['rate_exceeded_every'],
+                                           retry_after_seconds=options['retry_after'])
+                with server:
+                    results = DownloadBenchmark(server, levels=levels,
+                                                downloads=options['downloads'],
+                                                concurrency=options['concurrency']).run()
+            else:
+                benchmark = ImportBenchmark(generator, levels=levels, trace_memory=options['trace_memory'])
+                with override_settings(GOOGLEADWORDS_IMPORT_MODE=options['import_mode'] or settings.GOOGLEADWORDS_IMPORT_MODE):
+                    results = benchmark.run()
+                if options['check_budgets']:
+                    results['budgets_exceeded'] = benchmark.check_budgets(results)
+                if options['check_indexes']:
+                    results['indexes_missing'] = benchmark.check_indexes()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+        if results.get('budgets_exceeded'):
+            raise CommandError("Budgets exceeded:\n%s" % '\n'.join(results['budgets_exceeded']))
+        if results.get('indexes_missing'):
+            raise CommandError("Indexes missing:\n%s" % '\n'.join(results['indexes_missing']))
@@ -0,0 +1,40 @@
+from optparse import make_option
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...partitioning import supports_partitioning, partitioned_models, partition_table, \
+    unpartition_table, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = "Partition the daily metrics tables by month (PostgreSQL 11 and later), see GOOGLEADWORDS_PARTITION_METRICS."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--months-ahead', type='int', default=None, dest='months_ahead',
+                    help="Upcoming months to create partitions for, default GOOGLEADWORDS_PARTITION_MONTHS_AHEAD."),
+        make_option('--unpartition', action='store_true', default=False,
+                    help="Convert the partitioned tables back into plain tables."),
+        make_option('--maintain', action='store_true', default=False,
+                    help="Create the upcoming partitions and drop those past retention, as the maintain_partitions task does."),
+    )
+
+    def handle(self, *args, **options):
+        if not supports_partitioning(connection):
+            raise CommandError("Partitioning needs PostgreSQL 11 or later.")
+
+        if options['maintain']:
+            for model_name, months in maintain_partitions(connection).items():
+                for month in months:
+                    self.stdout.write("Dropped the %s partition of %s." % (month.strftime('%Y-%m'), model_name))
+            return
+
+        for model in partitioned_models(apps):
+            if options['unpartition']:
+                changed = unpartition_table(connection, model)
+            else:
+                changed = partition_table(connection, model, options['months_ahead'])
+            if changed and int(options['verbosity']) > 1:
+                self.stdout.write("%s table '%s'." % ('Unpartitioned' if options['unpartition'] else 'Partitioned',
+                                                      model._meta.db_table))
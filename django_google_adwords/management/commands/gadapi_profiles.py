@@ -0,0 +1,86 @@
+from collections import defaultdict
+from optparse import make_option
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...profiling import EXTENSIONS, PROFILER_CPROFILE, get_profile_storage
+
+
+class Command(BaseCommand):
+    help = "List the stored task profiles or summarize one of them."
+    args = "[list | summary <name>]"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--limit', type='int', default=25, help="Functions to summarize, default %default."),
+        make_option('--sort', default='cumulative',
+                    help="Sort cProfile summaries by this pstats key, default '%default'. Sampled profiles "
+                         "are sorted by inclusive samples unless 'self' is given."),
+    )
+
+    def handle(self, *args, **options):
+        command = args[0] if args else 'list'
+        storage, root = get_profile_storage()
+
+        if command == 'list':
+            self.list(storage, root)
+        elif command == 'summary':
+            if len(args) != 2:
+                raise CommandError("Usage: summary <name>")
+            self.summary(storage, root, args[1], options['limit'], options['sort'])
+        else:
+            raise CommandError("Unknown command '%s', expected list or summary." % command)
+
+    def list(self, storage, root):
+        try:
+            _, names = storage.listdir(root)
+        except OSError:
+            names = []
+        names = sorted(name for name in names if os.path.splitext(name)[1] in EXTENSIONS.values())
+        for name in names:
+            path = os.path.join(root, name)
+            self.stdout.write('%s\t%s\t%s' % (name, storage.size(path), storage.modified_time(path).isoformat()))
+
+    def summary(self, storage, root, name, limit, sort):
+        path = os.path.join(root, name)
+        if not storage.exists(path):
+            raise CommandError("No profile '%s'." % name)
+
+        if name.endswith(EXTENSIONS[PROFILER_CPROFILE]):
+            self.summarize_cprofile(storage, path, limit, sort)
+        else:
+            self.summarize_folded(storage, path, limit, sort)
+
+    def summarize_cprofile(self, storage, path, limit, sort):
+        # pstats only reads from the local file system.
+        with tempfile.NamedTemporaryFile() as f:
+            with storage.open(path, 'rb') as profile:
+                shutil.copyfileobj(profile, f)
+            f.flush()
+            stats = pstats.Stats(f.name, stream=self.stdout)
+            stats.sort_stats(sort).print_stats(limit)
+
+    def summarize_folded(self, storage, path, limit, sort):
+        total = 0
+        inclusive = defaultdict(int)
+        exclusive = defaultdict(int)
+        with storage.open(path, 'rb') as profile:
+            for line in profile:
+                stack, _, count = line.decode('utf-8').rstrip().rpartition(' ')
+                if not stack:
+                    continue
+                count = int(count)
+                total += count
+                frames = stack.split(';')
+                exclusive[frames[-1]] += count
+                for frame in set(frames):
+                    inclusive[frame] += count
+
+        key = exclusive if sort == 'self' else inclusive
+        self.stdout.write('%s samples' % total)
+        self.stdout.write('%8s %8s  %s' % ('self', 'total', 'function'))
+        for frame in sorted(key, key=lambda frame: -key[frame])[:limit]:
+            self.stdout.write('%8s %8s  %s' % (exclusive[frame], inclusive[frame], frame))
@@ -0,0 +1,31 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Account, LEVEL_ROLLUP_MODELS
+
+
+class Command(BaseCommand):
+    help = "Rebuild the week and month metrics rollups from the daily metrics."
+    args = "[account_id ...]"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--levels', default=','.join(Account.SYNC_LEVELS),
+                    help="Comma separated levels to rebuild, default '%default'."),
+    )
+
+    def handle(self, *args, **options):
+        levels = [level for level in options['levels'].split(',') if level]
+        for level in levels:
+            if level not in Account.SYNC_LEVELS:
+                raise CommandError("Unknown level '%s', expected one of %s." % (level, ', '.join(Account.SYNC_LEVELS)))
+
+        accounts = Account.objects.all()
+        if args:
+            accounts = accounts.filter(account_id__in=[int(account_id.replace('-', '')) for account_id in args])
+
+        for account in accounts:
+            for level in levels:
+                LEVEL_ROLLUP_MODELS[level].objects.rebuild(account)
+            if int(options['verbosity']) > 1:
+                self.stdout.write("Rebuilt the rollups of account '%s'." % account)
@@ -0,0 +1,151 @@
+import gc
+import logging
+import os
+import sys
+
+from django.conf import settings
+from django.db import reset_queries
+
+from django_google_adwords.errors import ImportMemoryLimitError
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover - Python 2
+    tracemalloc = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss():
+    """
+    Returns the resident set size of this process in bytes, falling back to the peak
+    resident set size where the current size can't be determined.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes, or None if unknown.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, OS X bytes.
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class ImportMemoryGuard(object):
+    """
+    Bounds and tracks the memory used while importing the rows of a report.
+
+    Rows passed through rows() are counted and every chunk_size rows a checkpoint is made.
+    In bounded mode a checkpoint resets Django's query log, collects garbage and raises
+    ImportMemoryLimitError once the resident set size exceeds memory_limit bytes, so a
+    runaway import fails its task rather than having the worker killed. When tracking,
+    a tracemalloc snapshot is taken at each checkpoint and the largest allocation growth
+    since the previous chunk is logged. On exit a final checkpoint is made if rows remain
+    since the last.
+
+    peak_rss is the largest resident set size sampled, at each checkpoint when bounded or
+    tracking and always on exit, so it's only None where the size can't be determined.
+
+    Use as a context manager around the import and return result() from the task.
+    """
+
+    def __init__(self, bounded=False, memory_limit=None, chunk_size=1000, track=False):
+        self.bounded = bounded
+        self.memory_limit = memory_limit
+        self.chunk_size = chunk_size
+        self.track = track and tracemalloc is not None
+        self.row_count = 0
+        self.chunk_count = 0
+        self.checkpointed_rows = 0
+        self.peak_rss = None
+        self.traced_peak = None
+        self._snapshot = None
+        self._started_tracing = False
+
+    @classmethod
+    def from_settings(cls):
+        return cls(bounded=settings.GOOGLEADWORDS_IMPORT_BOUNDED_MEMORY,
+                   memory_limit=settings.GOOGLEADWORDS_IMPORT_MEMORY_LIMIT,
+                   chunk_size=settings.GOOGLEADWORDS_IMPORT_CHUNK_SIZE,
+                   track=settings.GOOGLEADWORDS_IMPORT_MEMORY_TRACKING)
+
+    def __enter__(self):
+        if self.track and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.row_count > self.checkpointed_rows:
+            self.checkpoint()
+        self.sample_rss()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._snapshot = None
+
+    def rows(self, rows):
+        """
+        Yield each of rows, making a checkpoint every chunk_size rows.
+        """
+        for row in rows:
+            yield row
+            self.row_count += 1
+            if self.row_count % self.chunk_size == 0:
+                self.checkpoint()
+
+    def sample_rss(self):
+        """
+        Returns the current resident set size, recording it in peak_rss.
+        """
+        rss = current_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        return rss
+
+    def checkpoint(self):
+        self.chunk_count += 1
+        self.checkpointed_rows = self.row_count
+
+        if self.bounded:
+            reset_queries()
+            gc.collect()
+
+        if self.bounded or self.track:
+            rss = self.sample_rss()
+            if self.memory_limit and rss and rss > self.memory_limit:
+                raise ImportMemoryLimitError(self.memory_limit, rss)
+
+        if self.track:
+            _, traced_peak = tracemalloc.get_traced_memory()
+            self.traced_peak = max(self.traced_peak or 0, traced_peak)
+            snapshot = tracemalloc.take_snapshot()
+            if self._snapshot is not None and logger.isEnabledFor(logging.DEBUG):
+                for stat in snapshot.compare_to(self._snapshot, 'lineno')[:3]:
+                    logger.debug("Import chunk %s: %s", self.chunk_count, stat)
+            self._snapshot = snapshot
+
+    def result(self):
+        """
+        Returns a dict describing the import, suitable for a task result.
+        """
+        return {
+            'rows': self.row_count,
+            'chunks': self.chunk_count,
+            'peak_rss': self.peak_rss,
+            'traced_peak': self.traced_peak,
+        }
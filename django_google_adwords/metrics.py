@@ -0,0 +1,232 @@
+from collections import defaultdict
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.six.moves.urllib.parse import quote
+from django.utils.six.moves.urllib.request import Request, urlopen
+
+
+logger = logging.getLogger(__name__)
+
+
+class BaseMetricsBackend(object):
+    """
+    A metrics backend records counters and timings, each optionally tagged with a dict.
+
+    Callers should check enabled before doing any work to produce a metric so that the
+    default NullMetricsBackend costs next to nothing.
+    """
+    enabled = True
+
+    def incr(self, name, value=1, tags=None):
+        raise NotImplementedError
+
+    def timing(self, name, seconds, tags=None):
+        raise NotImplementedError
+
+
+class NullMetricsBackend(BaseMetricsBackend):
+    """
+    Discards all metrics, the default.
+    """
+    enabled = False
+
+    def incr(self, name, value=1, tags=None):
+        pass
+
+    def timing(self, name, seconds, tags=None):
+        pass
+
+
+class Histogram(object):
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60, 300)
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(self.BUCKETS)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+    def as_dict(self):
+        return {'count': self.count,
+                'sum': self.sum,
+                'buckets': dict(zip(self.BUCKETS, self.buckets))}
+
+
+class InProcessMetricsBackend(BaseMetricsBackend):
+    """
+    Keeps counters and timing histograms in memory, see snapshot().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = defaultdict(float)
+            self.histograms = defaultdict(Histogram)
+
+    def key(self, name, tags):
+        return name, tuple(sorted((tags or {}).items()))
+
+    def incr(self, name, value=1, tags=None):
+        with self.lock:
+            self.counters[self.key(name, tags)] += value
+
+    def timing(self, name, seconds, tags=None):
+        with self.lock:
+            self.histograms[self.key(name, tags)].observe(seconds)
+
+    def snapshot(self):
+        """
+        Returns a dict of counters and histograms keyed by (name, tags).
+        """
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'histograms': dict((key, histogram.as_dict()) for key, histogram in self.histograms.items())}
+
+
+class PrometheusMetricsBackend(InProcessMetricsBackend):
+    """
+    Keeps metrics in memory and renders them in the Prometheus text exposition format.
+
+    The metrics are those of the process, ie.. a Celery worker's are not visible to a view
+    in the web process. Set GOOGLEADWORDS_METRICS_PROMETHEUS_PUSHGATEWAY to have each process
+    push its metrics to a Prometheus Pushgateway, at most every
+    GOOGLEADWORDS_METRICS_PROMETHEUS_PUSH_INTERVAL seconds as they're recorded, grouped by
+    instance (host and pid). Pushes are made from a background thread so recording a metric
+    never waits on the Pushgateway. Metrics recorded since a process's last push are lost
+    with it.
+    """
+
+    def __init__(self):
+        super(PrometheusMetricsBackend, self).__init__()
+        self.pushed = None
+        self.pusher = None
+
+    def incr(self, name, value=1, tags=None):
+        super(PrometheusMetricsBackend, self).incr(name, value, tags)
+        self.maybe_push()
+
+    def timing(self, name, seconds, tags=None):
+        super(PrometheusMetricsBackend, self).timing(name, seconds, tags)
+        self.maybe_push()
+
+    def push_url(self):
+        instance = '%s-%s' % (socket.gethostname(), os.getpid())
+        return '%s/metrics/job/%s/instance/%s' % (settings.GOOGLEADWORDS_METRICS_PROMETHEUS_PUSHGATEWAY.rstrip('/'),
+                                                  quote(settings.GOOGLEADWORDS_METRICS_PREFIX, safe=''),
+                                                  quote(instance, safe=''))
+
+    def maybe_push(self):
+        """
+        Start a push in a background thread (see pusher) if the last push was at least
+        GOOGLEADWORDS_METRICS_PROMETHEUS_PUSH_INTERVAL seconds ago.
+        """
+        if not settings.GOOGLEADWORDS_METRICS_PROMETHEUS_PUSHGATEWAY:
+            return
+        now = time.time()
+        with self.lock:
+            if self.pushed is not None and now - self.pushed < settings.GOOGLEADWORDS_METRICS_PROMETHEUS_PUSH_INTERVAL:
+                return
+            self.pushed = now
+        self.pusher = threading.Thread(target=self.push, name='googleadwords-metrics-push')
+        self.pusher.daemon = True
+        self.pusher.start()
+
+    def push(self):
+        """
+        Replace the metrics of this process's group on the Pushgateway with render().
+        """
+        request = Request(self.push_url(), data=self.render().encode('utf-8'),
+                          headers={'Content-Type': 'text/plain; version=0.0.4'})
+        request.get_method = lambda: 'PUT'
+        try:
+            urlopen(request, timeout=settings.GOOGLEADWORDS_METRICS_PROMETHEUS_PUSH_TIMEOUT).close()
+        except (IOError, socket.error):
+            logger.debug("Failed to push metrics to '%s'.", settings.GOOGLEADWORDS_METRICS_PROMETHEUS_PUSHGATEWAY)
+
+    def metric_name(self, name):
+        return ('%s_%s' % (settings.GOOGLEADWORDS_METRICS_PREFIX, name)).replace('.', '_')
+
+    def labels(self, tags, **extra):
+        tags = list(tags) + sorted(extra.items())
+        if not tags:
+            return ''
+        return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('"', '\\"')) for k, v in tags)
+
+    def render(self):
+        lines = []
+        snapshot = self.snapshot()
+
+        for (name, tags), value in sorted(snapshot['counters'].items()):
+            metric = self.metric_name(name) + '_total'
+            lines.append('# TYPE %s counter' % metric)
+            lines.append('%s%s %s' % (metric, self.labels(tags), value))
+
+        for (name, tags), histogram in sorted(snapshot['histograms'].items()):
+            metric = self.metric_name(name) + '_seconds'
+            lines.append('# TYPE %s histogram' % metric)
+            cumulative = 0
+            for bound in Histogram.BUCKETS:
+                cumulative += histogram['buckets'][bound]
+                lines.append('%s_bucket%s %s' % (metric, self.labels(tags, le=bound), cumulative))
+            lines.append('%s_bucket%s %s' % (metric, self.labels(tags, le='+Inf'), histogram['count']))
+            lines.append('%s_sum%s %s' % (metric, self.labels(tags), histogram['sum']))
+            lines.append('%s_count%s %s' % (metric, self.labels(tags), histogram['count']))
+
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdMetricsBackend(BaseMetricsBackend):
+    """
+    Sends metrics to statsd over UDP, tag values are appended to the metric name
+    (ie.. googleadwords.lock.wait.Account).
+    """
+
+    def __init__(self):
+        self.address = (settings.GOOGLEADWORDS_METRICS_STATSD_HOST, settings.GOOGLEADWORDS_METRICS_STATSD_PORT)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def metric_name(self, name, tags):
+        parts = [settings.GOOGLEADWORDS_METRICS_PREFIX, name]
+        parts.extend(str(value).replace('.', '_') for _, value in sorted((tags or {}).items()))
+        return '.'.join(parts)
+
+    def send(self, data):
+        try:
+            self.socket.sendto(data.encode('utf-8'), self.address)
+        except socket.error:
+            logger.debug("Failed to send metric '%s' to statsd.", data)
+
+    def incr(self, name, value=1, tags=None):
+        self.send('%s:%s|c' % (self.metric_name(name, tags), value))
+
+    def timing(self, name, seconds, tags=None):
+        self.send('%s:%d|ms' % (self.metric_name(name, tags), seconds * 1000))
+
+
+_metrics_backends = {}
+
+
+def get_metrics_backend():
+    """
+    Returns the metrics backend specified by GOOGLEADWORDS_METRICS_BACKEND.
+    """
+    path = settings.GOOGLEADWORDS_METRICS_BACKEND
+    if path not in _metrics_backends:
+        _metrics_backends[path] = import_string(path)()
+    return _metrics_backends[path]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0003_auto_20160620_1402'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportfile',
+            name='host',
+            field=models.CharField(help_text='Host the report was downloaded on', max_length=255, null=True, blank=True),
+        ),
+    ]
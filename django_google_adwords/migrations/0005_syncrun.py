@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0004_reportfile_host'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('level', models.CharField(max_length=32, choices=[('account', 'Account'), ('campaign', 'Campaign'), ('ad_group', 'Ad Group'), ('ad', 'Ad')])),
+                ('status', models.CharField(default='started', max_length=32, choices=[('started', 'Started'), ('downloaded', 'Downloaded'), ('finished', 'Finished')])),
+                ('started', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(null=True, blank=True)),
+                ('duration', models.FloatField(help_text='Started to finished', null=True, blank=True)),
+                ('auth_seconds', models.FloatField(null=True, blank=True)),
+                ('download_seconds', models.FloatField(null=True, blank=True)),
+                ('report_bytes', models.BigIntegerField(null=True, blank=True)),
+                ('import_seconds', models.FloatField(null=True, blank=True)),
+                ('parse_seconds', models.FloatField(null=True, blank=True)),
+                ('db_read_seconds', models.FloatField(null=True, blank=True)),
+                ('db_write_seconds', models.FloatField(null=True, blank=True)),
+                ('finish_seconds', models.FloatField(null=True, blank=True)),
+                ('rows', models.IntegerField(help_text='Rows in the report', null=True, blank=True)),
+                ('rows_inserted', models.IntegerField(null=True, blank=True)),
+                ('rows_updated', models.IntegerField(null=True, blank=True)),
+                ('rows_skipped', models.IntegerField(null=True, blank=True)),
+                ('account', models.ForeignKey(related_name='sync_runs', to='django_google_adwords.Account')),
+            ],
+            options={
+                'get_latest_by': 'started',
+            },
+        ),
+    ]
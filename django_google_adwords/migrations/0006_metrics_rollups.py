@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0005_syncrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountMetricsRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('grain', models.CharField(max_length=5, choices=[('week', 'Week'), ('month', 'Month')])),
+                ('period_start', models.DateField()),
+                ('period_finish', models.DateField()),
+                ('rows', models.IntegerField(default=0, help_text='Daily rows rolled up')),
+                ('impressions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('impressions_count', models.IntegerField(default=0)),
+                ('clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('clicks_count', models.IntegerField(default=0)),
+                ('cost_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_count', models.IntegerField(default=0)),
+                ('conversions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('conversions_count', models.IntegerField(default=0)),
+                ('converted_clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('converted_clicks_count', models.IntegerField(default=0)),
+                ('total_conv_value_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('total_conv_value_count', models.IntegerField(default=0)),
+                ('avg_cpc_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpc_count', models.IntegerField(default=0)),
+                ('avg_cpm_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpm_count', models.IntegerField(default=0)),
+                ('avg_position_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_position_count', models.IntegerField(default=0)),
+                ('ctr_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('ctr_count', models.IntegerField(default=0)),
+                ('click_conversion_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('click_conversion_rate_count', models.IntegerField(default=0)),
+                ('conv_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('conv_rate_count', models.IntegerField(default=0)),
+                ('cost_converted_click_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_converted_click_count', models.IntegerField(default=0)),
+                ('cost_conv_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_conv_count', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('device', models.CharField(max_length=255, choices=[('Other', 'Other'), ('Computers', 'Computers'), ('Mobile devices with full browsers', 'Mobile devices with full browsers'), ('Tablets with full browsers', 'Tablets with full browsers')])),
+                ('account', models.ForeignKey(related_name='metrics_rollups', to='django_google_adwords.Account')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignMetricsRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('grain', models.CharField(max_length=5, choices=[('week', 'Week'), ('month', 'Month')])),
+                ('period_start', models.DateField()),
+                ('period_finish', models.DateField()),
+                ('rows', models.IntegerField(default=0, help_text='Daily rows rolled up')),
+                ('impressions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('impressions_count', models.IntegerField(default=0)),
+                ('clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('clicks_count', models.IntegerField(default=0)),
+                ('cost_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_count', models.IntegerField(default=0)),
+                ('conversions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('conversions_count', models.IntegerField(default=0)),
+                ('converted_clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('converted_clicks_count', models.IntegerField(default=0)),
+                ('total_conv_value_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('total_conv_value_count', models.IntegerField(default=0)),
+                ('avg_cpc_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpc_count', models.IntegerField(default=0)),
+                ('avg_cpm_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpm_count', models.IntegerField(default=0)),
+                ('avg_position_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_position_count', models.IntegerField(default=0)),
+                ('ctr_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('ctr_count', models.IntegerField(default=0)),
+                ('click_conversion_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('click_conversion_rate_count', models.IntegerField(default=0)),
+                ('conv_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('conv_rate_count', models.IntegerField(default=0)),
+                ('cost_converted_click_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_converted_click_count', models.IntegerField(default=0)),
+                ('cost_conv_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_conv_count', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(related_name='metrics_rollups', to='django_google_adwords.Campaign')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AdGroupMetricsRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('grain', models.CharField(max_length=5, choices=[('week', 'Week'), ('month', 'Month')])),
+                ('period_start', models.DateField()),
+                ('period_finish', models.DateField()),
+                ('rows', models.IntegerField(default=0, help_text='Daily rows rolled up')),
+                ('impressions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('impressions_count', models.IntegerField(default=0)),
+                ('clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('clicks_count', models.IntegerField(default=0)),
+                ('cost_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_count', models.IntegerField(default=0)),
+                ('conversions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('conversions_count', models.IntegerField(default=0)),
+                ('converted_clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('converted_clicks_count', models.IntegerField(default=0)),
+                ('total_conv_value_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('total_conv_value_count', models.IntegerField(default=0)),
+                ('avg_cpc_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpc_count', models.IntegerField(default=0)),
+                ('avg_cpm_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpm_count', models.IntegerField(default=0)),
+                ('avg_position_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_position_count', models.IntegerField(default=0)),
+                ('ctr_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('ctr_count', models.IntegerField(default=0)),
+                ('click_conversion_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('click_conversion_rate_count', models.IntegerField(default=0)),
+                ('conv_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('conv_rate_count', models.IntegerField(default=0)),
+                ('cost_converted_click_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_converted_click_count', models.IntegerField(default=0)),
+                ('cost_conv_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_conv_count', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('ad_group', models.ForeignKey(related_name='metrics_rollups', to='django_google_adwords.AdGroup')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AdMetricsRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('grain', models.CharField(max_length=5, choices=[('week', 'Week'), ('month', 'Month')])),
+                ('period_start', models.DateField()),
+                ('period_finish', models.DateField()),
+                ('rows', models.IntegerField(default=0, help_text='Daily rows rolled up')),
+                ('impressions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('impressions_count', models.IntegerField(default=0)),
+                ('clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('clicks_count', models.IntegerField(default=0)),
+                ('cost_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_count', models.IntegerField(default=0)),
+                ('conversions_sum', models.BigIntegerField(null=True, blank=True)),
+                ('conversions_count', models.IntegerField(default=0)),
+                ('converted_clicks_sum', models.BigIntegerField(null=True, blank=True)),
+                ('converted_clicks_count', models.IntegerField(default=0)),
+                ('total_conv_value_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('total_conv_value_count', models.IntegerField(default=0)),
+                ('avg_cpc_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpc_count', models.IntegerField(default=0)),
+                ('avg_cpm_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_cpm_count', models.IntegerField(default=0)),
+                ('avg_position_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('avg_position_count', models.IntegerField(default=0)),
+                ('ctr_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('ctr_count', models.IntegerField(default=0)),
+                ('click_conversion_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('click_conversion_rate_count', models.IntegerField(default=0)),
+                ('conv_rate_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('conv_rate_count', models.IntegerField(default=0)),
+                ('cost_converted_click_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_converted_click_count', models.IntegerField(default=0)),
+                ('cost_conv_sum', models.DecimalField(null=True, max_digits=18, decimal_places=2, blank=True)),
+                ('cost_conv_count', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('ad', models.ForeignKey(related_name='metrics_rollups', to='django_google_adwords.Ad')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountmetricsrollup',
+            unique_together=set([('account', 'device', 'grain', 'period_start')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='campaignmetricsrollup',
+            unique_together=set([('campaign', 'grain', 'period_start')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='adgroupmetricsrollup',
+            unique_together=set([('ad_group', 'grain', 'period_start')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='admetricsrollup',
+            unique_together=set([('ad', 'grain', 'period_start')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0006_metrics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricsCoverage',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('level', models.CharField(max_length=32, choices=[('account', 'Account'), ('campaign', 'Campaign'), ('ad_group', 'Ad Group'), ('ad', 'Ad')])),
+                ('days', models.TextField(default='[]', help_text='JSON list of [first, last] day ordinals')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(related_name='coverage', to='django_google_adwords.Account')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='metricscoverage',
+            unique_together=set([('account', 'level')]),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations
+
+from django_google_adwords.coverage import merge_days
+
+
+# The daily metrics model and its lookup to the account at each level
+LEVEL_METRICS = (
+    ('account', 'DailyAccountMetrics', 'account'),
+    ('campaign', 'DailyCampaignMetrics', 'campaign__account'),
+    ('ad_group', 'DailyAdGroupMetrics', 'ad_group__campaign__account'),
+    ('ad', 'DailyAdMetrics', 'ad__ad_group__campaign__account'),
+)
+
+
+def backfill_coverage(apps, schema_editor):
+    Account = apps.get_model('django_google_adwords', 'Account')
+    MetricsCoverage = apps.get_model('django_google_adwords', 'MetricsCoverage')
+    for account in Account.objects.all().iterator():
+        for level, model_name, lookup in LEVEL_METRICS:
+            model = apps.get_model('django_google_adwords', model_name)
+            days = model.objects.filter(**{lookup: account}).dates('day', 'day')
+            ranges = merge_days([], days)
+            if ranges:
+                MetricsCoverage.objects.update_or_create(account=account, level=level,
+                                                         defaults={'days': json.dumps(ranges)})
+
+
+def remove_coverage(apps, schema_editor):
+    apps.get_model('django_google_adwords', 'MetricsCoverage').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0007_metricscoverage'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_coverage, remove_coverage),
+    ]
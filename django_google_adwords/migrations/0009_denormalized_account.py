@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0008_backfill_metricscoverage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adgroup',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+        migrations.AddField(
+            model_name='dailyadgroupmetrics',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+        migrations.AddField(
+            model_name='dailyadmetrics',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+        migrations.AddField(
+            model_name='adgroupmetricsrollup',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+        migrations.AddField(
+            model_name='admetricsrollup',
+            name='account',
+            field=models.ForeignKey(related_name='+', blank=True, to='django_google_adwords.Account', null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# The models with a denormalized account and their lookup to the account
+ACCOUNT_LOOKUPS = (
+    ('AdGroup', 'campaign__account'),
+    ('Ad', 'ad_group__campaign__account'),
+    ('DailyAdGroupMetrics', 'ad_group__campaign__account'),
+    ('DailyAdMetrics', 'ad__ad_group__campaign__account'),
+    ('AdGroupMetricsRollup', 'ad_group__campaign__account'),
+    ('AdMetricsRollup', 'ad__ad_group__campaign__account'),
+)
+
+
+def backfill_account(apps, schema_editor):
+    Account = apps.get_model('django_google_adwords', 'Account')
+    for account in Account.objects.all().iterator():
+        for model_name, lookup in ACCOUNT_LOOKUPS:
+            model = apps.get_model('django_google_adwords', model_name)
+            model.objects.filter(**{lookup: account}).update(account=account)
+
+
+def clear_account(apps, schema_editor):
+    for model_name, _ in ACCOUNT_LOOKUPS:
+        apps.get_model('django_google_adwords', model_name).objects.update(account=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0009_denormalized_account'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_account, clear_account),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from django_google_adwords.indexes import create_covering_indexes, drop_covering_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0010_backfill_denormalized_account'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='dailyaccountmetrics',
+            index_together=set([('account', 'day'), ('account', 'device', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailycampaignmetrics',
+            index_together=set([('campaign', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyadgroupmetrics',
+            index_together=set([('ad_group', 'day'), ('account', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyadmetrics',
+            index_together=set([('ad', 'day'), ('account', 'day')]),
+        ),
+        # PostgreSQL 11 and later only
+        migrations.RunPython(create_covering_indexes, drop_covering_indexes),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+from django_google_adwords.partitioning import supports_partitioning, partitioned_models, \
+    partition_table, unpartition_table
+
+
+def partition_metrics(apps, schema_editor):
+    if settings.GOOGLEADWORDS_PARTITION_METRICS and supports_partitioning(schema_editor.connection):
+        for model in partitioned_models(apps):
+            partition_table(schema_editor.connection, model)
+
+
+def unpartition_metrics(apps, schema_editor):
+    if supports_partitioning(schema_editor.connection):
+        for model in partitioned_models(apps):
+            unpartition_table(schema_editor.connection, model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0011_metrics_indexes'),
+    ]
+
+    operations = [
+        # Only with GOOGLEADWORDS_PARTITION_METRICS, see django_google_adwords.partitioning
+        migrations.RunPython(partition_metrics, unpartition_metrics),
+    ]
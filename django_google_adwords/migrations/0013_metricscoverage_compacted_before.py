@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0012_partition_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricscoverage',
+            name='compacted_before',
+            field=models.DateField(help_text='The daily metrics before have been compacted into the rollups', null=True, blank=True),
+        ),
+    ]
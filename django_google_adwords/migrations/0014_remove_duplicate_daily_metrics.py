@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+# The daily metrics models and their natural key, made unique by 0015_daily_metrics_unique_together
+NATURAL_KEYS = (
+    ('DailyAccountMetrics', ('account', 'device', 'day')),
+    ('DailyCampaignMetrics', ('campaign', 'day')),
+    ('DailyAdGroupMetrics', ('ad_group', 'day')),
+    ('DailyAdMetrics', ('ad', 'day')),
+)
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Delete all but the last imported of the rows sharing a natural key, which populate
+    should have prevented but concurrent imports without a lock could create.
+    """
+    for model_name, key in NATURAL_KEYS:
+        model = apps.get_model('django_google_adwords', model_name)
+        duplicates = model.objects.values(*key).annotate(rows=Count('pk'), last=Max('pk')).filter(rows__gt=1).order_by()
+        for duplicate in duplicates.iterator():
+            model.objects.filter(**dict((field, duplicate[field]) for field in key)).exclude(pk=duplicate['last']).delete()
+
+
+def keep_rows(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0013_metricscoverage_compacted_before'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, keep_rows),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0014_remove_duplicate_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailyaccountmetrics',
+            unique_together=set([('account', 'device', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyaccountmetrics',
+            index_together=set([('account', 'day')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailycampaignmetrics',
+            unique_together=set([('campaign', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailycampaignmetrics',
+            index_together=set([]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyadgroupmetrics',
+            unique_together=set([('ad_group', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyadgroupmetrics',
+            index_together=set([('account', 'day')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyadmetrics',
+            unique_together=set([('ad', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyadmetrics',
+            index_together=set([('account', 'day')]),
+        ),
+    ]
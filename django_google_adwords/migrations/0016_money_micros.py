@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+import django_google_adwords.fields
+from django_google_adwords.indexes import create_covering_indexes
+
+
+# The money fields of the daily metrics and their help_text
+MONEY_FIELDS = (
+    ('avg_cpc', 'Avg. CPC'),
+    ('avg_cpm', 'Avg. CPM'),
+    ('cost', 'Cost'),
+    ('cost_converted_click', 'Cost / converted click'),
+    ('cost_conv', 'Cost / conv.'),
+)
+
+# The daily metrics models, their lookup to the account and the currency_from of their money
+DAILY_MODELS = (
+    ('DailyAccountMetrics', 'account', 'account'),
+    ('DailyCampaignMetrics', 'campaign__account', 'campaign.account'),
+    ('DailyAdGroupMetrics', 'account', 'account'),
+    ('DailyAdMetrics', 'account', 'account'),
+)
+
+ROLLUP_MODELS = ('AccountMetricsRollup', 'CampaignMetricsRollup', 'AdGroupMetricsRollup', 'AdMetricsRollup',)
+
+
+def micros_name(field_name):
+    # The column the micros are converted into before replacing the money column
+    return '%s_in_micros' % field_name
+
+
+def to_micros(apps, schema_editor):
+    for model_name, _, _ in DAILY_MODELS:
+        apps.get_model('django_google_adwords', model_name).objects.update(
+            **dict((micros_name(field_name), F(field_name) * 1000000) for field_name, _ in MONEY_FIELDS))
+    for model_name in ROLLUP_MODELS:
+        apps.get_model('django_google_adwords', model_name).objects.update(
+            **dict(('%s_sum' % field_name, F('%s_sum' % field_name) * 1000000) for field_name, _ in MONEY_FIELDS))
+
+
+def from_micros(apps, schema_editor):
+    Account = apps.get_model('django_google_adwords', 'Account')
+    for model_name, lookup, _ in DAILY_MODELS:
+        model = apps.get_model('django_google_adwords', model_name)
+        model.objects.update(**dict((field_name, F(micros_name(field_name)) / 1000000.0) for field_name, _ in MONEY_FIELDS))
+        for account in Account.objects.exclude(currency=None).iterator():
+            model.objects.filter(**{lookup: account}).update(
+                **dict(('%s_currency' % field_name, account.currency) for field_name, _ in MONEY_FIELDS))
+    for model_name in ROLLUP_MODELS:
+        apps.get_model('django_google_adwords', model_name).objects.update(
+            **dict(('%s_sum' % field_name, F('%s_sum' % field_name) / 1000000.0) for field_name, _ in MONEY_FIELDS))
+
+
+def keep_covering_indexes(apps, schema_editor):
+    pass
+
+
+def money_micros_operations():
+    """
+    Returns the operations replacing the MoneyField (and currency) columns of the daily
+    metrics with MicrosMoneyFields, each applied only with GOOGLEADWORDS_MONEY_MICROS.
+    """
+    operations = [
+        # Dropping the money columns drops the covering indexes that INCLUDE cost
+        migrations.RunPython(keep_covering_indexes, create_covering_indexes),
+    ]
+    for model_name, _, _ in DAILY_MODELS:
+        for field_name, _ in MONEY_FIELDS:
+            operations.append(migrations.AddField(
+                model_name=model_name.lower(),
+                name=micros_name(field_name),
+                field=models.BigIntegerField(null=True, blank=True),
+            ))
+    operations.append(migrations.RunPython(to_micros, from_micros))
+    for model_name, _, currency_from in DAILY_MODELS:
+        for field_name, help_text in MONEY_FIELDS:
+            operations.extend([
+                migrations.RemoveField(model_name=model_name.lower(), name=field_name),
+                migrations.RemoveField(model_name=model_name.lower(), name='%s_currency' % field_name),
+                migrations.RenameField(model_name=model_name.lower(), old_name=micros_name(field_name), new_name=field_name),
+                migrations.AlterField(
+                    model_name=model_name.lower(),
+                    name=field_name,
+                    field=django_google_adwords.fields.MicrosMoneyField(currency_from=currency_from, default=0,
+                                                                        help_text=help_text, null=True, blank=True),
+                ),
+            ])
+    operations.append(migrations.RunPython(create_covering_indexes, keep_covering_indexes))
+    return [django_google_adwords.fields.IfMoneyMicros(operation) for operation in operations]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0015_daily_metrics_unique_together'),
+    ]
+
+    # The operations check GOOGLEADWORDS_MONEY_MICROS as they're applied, migrate back to
+    # 0015 before changing it. The fields.check_money_micros system check reports a setting
+    # changed after migrating.
+    operations = money_micros_operations()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_google_adwords', '0016_money_micros'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncrun',
+            name='status',
+            field=models.CharField(default='started', max_length=32, choices=[('started', 'Started'), ('downloaded', 'Downloaded'), ('finished', 'Finished'), ('abandoned', 'Abandoned')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='syncrun',
+            index_together=set([('account', 'level', 'finished')]),
+        ),
+    ]
@@ -1,41 +1,61 @@
+from collections import OrderedDict, namedtuple
 from contextlib import contextmanager
 from datetime import date, timedelta
 from decimal import Decimal
 import errno
 import gzip
+import io
+import json
 import logging
+import math
 import os
 import re
-import time
+import socket
+import sys
+import tempfile
+from functools import reduce
+from multiprocessing.pool import ThreadPool
+import operator
 
 from celery.canvas import group
 from celery.contrib.methods import task
 from django.conf import settings
-from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
 from django.core.files.base import File
-from django.db import models
-from django.db.models import Max
-from django.db.models.aggregates import Sum, Min, Avg
+from django.db import connection, models, transaction
+from django.db.models import Max, Q
+from django.db.models.aggregates import Sum, Avg, Count
+from django.db.models.constants import LOOKUP_SEP
 from django.db.models.fields import FieldDoesNotExist, DecimalField
 from django.db.models.query import QuerySet as _QuerySet
 from django.db.models.signals import post_delete
 from django.template.defaultfilters import truncatechars
+from django.utils import six, timezone
 from django_cereal.pickle import DJANGO_CEREAL_PICKLE
 from django_google_adwords.errors import *
-from django_google_adwords.helper import adwords_service
-from django_google_adwords.lock import release_googleadwords_lock
+from django_google_adwords.helper import adwords_service, data_import_queue, local_data_import_queue, \
+    queue_consumed
+from django_google_adwords.instrumentation import collect_stats, stage, timed_iteration
 from django_toolkit.celery.decorators import ensure_self
 from django_toolkit.csv.unicode import UnicodeReader
 from django_toolkit.db.models import QuerySetManager
 from djmoney.models.fields import MoneyField
 from googleads.errors import GoogleAdsError
 
-from .lock import acquire_googleadwords_lock
+from .loaders import get_metrics_loader
+from .lock import googleadwords_lock
+from .memory import ImportMemoryGuard
+from .aggregate_cache import get_or_compute, invalidate as invalidate_aggregates
+from .fields import MicrosMoneyField, money_aggregate, money_field, from_micros
+from .coverage import merge_days, covers, gaps, trim_days, days_before
+from .profiling import current_profiler, profile_thread, profiled
+from .rollups import GRAIN_DAY, GRAIN_WEEK, GRAIN_MONTH, plan_period, touched_periods, \
+    aggregate_field, add_totals, to_date, month_start, compacted_days
 from .settings import GoogleAdWordsConf  # import AppConf settings
+from .storage import get_report_file_cache
 
 
 logger = logging.getLogger(__name__)
-locking_logger = logging.getLogger('%s.locker' % __name__)
 
 remove_non_letters = re.compile('[^a-z|0-9|_]')
 
@@ -59,6 +79,10 @@ class PopulatingGoogleAdWordsQuerySet(_QuerySet):
             if value == ' --':
                 return None
 
+            # Micros money is stored as reported, see fields.MicrosMoneyField
+            elif isinstance(field, MicrosMoneyField):
+                return value
+
             # If money divide by 1,000,000 to get dollars/cents
             elif isinstance(field, MoneyField):
                 if int(value) > 0:
@@ -105,9 +129,10 @@ class PopulatingGoogleAdWordsQuerySet(_QuerySet):
             except DjangoValidationError as e:
                 raise ValidationError(field_name, e.messages)
 
-            if value != getattr(model, field_name):
+            # The attname, the micros of a MicrosMoneyField are set as reported
+            if value != getattr(model, field.attname):
                 update_fields.append(field_name)
-                setattr(model, field_name, value)
+                setattr(model, field.attname, value)
 
         # Now set all currency fields, do this outside the loop above incase someone redefines the field order
         for field_name in update_fields:
@@ -121,28 +146,290 @@ class PopulatingGoogleAdWordsQuerySet(_QuerySet):
 
         return update_fields
 
-    def _populate(self, data, ignore_fields=[], **kwargs):
+    def _populate(self, data, ignore_fields=[], defaults=None, **kwargs):
         """
         Low level get or create model which then populates the model with data.
 
         :param data: A dict of data as retrieved from the Google AdWords API.
+        :param defaults: A dict of field values to set that aren't used to retrieve the
+                         model instance, ie.. the denormalized account_id.
         :param **kwargs: Keyword args that are supplied to retrieve the model instance
                          and also to generate an instance if one does not exist.
         :return: models.Model
         """
         model_cls = self.model
-        try:
-            model = model_cls.objects.get(**kwargs)
-        except model_cls.DoesNotExist:
-            model = model_cls(**kwargs)
+        with stage('db_read'):
+            try:
+                model = model_cls.objects.get(**kwargs)
+            except model_cls.DoesNotExist:
+                model = model_cls(**kwargs)
         update_fields = self.populate_model_from_dict(model, data, ignore_fields)
-        if model.pk is None:
-            model.save()
-        else:
-            model.save(update_fields=update_fields)
+        for field_name, value in (defaults or {}).items():
+            if value != getattr(model, field_name):
+                update_fields.append(field_name)
+                setattr(model, field_name, value)
+        with stage('db_write') as counters:
+            if model.pk is None:
+                model.save()
+                action = 'inserted'
+            else:
+                model.save(update_fields=update_fields)
+                action = 'updated'
+            counters[action] = 1
+            counters['%s_%s' % (model_cls._meta.model_name, action)] = 1
+        return model
+
+    def _build(self, data, ignore_fields=[], defaults=None, **kwargs):
+        """
+        Returns an unsaved model instance populated with data, as _populate would without
+        retrieving or saving it, see loaders.ReplaceLoader.
+        """
+        model = self.model(**kwargs)
+        self.populate_model_from_dict(model, data, ignore_fields)
+        for field_name, value in (defaults or {}).items():
+            setattr(model, field_name, value)
         return model
 
 
+class PeriodAggregateQuerySet(PopulatingGoogleAdWordsQuerySet):
+    """
+    A QuerySet of daily metrics whose period aggregates are answered from the week and
+    month rollups (see MetricsRollup) when GOOGLEADWORDS_METRICS_ROLLUPS is set.
+
+    Rollups are per ROLLUP_MODEL.DIMENSIONS, so only querysets that are nothing more than
+    filters on those dimensions (ie.. account.metrics or DailyAccountMetrics.objects.desktop())
+    can be answered from them, anything else is aggregated from the daily rows.
+
+    When GOOGLEADWORDS_AGGREGATE_CACHE is set the period aggregates of querysets filtered
+    by account (ie.. account.metrics or DailyCampaignMetrics.objects.account(account)) are
+    cached until the account's next sync at LEVEL, see aggregate_cache.
+    """
+    LEVEL = None
+    ROLLUP_MODEL = None
+
+    # The metrics summary_for_period sums and averages, not every model has all of them
+    SUMMED_METRICS = ('impressions', 'clicks', 'cost', 'conversions', 'converted_clicks', 'total_conv_value',
+                      'invalid_clicks', 'view_through_conv',)
+    AVERAGED_METRICS = ('avg_cpc', 'avg_cpm', 'avg_position', 'ctr', 'click_conversion_rate', 'conv_rate',
+                        'cost_converted_click', 'cost_conv', 'content_impr_share', 'content_lost_is_rank',
+                        'content_lost_is_budget', 'search_exact_match_is', 'search_impr_share',
+                        'search_lost_is_rank', 'search_lost_is_budget', 'invalid_click_rate',
+                        'value_converted_click', 'value_conv',)
+    SUMMARY_METRICS = ('impressions', 'clicks', 'cost', 'ctr', 'avg_cpc', 'conversions',)
+
+    # The keyword arguments of each filter() applied, None once one can't be replayed on the rollups
+    _rollup_filters = ()
+
+    def _clone(self, *args, **kwargs):
+        clone = super(PeriodAggregateQuerySet, self)._clone(*args, **kwargs)
+        clone._rollup_filters = self._rollup_filters
+        return clone
+
+    def filter(self, *args, **kwargs):
+        clone = super(PeriodAggregateQuerySet, self).filter(*args, **kwargs)
+        if args or self._rollup_filters is None:
+            clone._rollup_filters = None
+        else:
+            clone._rollup_filters = self._rollup_filters + (kwargs,)
+        return clone
+
+    def account(self, account):
+        return self.filter(**{self.rollup_model().ACCOUNT_LOOKUP: account})
+
+    def within_period(self, start, finish):
+        return self.filter(day__gte=start, day__lte=finish)
+
+    def rollup_model(self):
+        return self.model._meta.apps.get_model(self.model._meta.app_label, self.ROLLUP_MODEL)
+
+    def aggregate_for_period(self, start, finish, *args, **kwargs):
+        """
+        Returns the aggregates (Sum or Avg of MetricsRollup.ROLLUP_FIELDS) over start to finish
+        inclusive, as within_period(start, finish).aggregate(*args, **kwargs) would, from the
+        rollups where they tile the period.
+        """
+        aggregates = OrderedDict((aggregate.default_alias, aggregate) for aggregate in args)
+        aggregates.update(kwargs)
+        fields = [aggregate_field(aggregate) for aggregate in aggregates.values()]
+        if None in fields:
+            # Aggregates of expressions can't be told apart in the cache key
+            return self._from_micros(self._aggregate_for_period(start, finish, aggregates), aggregates)
+        return self._cached('aggregate_for_period', start, finish,
+                            [(alias, aggregate.name, field) for (alias, aggregate), field in zip(aggregates.items(), fields)],
+                            lambda: self._from_micros(self._aggregate_for_period(start, finish, aggregates), aggregates))
+
+    def micros_fields(self):
+        """
+        Returns the names of the MicrosMoneyFields of the model, see GOOGLEADWORDS_MONEY_MICROS.
+        """
+        return set(field.name for field in self.model._meta.concrete_fields if isinstance(field, MicrosMoneyField))
+
+    def _from_micros(self, result, aggregates):
+        """
+        Convert the values of result, aggregates by alias, that are of a MicrosMoneyField from
+        micros to amounts.
+        """
+        micros_fields = self.micros_fields()
+        if micros_fields:
+            for alias, aggregate in aggregates.items():
+                if aggregate_field(aggregate) in micros_fields:
+                    result[alias] = from_micros(result[alias])
+        return result
+
+    def _aggregate_for_period(self, start, finish, aggregates):
+        tiles = self._rollup_plan(start, finish, aggregates)
+        if tiles is None:
+            return self.within_period(start, finish).aggregate(**aggregates)
+
+        fields = set(aggregate_field(aggregate) for aggregate in aggregates.values())
+        periods = [Q(grain=grain, period_start=tile_start) for grain, tile_start, _ in tiles if grain != GRAIN_DAY]
+        rollup_totals = self._replay(self.rollup_model()).filter(reduce(operator.or_, periods)).aggregate(
+            **dict([('sum_%s' % field, Sum('%s_sum' % field)) for field in fields] +
+                   [('count_%s' % field, Sum('%s_count' % field)) for field in fields]))
+
+        daily_totals = {}
+        days = [Q(day__gte=tile_start, day__lte=tile_finish) for grain, tile_start, tile_finish in tiles if grain == GRAIN_DAY]
+        if days:
+            daily_totals = self.filter(reduce(operator.or_, days)).aggregate(
+                **dict([('sum_%s' % field, Sum(field)) for field in fields] +
+                       [('count_%s' % field, Count(field)) for field in fields]))
+
+        result = {}
+        for alias, aggregate in aggregates.items():
+            field = aggregate_field(aggregate)
+            total = add_totals(rollup_totals['sum_%s' % field], daily_totals.get('sum_%s' % field))
+            if aggregate.name == 'Sum':
+                result[alias] = total
+            else:
+                count = (rollup_totals['count_%s' % field] or 0) + (daily_totals.get('count_%s' % field) or 0)
+                result[alias] = float(total) / count if count else None
+        return result
+
+    def summary_for_period(self, start, finish, metrics=SUMMARY_METRICS, group_by=None):
+        """
+        Returns the sums (of SUMMED_METRICS) and averages (of AVERAGED_METRICS) of metrics
+        over start to finish inclusive, computed by a single aggregate query.
+
+        Without group_by a tuple of the values in the order of metrics is returned, answered
+        from the rollups where possible (see aggregate_for_period). With group_by, a field or
+        list of fields (ie.. 'day', 'device' or the parent entity 'campaign'), a list of
+        tuples of the group_by values followed by the metric values is returned, ordered by
+        group_by.
+
+        >>> account.metrics.summary_for_period(start, finish, ['clicks', 'ctr'], group_by='device')
+        [('Computers', 1204, 2.1), ('Mobile devices with full browsers', 833, 3.4), ...]
+        """
+        aggregates = OrderedDict()
+        for metric in metrics:
+            if metric in self.SUMMED_METRICS:
+                aggregates['sum_%s' % metric] = Sum(metric)
+            elif metric in self.AVERAGED_METRICS:
+                aggregates['avg_%s' % metric] = Avg(metric)
+            else:
+                raise ValueError("Unknown metric '%s', expected one of %s." % (metric, ', '.join(self.SUMMED_METRICS + self.AVERAGED_METRICS)))
+
+        if not group_by:
+            totals = self.aggregate_for_period(start, finish, **aggregates)
+            return tuple(totals[alias] for alias in aggregates)
+
+        if isinstance(group_by, six.string_types):
+            group_by = [group_by]
+        columns = list(group_by) + list(aggregates)
+
+        def summary():
+            rows = self.within_period(start, finish).order_by(*group_by).values(*group_by).annotate(**aggregates)
+            return [tuple(row[column] for column in columns)
+                    for row in (self._from_micros(row, aggregates) for row in rows)]
+        return self._cached('summary_for_period', start, finish, columns, summary)
+
+    def _cached(self, method, start, finish, args, compute):
+        """
+        Returns compute(), cached by aggregate_cache when this queryset is filtered by account.
+        """
+        if not settings.GOOGLEADWORDS_AGGREGATE_CACHE:
+            return compute()
+        account_pk = self._account_pk()
+        if account_pk is None:
+            return compute()
+        try:
+            query = str(self.query)
+        except Exception:  # ie.. EmptyResultSet
+            return compute()
+        key = repr((self.model._meta.app_label, self.model._meta.model_name, method, str(start), str(finish), args, query))
+        return get_or_compute(account_pk, self.LEVEL, key, compute)
+
+    def is_synced(self, start, finish):
+        """
+        Returns True if the metrics of the account this queryset is filtered by have been
+        imported for every day from start to finish inclusive, see MetricsCoverage.
+        """
+        account_pk = self._account_pk()
+        if account_pk is None:
+            raise ValueError('is_synced() needs a queryset filtered by account')
+        return MetricsCoverage.objects.get_coverage(account_pk, self.LEVEL).covers(start, finish)
+
+    def _account_pk(self):
+        """
+        Returns the pk of the Account this queryset is filtered by or None.
+        """
+        if self.LEVEL is None or not self._rollup_filters:
+            return None
+        lookup = self.rollup_model().ACCOUNT_LOOKUP
+        for kwargs in self._rollup_filters:
+            for key, value in kwargs.items():
+                if key in (lookup, '%s_id' % lookup, '%s__id' % lookup, '%s__pk' % lookup, '%s__exact' % lookup):
+                    return getattr(value, 'pk', value)
+        return None
+
+    def _rollup_plan(self, start, finish, aggregates):
+        """
+        Returns the plan_period tiles to aggregate start to finish with, or None if the
+        aggregates should be answered from the daily rows alone.
+        """
+        if not settings.GOOGLEADWORDS_METRICS_ROLLUPS or self.ROLLUP_MODEL is None or self._rollup_filters is None:
+            return None
+        for aggregate in aggregates.values():
+            if aggregate.name not in ('Sum', 'Avg') or aggregate_field(aggregate) not in MetricsRollup.ROLLUP_FIELDS:
+                return None
+
+        dimensions = self.rollup_model().DIMENSIONS
+        for kwargs in self._rollup_filters:
+            for key in kwargs:
+                if key.split(LOOKUP_SEP)[0] not in dimensions + tuple('%s_id' % dimension for dimension in dimensions):
+                    return None
+
+        # Any other change to the queryset (exclude, extra, ordering...) can't be answered
+        # from the rollups, compare it with the queryset the filters alone give.
+        try:
+            if str(self._replay(self.model).query) != str(self.query):
+                return None
+        except Exception:  # ie.. EmptyResultSet
+            return None
+
+        tiles = plan_period(start, finish)
+        if any(grain == GRAIN_WEEK and tile_start.month != tile_finish.month for grain, tile_start, tile_finish in tiles):
+            # Weeks spanning the start of a month might span the compaction of the daily rows
+            coverages = MetricsCoverage.objects.level(self.LEVEL).exclude(compacted_before=None)
+            account_pk = self._account_pk()
+            if account_pk is not None:
+                coverages = coverages.account(account_pk)
+            tiles = plan_period(start, finish, set(coverages.values_list('compacted_before', flat=True)))
+        if all(grain == GRAIN_DAY for grain, _, _ in tiles):
+            return None
+        return tiles
+
+    def _replay(self, model):
+        queryset = model._default_manager.all()
+        for kwargs in self._rollup_filters:
+            queryset = queryset.filter(**kwargs)
+        return queryset
+
+
+# The spend of an account for a period and the AdWordsDataInconsistencyError Account.spend
+# would raise for it (or None), see Account.QuerySet.spend_for_period
+AccountSpend = namedtuple('AccountSpend', ['account', 'spend', 'error'])
+
+
 class Account(models.Model):
     STATUS_ACTIVE = 'active'
     STATUS_SYNC = 'sync'
@@ -154,6 +441,20 @@ class Account(models.Model):
     )
     STATUS_CONSIDERED_ACTIVE = (STATUS_ACTIVE, STATUS_SYNC,)
 
+    LEVEL_ACCOUNT = 'account'
+    LEVEL_CAMPAIGN = 'campaign'
+    LEVEL_AD_GROUP = 'ad_group'
+    LEVEL_AD = 'ad'
+    SYNC_LEVELS = (LEVEL_ACCOUNT, LEVEL_CAMPAIGN, LEVEL_AD_GROUP, LEVEL_AD,)
+
+    # The field holding the last day synced at each level
+    LEVEL_LAST_SYNCED_FIELDS = {
+        LEVEL_ACCOUNT: 'account_last_synced',
+        LEVEL_CAMPAIGN: 'campaign_last_synced',
+        LEVEL_AD_GROUP: 'ad_group_last_synced',
+        LEVEL_AD: 'ad_last_synced',
+    }
+
     account_id = models.BigIntegerField(unique=True)
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     account = models.CharField(max_length=255, blank=True, null=True, help_text='Account descriptive name')
@@ -186,19 +487,43 @@ class Account(models.Model):
             A locking get_or_create - note only the account_id is used in the 'get'.
             """
             # Get a lock based upon the campaign id
-            while not acquire_googleadwords_lock(Account, account.account_id):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", Account.__name__, account.account_id)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", Account.__name__, account.account_id)
+            with googleadwords_lock(Account, account.account_id):
                 return self._populate(data,
                                       ignore_fields=['status', 'account_id', 'account_last_synced'],
                                       account_id=account.account_id)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", Account.__name__, account.account_id)
-                release_googleadwords_lock(Account, account.account_id)
+        def spend_for_period(self, start, finish, complain_if_insufficient_data=True):
+            """
+            Returns an AccountSpend for each account, the spend between start and finish as
+            Account.spend would return, using two grouped queries for all of the accounts (plus
+            one per account whose daily metrics in the period have been compacted).
+
+            With complain_if_insufficient_data the error of an account that doesn't have enough
+            data for the period is the AdWordsDataInconsistencyError Account.spend would raise,
+            it's returned rather than raised.
+            """
+            accounts = list(self)
+            metrics = DailyAccountMetrics.objects.filter(account__in=self.values('pk')).order_by()
+
+            coverages = dict((coverage.account_id, coverage)
+                             for coverage in MetricsCoverage.objects.filter(account__in=self.values('pk'),
+                                                                            level=Account.LEVEL_ACCOUNT))
+            spend = dict((row['account'], row['spend'])
+                         for row in metrics.filter(day__gte=start, day__lte=finish).values('account').annotate(spend=Sum('cost')))
+            if metrics.micros_fields():
+                spend = dict((account_pk, from_micros(value)) for account_pk, value in spend.items())
+
+            result = []
+            for account in accounts:
+                coverage = coverages.get(account.pk) or MetricsCoverage(account=account, level=Account.LEVEL_ACCOUNT)
+                if coverage.compacted_before is not None and to_date(start) < coverage.compacted_before:
+                    spend[account.pk] = account.metrics.total_cost_for_period(start, finish)['cost__sum']
+                error = None
+                if complain_if_insufficient_data:
+                    error = account.insufficient_data_error(start, finish, coverage.first_day, coverage.compacted_before)
+                result.append(AccountSpend(account, spend.get(account.pk) or 0, error))
+            return result
+
 
     @task(name='Account.sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE)
@@ -212,10 +537,14 @@ class Account(models.Model):
         - Campaign Performance Report
         - Ad Group Performance Report
         - Ad Performance Report
+
+        If GOOGLEADWORDS_REPORT_RETRIEVAL_SINGLE_TASK is set all reports are
+        retrieved by a single task (see create_report_files), otherwise each
+        report is retrieved by its own task.
         """
 
         self.start_sync()
-        tasks = []
+        reports = []
 
         """
         Account
@@ -227,7 +556,7 @@ class Account(models.Model):
                 account_start = self.account_last_synced - timedelta(days=settings.GOOGLEADWORDS_EXISTING_ACCOUNT_SYNC_DAYS)
             elif force and start:
                 account_start = start
-            tasks.append(self.create_report_file.si(Account.get_selector(start=account_start)) | self.sync_account.s(this=self) | self.finish_account_sync.si(this=self))
+            reports.append((self.LEVEL_ACCOUNT, Account.get_selector(start=account_start)))
 
         """
         Campaign
@@ -239,7 +568,7 @@ class Account(models.Model):
                 campaign_start = self.campaign_last_synced - timedelta(days=settings.GOOGLEADWORDS_EXISTING_CAMPAIGN_SYNC_DAYS)
             elif force and start:
                 campaign_start = start
-            tasks.append(self.create_report_file.si(Campaign.get_selector(start=campaign_start)) | self.sync_campaign.s(this=self) | self.finish_campaign_sync.si(this=self))
+            reports.append((self.LEVEL_CAMPAIGN, Campaign.get_selector(start=campaign_start)))
 
         """
         Ad Group
@@ -251,7 +580,7 @@ class Account(models.Model):
                 ad_group_start = self.ad_group_last_synced - timedelta(days=settings.GOOGLEADWORDS_EXISTING_ADGROUP_SYNC_DAYS)
             elif force and start:
                 ad_group_start = start
-            tasks.append(self.create_report_file.si(AdGroup.get_selector(start=ad_group_start)) | self.sync_ad_group.s(this=self) | self.finish_ad_group_sync.si(this=self))
+            reports.append((self.LEVEL_AD_GROUP, AdGroup.get_selector(start=ad_group_start)))
 
         """
         Ad
@@ -263,11 +592,72 @@ class Account(models.Model):
                 ad_start = self.ad_last_synced - timedelta(days=settings.GOOGLEADWORDS_EXISTING_AD_SYNC_DAYS)
             elif force and start:
                 ad_start = start
-            tasks.append(self.create_report_file.si(Ad.get_selector(start=ad_start)) | self.sync_ad.s(this=self) | self.finish_ad_sync.si(this=self))
+            reports.append((self.LEVEL_AD, Ad.get_selector(start=ad_start)))
+
+        run_ids = [SyncRun.objects.start_run(self, level).pk for level, report_definition in reports]
+
+        if settings.GOOGLEADWORDS_REPORT_RETRIEVAL_SINGLE_TASK and reports:
+            # The imports are dispatched by create_report_files, the last to finish finishes the sync
+            return self.create_report_files.si(reports, run_ids).apply_async()
 
+        if settings.GOOGLEADWORDS_DATA_IMPORT_LOCAL_ROUTING and reports:
+            # The import queue is only known once downloaded, so create_report_file dispatches
+            # each import and the last to finish finishes the sync
+            return group(*[self.report_file_task(report_definition, level, run_ids)
+                           for level, report_definition in reports]).apply_async()
+
+        tasks = [self.create_report_file.si(report_definition, level) | self.import_chain(level)
+                 for level, report_definition in reports]
         canvas = group(*tasks) | self.finish_sync.si(this=self)
         return canvas.apply_async()
 
+    def import_chain(self, level, queue=None):
+        """
+        Returns the canvas that imports a ReportFile (supplied as the first argument) for level,
+        the result of the import is passed to the finish task.
+
+        :param level: One of Account.SYNC_LEVELS
+        :param queue: Optional queue to send the import task to.
+        """
+        sync_task = getattr(self, 'sync_%s' % level).s(this=self)
+        if queue is not None:
+            sync_task.set(queue=queue)
+        return sync_task | getattr(self, 'finish_%s_sync' % level).s(this=self)
+
+    def dispatch_import(self, level, report_file, run_ids, queue=None):
+        """
+        Dispatch the import of report_file for level (see import_chain) followed by
+        finish_sync_if_imported, should the import fail its SyncRun is abandoned instead.
+
+        An import sent to a host's queue (see helper.data_import_queue) is checked by
+        reroute_import after GOOGLEADWORDS_DATA_IMPORT_LOCAL_TIMEOUT seconds.
+
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        :return: The AsyncResult of the import.
+        """
+        canvas = self.import_chain(level, queue=queue)
+        errback = self.abandon_sync_runs.si(run_ids, level, this=self)
+        for signature in canvas.tasks:
+            signature.link_error(errback)
+        result = (canvas | self.finish_sync_if_imported.si(run_ids, this=self)).apply_async((report_file,))
+
+        if queue is not None and queue != settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE:
+            self.reroute_import.si(level, report_file, run_ids, this=self).apply_async(
+                countdown=settings.GOOGLEADWORDS_DATA_IMPORT_LOCAL_TIMEOUT)
+
+        return result
+
+    def report_file_task(self, report_definition, level, run_ids):
+        """
+        Returns the signature of create_report_file retrieving report_definition for level and
+        dispatching its import, should it fail the SyncRun of level is abandoned.
+
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        """
+        signature = self.create_report_file.si(report_definition, level, run_ids=run_ids)
+        signature.link_error(self.abandon_sync_runs.si(run_ids, level, this=self))
+        return signature
+
     @task(name='Account.start_sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
@@ -283,86 +673,270 @@ class Account(models.Model):
         self.status = self.STATUS_ACTIVE
         self.save(update_fields=['updated', 'status'])
 
+    @task(name='Account.finish_sync_if_imported',
+          queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
+          serializer=DJANGO_CEREAL_PICKLE)
+    @ensure_self
+    def finish_sync_if_imported(self, run_ids):
+        """
+        Finish the sync if none of its SyncRuns are open, ie.. every import dispatched by
+        create_report_file(s) has finished (or been abandoned). Runs after each of those
+        imports, each records its finish first so the last to finish sees the others and
+        finishes the sync.
+
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        """
+        if not SyncRun.objects.filter(pk__in=run_ids, finished__isnull=True).exists():
+            self.finish_sync()
+
+    @task(name='Account.abandon_sync_runs',
+          queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
+          serializer=DJANGO_CEREAL_PICKLE)
+    @ensure_self
+    def abandon_sync_runs(self, run_ids, level=None):
+        """
+        Abandon the open SyncRuns of run_ids (at level), whose download or import failed, so
+        the sync is finished by finish_sync_if_imported once the others have.
+
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        """
+        runs = SyncRun.objects.filter(pk__in=run_ids)
+        if level is not None:
+            runs = runs.level(level)
+        runs.abandon()
+        self.finish_sync_if_imported(run_ids)
+
+    @task(name='Account.reroute_import',
+          queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
+          serializer=DJANGO_CEREAL_PICKLE)
+    @ensure_self
+    def reroute_import(self, level, report_file, run_ids):
+        """
+        Reroute the import of report_file for level to the shared
+        GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE if its SyncRun is still open and no live worker
+        consumes the queue of the host that downloaded it (see ReportFile.host), ie.. the
+        host's worker has gone with the import still queued. The report is then read from
+        shared storage.
+
+        Should the host's worker return with the import still queued the report is imported
+        again, its rows replace those already imported and its finish finds the run closed.
+
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        :return: True if the import was rerouted.
+        """
+        if not SyncRun.objects.filter(pk__in=run_ids, finished__isnull=True).level(level).exists():
+            return False
+
+        queue = local_data_import_queue(report_file.host)
+        if queue_consumed(queue):
+            return False
+
+        logger.warning("No worker consumes '%s', rerouting import of report_file '%s' for account '%s' to shared queue.",
+                       queue, report_file.pk, self.pk)
+        self.dispatch_import(level, report_file, run_ids, queue=settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE)
+        return True
+
     @task(name='Account.finish_account_sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
-    def finish_account_sync(self):
-        self.account_last_synced = None
-        account_last_synced = DailyAccountMetrics.objects.filter(account=self).aggregate(Max('day'))
-        if 'day__max' in account_last_synced:
-            self.account_last_synced = account_last_synced['day__max']
-        self.save(update_fields=['updated', 'account_last_synced'])
+    def finish_account_sync(self, result=None):
+        """
+        :param result: The result of sync_account, recorded on the open SyncRun, its last_day
+            is recorded as account_last_synced.
+        """
+        with collect_stats(self.account_id, self.LEVEL_ACCOUNT) as stats, stage('finish'):
+            self.update_last_synced(self.LEVEL_ACCOUNT, result)
+            invalidate_aggregates(self.pk, self.LEVEL_ACCOUNT)
+        SyncRun.objects.record_finish(self, self.LEVEL_ACCOUNT, result, stats)
+        return stats.result()
 
     @task(name='Account.finish_campaign_sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
-    def finish_campaign_sync(self):
-        self.campaign_last_synced = None
-        campaign_last_synced = DailyCampaignMetrics.objects.filter(campaign__account=self).aggregate(Max('day'))
-        if 'day__max' in campaign_last_synced:
-            self.campaign_last_synced = campaign_last_synced['day__max']
-        self.save(update_fields=['updated', 'campaign_last_synced'])
+    def finish_campaign_sync(self, result=None):
+        """
+        :param result: The result of sync_campaign, recorded on the open SyncRun, its last_day
+            is recorded as campaign_last_synced.
+        """
+        with collect_stats(self.account_id, self.LEVEL_CAMPAIGN) as stats, stage('finish'):
+            self.update_last_synced(self.LEVEL_CAMPAIGN, result)
+            invalidate_aggregates(self.pk, self.LEVEL_CAMPAIGN)
+        SyncRun.objects.record_finish(self, self.LEVEL_CAMPAIGN, result, stats)
+        return stats.result()
 
     @task(name='Account.finish_ad_group_sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
-    def finish_ad_group_sync(self):
-        self.ad_group_last_synced = None
-        ad_group_last_synced = DailyAdGroupMetrics.objects.filter(ad_group__campaign__account=self).aggregate(Max('day'))
-        if 'day__max' in ad_group_last_synced:
-            self.ad_group_last_synced = ad_group_last_synced['day__max']
-        self.save(update_fields=['updated', 'ad_group_last_synced'])
+    def finish_ad_group_sync(self, result=None):
+        """
+        :param result: The result of sync_ad_group, recorded on the open SyncRun, its last_day
+            is recorded as ad_group_last_synced.
+        """
+        with collect_stats(self.account_id, self.LEVEL_AD_GROUP) as stats, stage('finish'):
+            self.update_last_synced(self.LEVEL_AD_GROUP, result)
+            invalidate_aggregates(self.pk, self.LEVEL_AD_GROUP)
+        SyncRun.objects.record_finish(self, self.LEVEL_AD_GROUP, result, stats)
+        return stats.result()
 
     @task(name='Account.finish_ad_sync',
           queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
-    def finish_ad_sync(self):
-        self.ad_last_synced = None
-        ad_last_synced = DailyAdMetrics.objects.filter(ad__ad_group__campaign__account=self).aggregate(Max('day'))
-        if 'day__max' in ad_last_synced:
-            self.ad_last_synced = ad_last_synced['day__max']
-        self.save(update_fields=['updated', 'ad_last_synced'])
+    def finish_ad_sync(self, result=None):
+        """
+        :param result: The result of sync_ad, recorded on the open SyncRun, its last_day
+            is recorded as ad_last_synced.
+        """
+        with collect_stats(self.account_id, self.LEVEL_AD) as stats, stage('finish'):
+            self.update_last_synced(self.LEVEL_AD, result)
+            invalidate_aggregates(self.pk, self.LEVEL_AD)
+        SyncRun.objects.record_finish(self, self.LEVEL_AD, result, stats)
+        return stats.result()
 
     @task(name='Account.create_report_file',
           queue=settings.GOOGLEADWORDS_REPORT_RETRIEVAL_CELERY_QUEUE,
           serializer=DJANGO_CEREAL_PICKLE)
-    def create_report_file(self, report_definition):
+    @profiled
+    def create_report_file(self, report_definition, level=None, run_ids=None):
         """
         Create a ReportFile that contains the Google AdWords data as specified by report_definition.
+
+        :param level: The level being synced (one of Account.SYNC_LEVELS) used to key the
+                      auth and download timings sent to the metrics backend.
+        :param run_ids: The pks of the SyncRuns started by the sync, if given the import of the
+                        ReportFile is dispatched (see dispatch_import) to the queue of
+                        helper.data_import_queue (ie.. this host's with
+                        GOOGLEADWORDS_DATA_IMPORT_LOCAL_ROUTING).
         """
         try:
-            return ReportFile.objects.request(report_definition=report_definition,
-                                              client_customer_id=self.account_id)
+            with collect_stats(self.account_id, level) as stats:
+                report_file = ReportFile.objects.request(report_definition=report_definition,
+                                                         client_customer_id=self.account_id)
+            SyncRun.objects.record_download(self, level, stats)
         except RateExceededError as exc:
             logger.info("Caught RateExceededError for account '%s' - retrying in '%s' seconds.", self.pk, exc.retry_after_seconds)
-            raise self.get_account_data.retry(exc, countdown=exc.retry_after_seconds)
+            raise self.create_report_file.retry(exc=exc, countdown=exc.retry_after_seconds)
         except GoogleAdsError as exc:
             raise InterceptedGoogleAdsError(exc, account_id=self.account_id)
 
+        if run_ids is not None:
+            self.dispatch_import(level, report_file, run_ids, queue=data_import_queue())
+
+        return report_file
+
+    @task(name='Account.create_report_files',
+          queue=settings.GOOGLEADWORDS_REPORT_RETRIEVAL_CELERY_QUEUE,
+          serializer=DJANGO_CEREAL_PICKLE)
+    @profiled
+    def create_report_files(self, reports, run_ids):
+        """
+        Retrieve several reports for this account using a single AdWords client.
+
+        Reports are downloaded concurrently (up to GOOGLEADWORDS_REPORT_RETRIEVAL_CONCURRENCY
+        at once) sharing one report downloader, and the import for each report is dispatched
+        (see dispatch_import) as soon as its ReportFile has been created. A report that hits a
+        RateExceededError is handed back to the per report create_report_file task with the
+        requested countdown. The SyncRun of a report that fails to download is abandoned and,
+        once the others have been dispatched, the first failure is raised. Each import is
+        followed by finish_sync_if_imported so the sync is finished once every import has.
+
+        :param reports: A list of (level, report_definition) tuples, level being one of Account.SYNC_LEVELS.
+        :param run_ids: The pks of the SyncRuns started by the sync.
+        :return: A list of the dispatched import task ids.
+        """
+        try:
+            with collect_stats(self.account_id, None):
+                client = adwords_service(self.account_id)
+            report_downloader = client.GetReportDownloader(version=settings.GOOGLEADWORDS_CLIENT_VERSION)
+        except Exception:
+            self.abandon_sync_runs(run_ids)
+            raise
+        profiler = current_profiler()
+
+        def download(report):
+            level, report_definition = report
+            try:
+                with profile_thread(profiler), collect_stats(self.account_id, level) as stats:
+                    report_file = ReportFile.objects.request(report_definition=report_definition,
+                                                             client_customer_id=self.account_id,
+                                                             report_downloader=report_downloader)
+                SyncRun.objects.record_download(self, level, stats)
+                return level, report_definition, report_file, None
+            except RateExceededError as exc:
+                return level, report_definition, None, exc
+            except Exception:
+                return level, report_definition, None, sys.exc_info()
+            finally:
+                # Each thread has its own database connection, don't leak it.
+                connection.close()
+
+        queue = data_import_queue()
+        task_ids = []
+        failures = []
+        pool = ThreadPool(max(1, min(len(reports), settings.GOOGLEADWORDS_REPORT_RETRIEVAL_CONCURRENCY)))
+        try:
+            for level, report_definition, report_file, exc in pool.imap_unordered(download, reports):
+                if isinstance(exc, RateExceededError):
+                    logger.info("Caught RateExceededError for account '%s' level '%s' - retrying in '%s' seconds.", self.pk, level, exc.retry_after_seconds)
+                    result = self.report_file_task(report_definition, level, run_ids) \
+                        .apply_async(countdown=exc.retry_after_seconds)
+                elif exc is not None:
+                    logger.error("Failed to retrieve the '%s' report of account '%s'.", level, self.pk, exc_info=exc)
+                    failures.append(exc)
+                    self.abandon_sync_runs(run_ids, level)
+                    continue
+                else:
+                    result = self.dispatch_import(level, report_file, run_ids, queue=queue)
+                task_ids.append(result.id)
+        finally:
+            pool.close()
+            pool.join()
+
+        if failures:
+            exc_type, exc, tb = failures[0]
+            if isinstance(exc, GoogleAdsError):
+                six.reraise(InterceptedGoogleAdsError, InterceptedGoogleAdsError(exc, account_id=self.account_id), tb)
+            six.reraise(exc_type, exc, tb)
+
+        return task_ids
+
     @task(name='Account.sync_account',
           queue=settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE,
           time_limit=settings.GOOGLEADWORDS_CELERY_TIMELIMIT,
           soft_time_limit=settings.GOOGLEADWORDS_CELERY_SOFTTIMELIMIT,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
+    @profiled
     def sync_account(self, report_file):
         """
         Sync the account data report.
 
         :param report_file: ReportFile
+        :return: dict describing the import, see ImportMemoryGuard.result and SyncStats.result
         """
-        try:
-            for row in report_file.dehydrate():
-                account = Account.objects.populate(row, self)
-                DailyAccountMetrics.objects.populate(row, account=account)
+        guard = ImportMemoryGuard.from_settings()
+        loader = get_metrics_loader(DailyAccountMetrics.objects.all(), self)
+        days = set()
+        with collect_stats(self.account_id, self.LEVEL_ACCOUNT) as stats:
+            try:
+                with guard, stage('import'):
+                    for row in guard.rows(report_file.dehydrate()):
+                        days.add(row.get('Day'))
+                        account = Account.objects.populate(row, self)
+                        loader.load(row, account=account)
+                    replaced = loader.finish()
+
+            except KeyError:
+                logger.info("Caught KeyError syncing account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
+                raise
 
-        except KeyError:
-            logger.info("Caught KeyError syncing account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
-            raise
+            self.refresh_rollups(self.LEVEL_ACCOUNT, days | replaced)
+            MetricsCoverage.objects.record(self, self.LEVEL_ACCOUNT, days)
+
+        return dict(guard.result(), last_day=to_date(max(days)) if days else None, **stats.result())
 
     @task(name='Account.sync_campaign',
           queue=settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE,
@@ -370,21 +944,35 @@ class Account(models.Model):
           soft_time_limit=settings.GOOGLEADWORDS_CELERY_SOFTTIMELIMIT,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
+    @profiled
     def sync_campaign(self, report_file):
         """
         Sync the campaign data report.
 
         :param report_file: ReportFile
+        :return: dict describing the import, see ImportMemoryGuard.result and SyncStats.result
         """
-        try:
-            for row in report_file.dehydrate():
-                account = Account.objects.populate(row, self)
-                campaign = Campaign.objects.populate(row, account=account)
-                DailyCampaignMetrics.objects.populate(row, campaign=campaign)
+        guard = ImportMemoryGuard.from_settings()
+        loader = get_metrics_loader(DailyCampaignMetrics.objects.all(), self)
+        days = set()
+        with collect_stats(self.account_id, self.LEVEL_CAMPAIGN) as stats:
+            try:
+                with guard, stage('import'):
+                    for row in guard.rows(report_file.dehydrate()):
+                        days.add(row.get('Day'))
+                        account = Account.objects.populate(row, self)
+                        campaign = Campaign.objects.populate(row, account=account)
+                        loader.load(row, campaign=campaign)
+                    replaced = loader.finish()
+
+            except KeyError:
+                logger.info("Caught KeyError syncing campaign for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
+                raise
 
-        except KeyError:
-            logger.info("Caught KeyError syncing campaign for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
-            raise
+            self.refresh_rollups(self.LEVEL_CAMPAIGN, days | replaced)
+            MetricsCoverage.objects.record(self, self.LEVEL_CAMPAIGN, days)
+
+        return dict(guard.result(), last_day=to_date(max(days)) if days else None, **stats.result())
 
     @task(name='Account.sync_ad_group',
           queue=settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE,
@@ -392,42 +980,116 @@ class Account(models.Model):
           soft_time_limit=settings.GOOGLEADWORDS_CELERY_SOFTTIMELIMIT,
           serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
+    @profiled
     def sync_ad_group(self, report_file):
         """
         Sync the ad group data report.
 
         :param report_file: ReportFile
+        :return: dict describing the import, see ImportMemoryGuard.result and SyncStats.result
         """
-        try:
-            for row in report_file.dehydrate():
-                account = Account.objects.populate(row, self)
-                campaign = Campaign.objects.populate(row, account=account)
-                ad_group = AdGroup.objects.populate(row, campaign=campaign)
-                DailyAdGroupMetrics.objects.populate(row, ad_group=ad_group)
-
-        except KeyError:
-            logger.info("Caught KeyError syncing ad group for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
-            raise
+        guard = ImportMemoryGuard.from_settings()
+        loader = get_metrics_loader(DailyAdGroupMetrics.objects.all(), self)
+        days = set()
+        with collect_stats(self.account_id, self.LEVEL_AD_GROUP) as stats:
+            try:
+                with guard, stage('import'):
+                    for row in guard.rows(report_file.dehydrate()):
+                        days.add(row.get('Day'))
+                        account = Account.objects.populate(row, self)
+                        campaign = Campaign.objects.populate(row, account=account)
+                        ad_group = AdGroup.objects.populate(row, campaign=campaign)
+                        loader.load(row, ad_group=ad_group)
+                    replaced = loader.finish()
+
+            except KeyError:
+                logger.info("Caught KeyError syncing ad group for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
+                raise
+
+            self.refresh_rollups(self.LEVEL_AD_GROUP, days | replaced)
+            MetricsCoverage.objects.record(self, self.LEVEL_AD_GROUP, days)
+
+        return dict(guard.result(), last_day=to_date(max(days)) if days else None, **stats.result())
 
     @task(name='Account.sync_ad', queue=settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE, time_limit=settings.GOOGLEADWORDS_CELERY_TIMELIMIT, soft_time_limit=settings.GOOGLEADWORDS_CELERY_SOFTTIMELIMIT, serializer=DJANGO_CEREAL_PICKLE)
     @ensure_self
+    @profiled
     def sync_ad(self, report_file):
         """
         Sync the ad data report.
 
         :param report_file: ReportFile
+        :return: dict describing the import, see ImportMemoryGuard.result and SyncStats.result
         """
-        try:
-            for row in report_file.dehydrate():
-                account = Account.objects.populate(row, self)
-                campaign = Campaign.objects.populate(row, account=account)
-                ad_group = AdGroup.objects.populate(row, campaign=campaign)
-                ad = Ad.objects.populate(row, ad_group=ad_group)
-                DailyAdMetrics.objects.populate(row, ad=ad)
-
-        except KeyError:
-            logger.info("Caught KeyError syncing ad for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
-            raise
+        guard = ImportMemoryGuard.from_settings()
+        loader = get_metrics_loader(DailyAdMetrics.objects.all(), self)
+        days = set()
+        with collect_stats(self.account_id, self.LEVEL_AD) as stats:
+            try:
+                with guard, stage('import'):
+                    for row in guard.rows(report_file.dehydrate()):
+                        days.add(row.get('Day'))
+                        account = Account.objects.populate(row, self)
+                        campaign = Campaign.objects.populate(row, account=account)
+                        ad_group = AdGroup.objects.populate(row, campaign=campaign)
+                        ad = Ad.objects.populate(row, ad_group=ad_group)
+                        loader.load(row, ad=ad)
+                    replaced = loader.finish()
+
+            except KeyError:
+                logger.info("Caught KeyError syncing ad for account '%s', report_file '%s' - Report doesn't have expected rows", self.pk, report_file.pk)
+                raise
+
+            self.refresh_rollups(self.LEVEL_AD, days | replaced)
+            MetricsCoverage.objects.record(self, self.LEVEL_AD, days)
+
+        return dict(guard.result(), last_day=to_date(max(days)) if days else None, **stats.result())
+
+    def update_last_synced(self, level, result=None):
+        """
+        Move the *_last_synced of level forward to the last day imported, the last_day of
+        result (see Account.sync_account) or of the MetricsCoverage without a result, using
+        a single conditional UPDATE.
+
+        :return: True if the last synced day was updated.
+        """
+        if result and 'last_day' in result:
+            last_day = result['last_day']
+        else:
+            last_day = MetricsCoverage.objects.get_coverage(self, level).last_day
+        if last_day is None:
+            return False
+
+        field = self.LEVEL_LAST_SYNCED_FIELDS[level]
+        updated = Account.objects.filter(pk=self.pk) \
+            .filter(Q(**{'%s__isnull' % field: True}) | Q(**{'%s__lt' % field: last_day})) \
+            .update(**{field: last_day, 'updated': timezone.now()})
+        if updated:
+            setattr(self, field, last_day)
+        return bool(updated)
+
+    def repair_last_synced(self, levels=SYNC_LEVELS):
+        """
+        Recompute the *_last_synced of levels from the latest day of the daily metrics, ie..
+        after metrics have been deleted. This scans the metrics, the sync tasks don't use it.
+        """
+        fields = []
+        for level in levels:
+            rollup_model = LEVEL_ROLLUP_MODELS[level]
+            field = self.LEVEL_LAST_SYNCED_FIELDS[level]
+            setattr(self, field, rollup_model.DAILY_MODEL.objects.filter(**{rollup_model.ACCOUNT_LOOKUP: self})
+                                                                 .aggregate(Max('day'))['day__max'])
+            fields.append(field)
+        self.save(update_fields=['updated'] + fields)
+
+    def refresh_rollups(self, level, days):
+        """
+        Refresh the week and month rollups of level containing days, the days imported by
+        a sync, when GOOGLEADWORDS_METRICS_ROLLUPS is set.
+        """
+        if settings.GOOGLEADWORDS_METRICS_ROLLUPS and days:
+            with stage('rollup'):
+                LEVEL_ROLLUP_MODELS[level].objects.refresh(self, days)
 
     @staticmethod
     def get_selector(start=None, finish=None):
@@ -490,35 +1152,51 @@ class Account(models.Model):
             :exc:`AdWordsDataInconsistencyError` if the AdWords account doesn't
             have enough data for the requested period.
         """
-        account_first_synced = DailyAccountMetrics.objects.filter(account=self).aggregate(Min('day'))
-        first_synced_date = None
-        if 'day__min' in account_first_synced:
-            first_synced_date = account_first_synced['day__min']
+        if complain_if_insufficient_data:
+            coverage = MetricsCoverage.objects.get_coverage(self, self.LEVEL_ACCOUNT)
+            error = self.insufficient_data_error(start, finish, coverage.first_day, coverage.compacted_before)
+            if error is not None:
+                raise error
 
-        if complain_if_insufficient_data and (
-                not self.account_last_synced
+        # From the rollups where the daily rows have been compacted
+        cost = self.metrics.total_cost_for_period(start, finish)['cost__sum']
+
+        if cost is None:
+            return 0
+        else:
+            return cost
+
+    def insufficient_data_error(self, start, finish, first_synced_date, compacted_before=None):
+        """
+        Returns an AdWordsDataInconsistencyError if this account's metrics, synced from
+        first_synced_date to account_last_synced, don't cover start to finish or if start to
+        finish needs daily rows compacted before compacted_before, otherwise None.
+        """
+        if (not self.account_last_synced
                 or self.account_last_synced < finish
                 or not first_synced_date
-                or first_synced_date > start):
-            raise AdWordsDataInconsistencyError('Google AdWords Account %s does not have correct amount of data to calculate the spend between "%s" and "%s"' % (
+                or first_synced_date > start
+                or compacted_days(start, finish, compacted_before)):
+            return AdWordsDataInconsistencyError('Google AdWords Account %s does not have correct amount of data to calculate the spend between "%s" and "%s"' % (
                 self,
                 start,
                 finish,
             ))
+        return None
 
-        cost = self.metrics.filter(day__gte=start, day__lte=finish).aggregate(Sum('cost'))['cost__sum']
-
-        if cost is None:
-            return 0
-        else:
-            return cost
+    def is_synced(self, start, finish, level=LEVEL_ACCOUNT):
+        """
+        Returns True if metrics have been imported at level for every day from start to
+        finish inclusive, see MetricsCoverage.
+        """
+        return MetricsCoverage.objects.get_coverage(self, level).covers(start, finish)
 
-    def is_synced(self, start, finish):
-        raise NotImplementedError("Account.is_synced() is not implemented.")
-        pass
-#         return DailyAdMetrics.objects.account(self).is_synced(start, finish) and \
-#             asdf.objects.account(self).contains_data(start, finish) and \
-#             asdf.objects.account(self).contains_data(start, finish)
+    def sync_gaps(self, start, finish, level=LEVEL_ACCOUNT):
+        """
+        Returns a list of the (start, finish) runs of days from start to finish inclusive
+        metrics haven't been imported for at level, see MetricsCoverage.
+        """
+        return MetricsCoverage.objects.get_coverage(self, level).gaps(start, finish)
 
     def is_active(self):
         return self.status == self.STATUS_ACTIVE
@@ -528,14 +1206,14 @@ class Account(models.Model):
         """
         Helper to return associated Ad Groups.
         """
-        return AdGroup.objects.filter(campaign__account=self)
+        return AdGroup.objects.filter(account=self)
 
     @property
     def ads(self):
         """
         Helper to return associated Ads.
         """
-        return Ad.objects.filter(ad_group__campaign__account=self)
+        return Ad.objects.filter(account=self)
 
 
 class Alert(models.Model):
@@ -603,7 +1281,23 @@ class Alert(models.Model):
         return '%s' % (self.get_type_display())
 
 
-class DailyAccountMetrics(models.Model):
+class DailyMetricsModel(models.Model):
+    """
+    Base of the daily metrics models, whose tables may be partitioned by day, see
+    partitioning.
+    """
+
+    class Meta:
+        abstract = True
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if settings.GOOGLEADWORDS_PARTITION_METRICS:
+            # Only scan the partition of the day rather than the primary key index of each
+            base_qs = base_qs.filter(day=self.day)
+        return super(DailyMetricsModel, self)._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+
+class DailyAccountMetrics(DailyMetricsModel):
     DEVICE_UNKNOWN = 'Other'
     DEVICE_DESKTOP = 'Computers'
     DEVICE_HIGH_END_MOBILE = 'Mobile devices with full browsers'
@@ -616,8 +1310,8 @@ class DailyAccountMetrics(models.Model):
     )
 
     account = models.ForeignKey('django_google_adwords.Account', related_name='metrics')
-    avg_cpc = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPC', null=True, blank=True)
-    avg_cpm = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPM', null=True, blank=True)
+    avg_cpc = money_field('Avg. CPC')
+    avg_cpm = money_field('Avg. CPM')
     avg_position = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Avg. position')
     clicks = models.IntegerField(help_text='Clicks', null=True, blank=True)
     click_conversion_rate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Click conversion rate')
@@ -625,9 +1319,9 @@ class DailyAccountMetrics(models.Model):
     converted_clicks = models.BigIntegerField(help_text='Converted clicks', null=True, blank=True)
     total_conv_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Total conv. value')
     conversions = models.BigIntegerField(help_text='Conversions', null=True, blank=True)
-    cost = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost', null=True, blank=True)
-    cost_converted_click = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / converted click', null=True, blank=True)
-    cost_conv = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / conv.', null=True, blank=True)
+    cost = money_field('Cost')
+    cost_converted_click = money_field('Cost / converted click')
+    cost_conv = money_field('Cost / conv.')
     ctr = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='CTR')
     device = models.CharField(max_length=255, choices=DEVICE_CHOICES, help_text='Device')
     impressions = models.BigIntegerField(help_text='Impressions', null=True, blank=True)
@@ -646,31 +1340,37 @@ class DailyAccountMetrics(models.Model):
 
     objects = QuerySetManager()
 
+    class Meta:
+        # The natural key, see loaders.CopyLoader, which also indexes the period queries
+        # (see PeriodAggregateQuerySet.within_period) along with index_together
+        unique_together = (('account', 'device', 'day'),)
+        index_together = (('account', 'day'),)
+
     def __unicode__(self):
         return '%s' % (self.day)
 
-    class QuerySet(PopulatingGoogleAdWordsQuerySet):
+    class QuerySet(PeriodAggregateQuerySet):
+        LEVEL = Account.LEVEL_ACCOUNT
+        ROLLUP_MODEL = 'AccountMetricsRollup'
 
         def populate(self, data, account):
             device = data.get('Device')
             day = data.get('Day')
             identifier = '%s-%s-%s' % (account.pk, device, day)
 
-            while not acquire_googleadwords_lock(DailyAccountMetrics, identifier):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", DailyAccountMetrics.__name__, identifier)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", DailyAccountMetrics.__name__, identifier)
+            with googleadwords_lock(DailyAccountMetrics, identifier):
                 return self._populate(data,
                                       ignore_fields=['account', 'account_id'],
                                       device=device,
                                       day=day,
                                       account=account)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", DailyAccountMetrics.__name__, identifier)
-                release_googleadwords_lock(DailyAccountMetrics, identifier)
+        def build(self, data, account):
+            return self._build(data,
+                               ignore_fields=['account', 'account_id'],
+                               device=data.get('Device'),
+                               day=data.get('Day'),
+                               account=account)
 
         def desktop(self):
             return self.filter(device=DailyAccountMetrics.DEVICE_DESKTOP)
@@ -681,56 +1381,53 @@ class DailyAccountMetrics(models.Model):
         def tablet(self):
             return self.filter(device=DailyAccountMetrics.DEVICE_TABLET)
 
-        def within_period(self, start, finish):
-            return self.filter(day__gte=start, day__lte=finish)
-
         def total_impressions_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('impressions'))
+            return self.aggregate_for_period(start, finish, Sum('impressions'))
 
         def daily_impressions_for_period(self, start, finish, order_by='day'):
             return self.within_period(start, finish).order_by(order_by).values('day').annotate(impressions=Sum('impressions'))
 
         def total_clicks_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('clicks'))
+            return self.aggregate_for_period(start, finish, Sum('clicks'))
 
         def daily_clicks_for_period(self, start, finish, order_by='day'):
             return self.within_period(start, finish).order_by(order_by).values('day').annotate(clicks=Sum('clicks'))
 
         def total_cost_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('cost'))
+            return self.aggregate_for_period(start, finish, Sum('cost'))
 
         def daily_cost_for_period(self, start, finish, order_by='day'):
-            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cost=Sum('cost'))
+            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cost=money_aggregate(Sum('cost')))
 
         def average_ctr_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Avg('ctr'))
+            return self.aggregate_for_period(start, finish, Avg('ctr'))
 
         def daily_average_ctr_for_period(self, start, finish, order_by='day'):
             return self.within_period(start, finish).order_by(order_by).values('day').annotate(ctr=Avg('ctr'))
 
         def average_cpc_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Avg('avg_cpc'))
+            return self.aggregate_for_period(start, finish, Avg('avg_cpc'))
 
         def daily_average_cpc_for_period(self, start, finish, order_by='day'):
-            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cpc=Avg('avg_cpc'))
+            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cpc=money_aggregate(Avg('avg_cpc')))
 
         def total_conversions_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('conversions'))
+            return self.aggregate_for_period(start, finish, Sum('conversions'))
 
         def daily_conversions_for_period(self, start, finish, order_by='day'):
             return self.within_period(start, finish).order_by(order_by).values('day').annotate(conversions=Sum('conversions'))
 
         def average_click_conversion_rate_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Avg('click_conversion_rate'))
+            return self.aggregate_for_period(start, finish, Avg('click_conversion_rate'))
 
         def daily_average_click_conversion_rate_for_period(self, start, finish, order_by='day'):
             return self.within_period(start, finish).order_by(order_by).values('day').annotate(click_conversion_rate=Avg('click_conversion_rate'))
 
         def average_cost_conv_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Avg('cost_conv'))
+            return self.aggregate_for_period(start, finish, Avg('cost_conv'))
 
         def daily_average_cost_conv_for_period(self, start, finish, order_by='day'):
-            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cost_conv=Avg('cost_conv'))
+            return self.within_period(start, finish).order_by(order_by).values('day').annotate(cost_conv=money_aggregate(Avg('cost_conv')))
 
         def average_search_lost_impression_share_budget(self, start, finish):
             return self.within_period(start, finish).aggregate(Avg('search_lost_is_budget'))
@@ -738,15 +1435,6 @@ class DailyAccountMetrics(models.Model):
         def device_average_click_conversion_rate_for_period(self, start, finish):
             return self.within_period(start, finish).values('device').annotate(click_conversion_rate=Avg('click_conversion_rate'))
 
-        def is_synced(self, start, finish):
-            raise NotImplementedError("DailyAccountMetrics.QuerySet.is_synced() is not implemented.")
-            pass
-#             account_first_synced = DailyAccountMetrics.objects.filter(account=self).aggregate(Min('day'))
-#             first_synced_date = None
-#             if account_first_synced.has_key('day__min'):
-#                 first_synced_date = account_first_synced['day__min']
-#
-#             if not self.last_synced or (self.last_synced - timedelta(days=1)) < finish or not first_synced_date or first_synced_date > start:
 
 
 class Campaign(models.Model):
@@ -781,21 +1469,12 @@ class Campaign(models.Model):
             campaign_id = int(data.get('Campaign ID'))
 
             # Get a lock based upon the campaign id
-            while not acquire_googleadwords_lock(Campaign, campaign_id):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", Campaign.__name__, campaign_id)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", Campaign.__name__, campaign_id)
+            with googleadwords_lock(Campaign, campaign_id):
                 return self._populate(data,
                                       ignore_fields=['account', 'account_id'],
                                       campaign_id=campaign_id,
                                       account=account)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", Campaign.__name__, campaign_id)
-                release_googleadwords_lock(Campaign, campaign_id)
-
         def enabled(self):
             return self.filter(campaign_state=Campaign.STATE_ENABLED)
 
@@ -873,7 +1552,7 @@ class Campaign(models.Model):
         return Ad.objects.filter(ad_group__campaign=self)
 
 
-class DailyCampaignMetrics(models.Model):
+class DailyCampaignMetrics(DailyMetricsModel):
     BID_STRATEGY_TYPE_BUDGET_OPTIMIZER = 'auto'
     BID_STRATEGY_TYPE_CONVERSION_OPTIMIZER = 'max/target cpa'
     BID_STRATEGY_TYPE_MANUAL_CPC = 'cpc'
@@ -902,8 +1581,8 @@ class DailyCampaignMetrics(models.Model):
     )
 
     campaign = models.ForeignKey('django_google_adwords.Campaign', related_name='metrics')
-    avg_cpc = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPC', null=True, blank=True)
-    avg_cpm = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPM', null=True, blank=True)
+    avg_cpc = money_field('Avg. CPC', currency_from='campaign.account')
+    avg_cpm = money_field('Avg. CPM', currency_from='campaign.account')
     avg_position = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Avg. position')
     clicks = models.IntegerField(help_text='Clicks', null=True, blank=True)
     click_conversion_rate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Click conversion rate')
@@ -911,9 +1590,9 @@ class DailyCampaignMetrics(models.Model):
     converted_clicks = models.BigIntegerField(help_text='Converted clicks', null=True, blank=True)
     total_conv_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Total conv. value')
     conversions = models.BigIntegerField(help_text='Conversions', null=True, blank=True)
-    cost = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost', null=True, blank=True)
-    cost_converted_click = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / converted click', null=True, blank=True)
-    cost_conv = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / conv.', null=True, blank=True)
+    cost = money_field('Cost', currency_from='campaign.account')
+    cost_converted_click = money_field('Cost / converted click', currency_from='campaign.account')
+    cost_conv = money_field('Cost / conv.', currency_from='campaign.account')
     ctr = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='CTR')
     impressions = models.BigIntegerField(help_text='Impressions', null=True, blank=True)
     day = models.DateField(help_text='When this metric occurred')
@@ -937,36 +1616,35 @@ class DailyCampaignMetrics(models.Model):
 
     objects = QuerySetManager()
 
+    class Meta:
+        unique_together = (('campaign', 'day'),)
+
     def __unicode__(self):
         return '%s' % (self.day)
 
-    class QuerySet(PopulatingGoogleAdWordsQuerySet):
+    class QuerySet(PeriodAggregateQuerySet):
+        LEVEL = Account.LEVEL_CAMPAIGN
+        ROLLUP_MODEL = 'CampaignMetricsRollup'
 
         def populate(self, data, campaign):
             year, month, day = [int(i) for i in data.get('Day').split('-')]
             day = date(year, month, day)
             identifier = '%s-%s' % (campaign.pk, day)
 
-            while not acquire_googleadwords_lock(DailyCampaignMetrics, identifier):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", DailyCampaignMetrics.__name__, identifier)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", DailyCampaignMetrics.__name__, identifier)
+            with googleadwords_lock(DailyCampaignMetrics, identifier):
                 return self._populate(data,
                                       ignore_fields=['campaign', 'campaign_id'],
                                       day=day,
                                       campaign=campaign)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", DailyCampaignMetrics.__name__, identifier)
-                release_googleadwords_lock(DailyCampaignMetrics, identifier)
-
-        def within_period(self, start, finish):
-            return self.filter(day__gte=start, day__lte=finish)
+        def build(self, data, campaign):
+            return self._build(data,
+                               ignore_fields=['campaign', 'campaign_id'],
+                               day=data.get('Day'),
+                               campaign=campaign)
 
         def total_clicks_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('clicks'))
+            return self.aggregate_for_period(start, finish, Sum('clicks'))
 
         def total_clicks(self):
             return self.aggregate(Sum('clicks'))
@@ -983,6 +1661,8 @@ class AdGroup(models.Model):
     )
 
     campaign = models.ForeignKey('django_google_adwords.Campaign', related_name='ad_groups')
+    # Denormalized campaign.account
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
     ad_group_id = models.BigIntegerField(unique=True)
     ad_group = models.CharField(max_length=255, help_text='Ad group name', null=True, blank=True)
     ad_group_state = models.CharField(max_length=20, choices=STATE_CHOICES, null=True, blank=True)
@@ -1003,27 +1683,19 @@ class AdGroup(models.Model):
             ad_group_id = int(data.get('Ad group ID'))
 
             # Get a lock based upon the ad_group_id
-            while not acquire_googleadwords_lock(AdGroup, ad_group_id):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", AdGroup.__name__, ad_group_id)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", AdGroup.__name__, ad_group_id)
+            with googleadwords_lock(AdGroup, ad_group_id):
                 return self._populate(data,
-                                      ignore_fields=['campaign', 'campaign_id'],
+                                      ignore_fields=['campaign', 'campaign_id', 'account', 'account_id'],
+                                      defaults={'account_id': campaign.account_id},
                                       ad_group_id=ad_group_id,
                                       campaign=campaign)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", AdGroup.__name__, ad_group_id)
-                release_googleadwords_lock(AdGroup, ad_group_id)
-
         def top_by_clicks(self, start, finish):
             return self.filter(metrics__day__gte=start, metrics__day__lte=finish) \
                 .annotate(clicks=Sum('metrics__clicks'),
                           impressions=Sum('metrics__impressions'),
                           ctr=Avg('metrics__ctr'),
-                          cost=Sum('metrics__cost'),
+                          cost=money_aggregate(Sum('metrics__cost')),
                           avg_position=Avg('metrics__avg_position')) \
                 .order_by('-clicks')
 
@@ -1031,16 +1703,16 @@ class AdGroup(models.Model):
             return self.filter(metrics__day__gte=start, metrics__day__lte=finish) \
                        .annotate(conversions=Sum('metrics__conversions'),
                                  conv_rate=Avg('metrics__conv_rate'),
-                                 cost_conv=Avg('metrics__cost_conv'),
+                                 cost_conv=money_aggregate(Avg('metrics__cost_conv')),
                                  impressions=Sum('metrics__impressions'),
                                  clicks=Sum('metrics__clicks'),
-                                 cost=Sum('metrics__cost'),
+                                 cost=money_aggregate(Sum('metrics__cost')),
                                  ctr=Avg('metrics__ctr'),
-                                 avg_cpc=Avg('metrics__avg_cpc')) \
+                                 avg_cpc=money_aggregate(Avg('metrics__avg_cpc'))) \
                        .order_by('-conversions')
 
         def account(self, account):
-            return self.filter(campaign__account=account)
+            return self.filter(account=account)
 
         def enabled(self):
             return self.filter(ad_group_state=AdGroup.STATE_ENABLED)
@@ -1109,7 +1781,7 @@ class AdGroup(models.Model):
         return report_definition
 
 
-class DailyAdGroupMetrics(models.Model):
+class DailyAdGroupMetrics(DailyMetricsModel):
     BID_STRATEGY_TYPE_BUDGET_OPTIMIZER = 'auto'
     BID_STRATEGY_TYPE_CONVERSION_OPTIMIZER = 'max/target cpa'
     BID_STRATEGY_TYPE_MANUAL_CPC = 'cpc'
@@ -1138,8 +1810,10 @@ class DailyAdGroupMetrics(models.Model):
     )
 
     ad_group = models.ForeignKey('django_google_adwords.AdGroup', related_name='metrics')
-    avg_cpc = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPC', null=True, blank=True)
-    avg_cpm = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPM', null=True, blank=True)
+    # Denormalized ad_group.account
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
+    avg_cpc = money_field('Avg. CPC')
+    avg_cpm = money_field('Avg. CPM')
     avg_position = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Avg. position')
     clicks = models.IntegerField(help_text='Clicks', null=True, blank=True)
     click_conversion_rate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Click conversion rate')
@@ -1147,9 +1821,9 @@ class DailyAdGroupMetrics(models.Model):
     converted_clicks = models.BigIntegerField(help_text='Converted clicks', null=True, blank=True)
     total_conv_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Total conv. value')
     conversions = models.BigIntegerField(help_text='Conversions', null=True, blank=True)
-    cost = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost', null=True, blank=True)
-    cost_converted_click = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / converted click', null=True, blank=True)
-    cost_conv = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / conv.', null=True, blank=True)
+    cost = money_field('Cost')
+    cost_converted_click = money_field('Cost / converted click')
+    cost_conv = money_field('Cost / conv.')
     ctr = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='CTR')
     impressions = models.BigIntegerField(help_text='Impressions', null=True, blank=True)
     day = models.DateField(help_text='When this metric occurred')
@@ -1169,35 +1843,37 @@ class DailyAdGroupMetrics(models.Model):
 
     objects = QuerySetManager()
 
+    class Meta:
+        unique_together = (('ad_group', 'day'),)
+        index_together = (('account', 'day'),)
+
     def __unicode__(self):
         return '%s' % (self.day)
 
-    class QuerySet(PopulatingGoogleAdWordsQuerySet):
+    class QuerySet(PeriodAggregateQuerySet):
+        LEVEL = Account.LEVEL_AD_GROUP
+        ROLLUP_MODEL = 'AdGroupMetricsRollup'
 
         def populate(self, data, ad_group):
             day = data.get('Day')
             identifier = '%s-%s' % (ad_group.pk, day)
 
-            while not acquire_googleadwords_lock(DailyAdGroupMetrics, identifier):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", DailyAdGroupMetrics.__name__, identifier)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", DailyAdGroupMetrics.__name__, identifier)
+            with googleadwords_lock(DailyAdGroupMetrics, identifier):
                 return self._populate(data,
-                                      ignore_fields=['ad_group', 'ad_group_id'],
+                                      ignore_fields=['ad_group', 'ad_group_id', 'account', 'account_id'],
+                                      defaults={'account_id': ad_group.account_id},
                                       day=day,
                                       ad_group=ad_group)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", DailyAdGroupMetrics.__name__, identifier)
-                release_googleadwords_lock(DailyAdGroupMetrics, identifier)
-
-        def within_period(self, start, finish):
-            return self.filter(day__gte=start, day__lte=finish)
+        def build(self, data, ad_group):
+            return self._build(data,
+                               ignore_fields=['ad_group', 'ad_group_id', 'account', 'account_id'],
+                               defaults={'account_id': ad_group.account_id},
+                               day=data.get('Day'),
+                               ad_group=ad_group)
 
         def total_clicks_for_period(self, start, finish):
-            return self.within_period(start, finish).aggregate(Sum('clicks'))
+            return self.aggregate_for_period(start, finish, Sum('clicks'))
 
         def total_clicks(self):
             return self.aggregate(Sum('clicks'))
@@ -1254,6 +1930,8 @@ class Ad(models.Model):
     )
 
     ad_group = models.ForeignKey('django_google_adwords.AdGroup', related_name='ads')
+    # Denormalized ad_group.account
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
     ad_id = models.BigIntegerField(help_text='Googles Ad ID')
     ad_state = models.CharField(max_length=20, choices=STATE_CHOICES, null=True, blank=True)
     ad_type = models.CharField(max_length=20, choices=TYPE_CHOICES, null=True, blank=True)
@@ -1280,27 +1958,19 @@ class Ad(models.Model):
             ad_id = int(data.get('Ad ID'))
 
             # Get a lock based upon the campaign id
-            while not acquire_googleadwords_lock(Ad, ad_id):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", Ad.__name__, ad_id)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", Ad.__name__, ad_id)
+            with googleadwords_lock(Ad, ad_id):
                 return self._populate(data,
-                                      ignore_fields=['ad_group', 'ad_group_id'],
+                                      ignore_fields=['ad_group', 'ad_group_id', 'account', 'account_id'],
+                                      defaults={'account_id': ad_group.account_id},
                                       ad_id=ad_id,
                                       ad_group=ad_group)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", Ad.__name__, ad_id)
-                release_googleadwords_lock(Ad, ad_id)
-
         def top_by_clicks(self, start, finish):
             return self.filter(metrics__day__gte=start, metrics__day__lte=finish) \
                        .annotate(clicks=Sum('metrics__clicks'),
                                  impressions=Sum('metrics__impressions'),
                                  ctr=Avg('metrics__ctr'),
-                                 cost=Sum('metrics__cost'),
+                                 cost=money_aggregate(Sum('metrics__cost')),
                                  avg_position=Avg('metrics__avg_position')) \
                        .order_by('-clicks')
 
@@ -1308,16 +1978,16 @@ class Ad(models.Model):
             return self.filter(metrics__day__gte=start, metrics__day__lte=finish) \
                        .annotate(conversions=Sum('metrics__conversions'),
                                  conv_rate=Avg('metrics__conv_rate'),
-                                 cost_conv=Avg('metrics__cost_conv'),
+                                 cost_conv=money_aggregate(Avg('metrics__cost_conv')),
                                  impressions=Sum('metrics__impressions'),
                                  clicks=Sum('metrics__clicks'),
-                                 cost=Sum('metrics__cost'),
+                                 cost=money_aggregate(Sum('metrics__cost')),
                                  ctr=Avg('metrics__ctr'),
-                                 avg_cpc=Avg('metrics__avg_cpc')) \
+                                 avg_cpc=money_aggregate(Avg('metrics__avg_cpc'))) \
                        .order_by('-conversions')
 
         def account(self, account):
-            return self.filter(ad_group__campaign__account=account)
+            return self.filter(account=account)
 
         def enabled(self):
             return self.filter(ad_state=Ad.STATE_ENABLED)
@@ -1389,10 +2059,12 @@ class Ad(models.Model):
         return report_definition
 
 
-class DailyAdMetrics(models.Model):
+class DailyAdMetrics(DailyMetricsModel):
     ad = models.ForeignKey('django_google_adwords.Ad', related_name='metrics')
-    avg_cpc = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPC', null=True, blank=True)
-    avg_cpm = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Avg. CPM', null=True, blank=True)
+    # Denormalized ad.account
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
+    avg_cpc = money_field('Avg. CPC')
+    avg_cpm = money_field('Avg. CPM')
     avg_position = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Avg. position')
     clicks = models.IntegerField(help_text='Clicks', null=True, blank=True)
     click_conversion_rate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Click conversion rate')
@@ -1400,9 +2072,9 @@ class DailyAdMetrics(models.Model):
     converted_clicks = models.BigIntegerField(help_text='Converted clicks', null=True, blank=True)
     total_conv_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Total conv. value')
     conversions = models.BigIntegerField(help_text='Conversions', null=True, blank=True)
-    cost = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost', null=True, blank=True)
-    cost_converted_click = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / converted click', null=True, blank=True)
-    cost_conv = MoneyField(max_digits=12, decimal_places=2, default=0, help_text='Cost / conv.', null=True, blank=True)
+    cost = money_field('Cost')
+    cost_converted_click = money_field('Cost / converted click')
+    cost_conv = money_field('Cost / conv.')
     ctr = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='CTR')
     impressions = models.BigIntegerField(help_text='Impressions', null=True, blank=True)
     day = models.DateField(help_text='When this metric occurred')
@@ -1414,29 +2086,251 @@ class DailyAdMetrics(models.Model):
 
     objects = QuerySetManager()
 
+    class Meta:
+        unique_together = (('ad', 'day'),)
+        index_together = (('account', 'day'),)
+
     def __unicode__(self):
         return '%s' % self.day
 
-    class QuerySet(PopulatingGoogleAdWordsQuerySet):
+    class QuerySet(PeriodAggregateQuerySet):
+        LEVEL = Account.LEVEL_AD
+        ROLLUP_MODEL = 'AdMetricsRollup'
 
         def populate(self, data, ad):
             day = data.get('Day')
             identifier = '%s-%s' % (ad.pk, day)
 
-            while not acquire_googleadwords_lock(DailyAdMetrics, identifier):
-                locking_logger.debug("Waiting for acquire_googleadwords_lock: %s:%s", DailyAdMetrics.__name__, identifier)
-                time.sleep(settings.GOOGLEADWORDS_LOCK_WAIT)
-
-            try:
-                locking_logger.debug("Success acquire_googleadwords_lock: %s:%s", DailyAdMetrics.__name__, identifier)
+            with googleadwords_lock(DailyAdMetrics, identifier):
                 return self._populate(data,
-                                      ignore_fields=['ad', 'ad_id'],
+                                      ignore_fields=['ad', 'ad_id', 'account', 'account_id'],
+                                      defaults={'account_id': ad.account_id},
                                       day=day,
                                       ad=ad)
 
-            finally:
-                locking_logger.debug("Releasing acquire_googleadwords_lock: %s:%s", DailyAdMetrics.__name__, identifier)
-                release_googleadwords_lock(DailyAdMetrics, identifier)
+        def build(self, data, ad):
+            return self._build(data,
+                               ignore_fields=['ad', 'ad_id', 'account', 'account_id'],
+                               defaults={'account_id': ad.account_id},
+                               day=data.get('Day'),
+                               ad=ad)
+
+
+class MetricsRollup(models.Model):
+    """
+    A week or month rollup of the daily metrics of a level, holding the sum and the number
+    of (non null) values of each of ROLLUP_FIELDS per DIMENSIONS over the period.
+
+    Rollups are kept up to date by the Account.sync_* tasks (see Account.refresh_rollups)
+    for the periods containing the days imported when GOOGLEADWORDS_METRICS_ROLLUPS is set,
+    and answer the period aggregates of the daily metrics, see PeriodAggregateQuerySet.
+    With GOOGLEADWORDS_MONEY_MICROS the sums of the money fields are in micros.
+    """
+    GRAIN_CHOICES = (
+        (GRAIN_WEEK, 'Week'),
+        (GRAIN_MONTH, 'Month'),
+    )
+
+    SUMMED_FIELDS = ('impressions', 'clicks', 'cost', 'conversions', 'converted_clicks', 'total_conv_value',)
+    AVERAGED_FIELDS = ('avg_cpc', 'avg_cpm', 'avg_position', 'ctr', 'click_conversion_rate', 'conv_rate',
+                       'cost_converted_click', 'cost_conv',)
+    ROLLUP_FIELDS = SUMMED_FIELDS + AVERAGED_FIELDS
+
+    # The daily metrics model rolled up, the fields rolled up per and the lookup from both to the Account
+    DAILY_MODEL = None
+    DIMENSIONS = ()
+    ACCOUNT_LOOKUP = None
+
+    grain = models.CharField(max_length=5, choices=GRAIN_CHOICES)
+    period_start = models.DateField()
+    period_finish = models.DateField()
+    rows = models.IntegerField(default=0, help_text='Daily rows rolled up')
+    impressions_sum = models.BigIntegerField(null=True, blank=True)
+    impressions_count = models.IntegerField(default=0)
+    clicks_sum = models.BigIntegerField(null=True, blank=True)
+    clicks_count = models.IntegerField(default=0)
+    cost_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    cost_count = models.IntegerField(default=0)
+    conversions_sum = models.BigIntegerField(null=True, blank=True)
+    conversions_count = models.IntegerField(default=0)
+    converted_clicks_sum = models.BigIntegerField(null=True, blank=True)
+    converted_clicks_count = models.IntegerField(default=0)
+    total_conv_value_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    total_conv_value_count = models.IntegerField(default=0)
+    avg_cpc_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    avg_cpc_count = models.IntegerField(default=0)
+    avg_cpm_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    avg_cpm_count = models.IntegerField(default=0)
+    avg_position_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    avg_position_count = models.IntegerField(default=0)
+    ctr_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    ctr_count = models.IntegerField(default=0)
+    click_conversion_rate_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    click_conversion_rate_count = models.IntegerField(default=0)
+    conv_rate_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    conv_rate_count = models.IntegerField(default=0)
+    cost_converted_click_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    cost_converted_click_count = models.IntegerField(default=0)
+    cost_conv_sum = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    cost_conv_count = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = QuerySetManager()
+
+    class Meta:
+        abstract = True
+
+    def __unicode__(self):
+        return '%s %s' % (self.grain, self.period_start)
+
+    @classmethod
+    def rollup_aggregates(cls):
+        """
+        Returns the aggregates of the daily rows giving the values of a rollup.
+        """
+        aggregates = {'rows': Count('id')}
+        for field in cls.ROLLUP_FIELDS:
+            aggregates['%s_sum' % field] = Sum(field)
+            aggregates['%s_count' % field] = Count(field)
+        return aggregates
+
+    class QuerySet(_QuerySet):
+
+        def account(self, account):
+            return self.filter(**{self.model.ACCOUNT_LOOKUP: account})
+
+        def compacted_before(self, account):
+            return MetricsCoverage.objects.get_coverage(account, self.model.DAILY_MODEL.QuerySet.LEVEL).compacted_before
+
+        def refresh(self, account, days):
+            """
+            Recompute the week and month rollups of account containing days from the daily rows.
+
+            The rollups of periods starting before the daily rows were compacted are final,
+            the weeks spanning compacted_before aren't used by aggregate_for_period.
+            """
+            model = self.model
+            daily = model.DAILY_MODEL.objects.filter(**{model.ACCOUNT_LOOKUP: account})
+            attnames = dict((dimension, model._meta.get_field(dimension).attname) for dimension in model.DIMENSIONS)
+            compacted_before = self.compacted_before(account)
+            for grain, period_start, period_finish in touched_periods(days):
+                if compacted_before is not None and period_start < compacted_before:
+                    continue
+                with googleadwords_lock(model, '%s-%s-%s' % (account.pk, grain, period_start)), transaction.atomic():
+                    rollups = [model(grain=grain, period_start=period_start, period_finish=period_finish,
+                                     **dict((attnames.get(key, key), value) for key, value in row.items()))
+                               for row in daily.within_period(period_start, period_finish)
+                                               .values(*model.DIMENSIONS).annotate(**model.rollup_aggregates())]
+                    self.account(account).filter(grain=grain, period_start=period_start).delete()
+                    model.objects.bulk_create(rollups)
+
+        def rebuild(self, account):
+            """
+            Recompute all of the rollups of account from the daily rows, other than those of
+            the periods compacted.
+            """
+            rollups = self.account(account)
+            compacted_before = self.compacted_before(account)
+            if compacted_before is not None:
+                rollups = rollups.filter(period_start__gte=compacted_before)
+            rollups.delete()
+            days = self.model.DAILY_MODEL.objects.filter(**{self.model.ACCOUNT_LOOKUP: account}).dates('day', 'day')
+            self.refresh(account, days)
+
+        def compact(self, account, before, batch_size=None):
+            """
+            Compact the daily rows of account before the day before, the first of a month, into
+            the rollups. The week and month rollups of their days are refreshed, then the daily
+            rows are deleted batch_size rows at a time.
+
+            Rollups keep sums and counts, so sums and averages over the periods they tile are
+            unchanged; the other fields of the daily rows are lost. Afterwards periods before
+            that aren't tiled by rollups can't be answered, see rollups.compacted_days.
+
+            :return: The number of daily rows deleted.
+            """
+            if not settings.GOOGLEADWORDS_METRICS_ROLLUPS:
+                raise ImproperlyConfigured("Compacting the daily metrics needs GOOGLEADWORDS_METRICS_ROLLUPS.")
+            if before != month_start(before):
+                raise ValueError("before must be the first of a month, not '%s'." % before)
+            model = self.model
+            level = model.DAILY_MODEL.QuerySet.LEVEL
+            batch_size = batch_size or settings.GOOGLEADWORDS_COMPACT_BATCH_SIZE
+
+            daily = model.DAILY_MODEL.objects.filter(**{model.ACCOUNT_LOOKUP: account}).filter(day__lt=before)
+            self.refresh(account, daily.dates('day', 'day'))
+
+            deleted = 0
+            while True:
+                pks = list(daily.order_by().values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                model.DAILY_MODEL.objects.filter(pk__in=pks, day__lt=before).delete()
+                deleted += len(pks)
+
+            with googleadwords_lock(MetricsCoverage, '%s-%s' % (account.pk, level)):
+                coverage = MetricsCoverage.objects.get_coverage(account, level)
+                if coverage.compacted_before is None or coverage.compacted_before < before:
+                    coverage.compacted_before = before
+                    coverage.save()
+            invalidate_aggregates(account.pk, level)
+            return deleted
+
+
+class AccountMetricsRollup(MetricsRollup):
+    DAILY_MODEL = DailyAccountMetrics
+    DIMENSIONS = ('account', 'device',)
+    ACCOUNT_LOOKUP = 'account'
+
+    account = models.ForeignKey('django_google_adwords.Account', related_name='metrics_rollups')
+    device = models.CharField(max_length=255, choices=DailyAccountMetrics.DEVICE_CHOICES)
+
+    class Meta:
+        unique_together = (('account', 'device', 'grain', 'period_start'),)
+
+
+class CampaignMetricsRollup(MetricsRollup):
+    DAILY_MODEL = DailyCampaignMetrics
+    DIMENSIONS = ('campaign',)
+    ACCOUNT_LOOKUP = 'campaign__account'
+
+    campaign = models.ForeignKey('django_google_adwords.Campaign', related_name='metrics_rollups')
+
+    class Meta:
+        unique_together = (('campaign', 'grain', 'period_start'),)
+
+
+class AdGroupMetricsRollup(MetricsRollup):
+    DAILY_MODEL = DailyAdGroupMetrics
+    DIMENSIONS = ('account', 'ad_group',)
+    ACCOUNT_LOOKUP = 'account'
+
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
+    ad_group = models.ForeignKey('django_google_adwords.AdGroup', related_name='metrics_rollups')
+
+    class Meta:
+        unique_together = (('ad_group', 'grain', 'period_start'),)
+
+
+class AdMetricsRollup(MetricsRollup):
+    DAILY_MODEL = DailyAdMetrics
+    DIMENSIONS = ('account', 'ad',)
+    ACCOUNT_LOOKUP = 'account'
+
+    account = models.ForeignKey('django_google_adwords.Account', related_name='+', null=True, blank=True)
+    ad = models.ForeignKey('django_google_adwords.Ad', related_name='metrics_rollups')
+
+    class Meta:
+        unique_together = (('ad', 'grain', 'period_start'),)
+
+
+# The rollups of the metrics imported at each level
+LEVEL_ROLLUP_MODELS = {
+    Account.LEVEL_ACCOUNT: AccountMetricsRollup,
+    Account.LEVEL_CAMPAIGN: CampaignMetricsRollup,
+    Account.LEVEL_AD_GROUP: AdGroupMetricsRollup,
+    Account.LEVEL_AD: AdMetricsRollup,
+}
 
 
 def reportfile_file_upload_to(instance, filename):
@@ -1452,6 +2346,7 @@ def reportfile_file_upload_to(instance, filename):
 class ReportFile(models.Model):
     file = models.FileField(max_length=255, upload_to=reportfile_file_upload_to, null=True, blank=True)
     processed = models.BooleanField(default=False)
+    host = models.CharField(max_length=255, null=True, blank=True, help_text='Host the report was downloaded on')
     created = models.DateTimeField(auto_now_add=True)
 
     objects = QuerySetManager()
@@ -1461,7 +2356,7 @@ class ReportFile(models.Model):
 
     class QuerySet(_QuerySet):
         def request(self, report_definition, client_customer_id,
-                    include_zero_impressions=True):
+                    include_zero_impressions=True, report_downloader=None):
             """
             Fields and report types can be found here https://developers.google.com/adwords/api/docs/appendix/reports
 
@@ -1492,17 +2387,22 @@ class ReportFile(models.Model):
 
             @param report_definition: A dict of values used to specify a report to get from the API.
             @param client_customer_id: A string containing the AdWords Customer Client ID.
+            @param report_downloader: An optional ReportDownloader to reuse, one is created for
+                                      client_customer_id if not supplied.
             @return OrderedDict containing report
             """
-            client = adwords_service(client_customer_id)
-            report_downloader = client.GetReportDownloader(version=settings.GOOGLEADWORDS_CLIENT_VERSION)
+            if report_downloader is None:
+                client = adwords_service(client_customer_id)
+                report_downloader = client.GetReportDownloader(version=settings.GOOGLEADWORDS_CLIENT_VERSION)
 
             try:
-                report_file = ReportFile.objects.create()
+                report_file = ReportFile.objects.create(host=socket.gethostname())
                 with report_file.file_manager('%s.gz' % report_file.pk) as f:
-                    report_downloader.DownloadReport(
-                        report_definition, output=f,
-                        include_zero_impressions=include_zero_impressions)
+                    with stage('download') as counters:
+                        report_downloader.DownloadReport(
+                            report_definition, output=f,
+                            include_zero_impressions=include_zero_impressions)
+                        counters['bytes'] = f.tell()
                 return report_file
             except GoogleAdsError as e:
                 report_file.delete()  # cleanup
@@ -1520,26 +2420,20 @@ class ReportFile(models.Model):
     @contextmanager
     def file_manager(self, filename):
         """
-        Yields a temporary file like object which is then saved.
+        Yields a temporary file like object which is then saved to storage.
 
         This can be used to safely write to the file attribute and ensure that
-        upon an error the file is removed (ie.. there is cleanup).
+        upon an error nothing is saved (ie.. there is cleanup). If the report file
+        cache is enabled the file is also placed in the cache.
         """
-        self.file.name = reportfile_file_upload_to(self, filename)
-        # Ensure directory exists
-        path = os.path.dirname(self.file.path)
-        try:
-            os.makedirs(path)
-        except OSError as exc:  # Python >2.5
-            if exc.errno == errno.EEXIST and os.path.isdir(path):
-                pass
-            else:
-                raise
-
-        # Write to file
-        with open(self.file.path, mode='wb') as f:
+        with tempfile.TemporaryFile() as f:
             yield f
-            self.save()
+            f.seek(0)
+            self.file.save(filename, File(f, name=filename))
+
+            cache = get_report_file_cache()
+            if cache is not None:
+                cache.put(self.file.name, f)
 
     def save_path(self, path):
         """
@@ -1553,13 +2447,46 @@ class ReportFile(models.Model):
         """
         self.file.save(os.path.basename(f.name), File(f))
 
+    @contextmanager
+    def open_stream(self):
+        """
+        Yields a binary file like object of the report read through the storage API, or
+        from the local report file cache if it is enabled and still has it.
+        """
+        cached = None
+        cache = get_report_file_cache()
+        if cache is not None:
+            try:
+                cached = open(cache.get(self.file), 'rb')
+            except IOError as exc:
+                # Evicted by another process since
+                if exc.errno != errno.ENOENT:
+                    raise
+        if cached is not None:
+            with cached as f:
+                yield f
+        else:
+            self.file.open('rb')
+            try:
+                yield self.file
+            finally:
+                self.file.close()
+
     def dehydrate(self):
         """
-        Yield each row in the report as a dict.
+        Returns an iterator over each row in the report as a dict.
+
+        The time spent reading, decompressing and parsing the report is recorded as the
+        parse stage, see instrumentation.SyncStats.
         """
+        return timed_iteration('parse', self._dehydrate())
+
+    def _dehydrate(self):
         name = None
         fields = None
-        with gzip.open(self.file.path, 'rt') as csv_file:
+        with self.open_stream() as f:
+            gzip_file = gzip.GzipFile(fileobj=f, mode='rb')
+            csv_file = gzip_file if six.PY2 else io.TextIOWrapper(gzip_file, encoding='utf-8', newline='')
             csv_reader = UnicodeReader(csv_file)
             for row in csv_reader:
                 if name is None:
@@ -1573,5 +2500,293 @@ class ReportFile(models.Model):
 
 def receiver_delete_reportfile(sender, instance, **kwargs):
     if instance.file:
+        cache = get_report_file_cache()
+        if cache is not None:
+            cache.delete(instance.file.name)
         instance.file.delete(save=False)
 post_delete.connect(receiver_delete_reportfile, ReportFile)
+
+
+class SyncRun(models.Model):
+    """
+    A record of the sync of an account at a level, used for capacity planning.
+
+    A SyncRun is created for each level by Account.sync, the download figures are
+    recorded by Account.create_report_file(s) and the import figures by the
+    Account.finish_*_sync tasks. Timings are in seconds.
+    """
+    STATUS_STARTED = 'started'
+    STATUS_DOWNLOADED = 'downloaded'
+    STATUS_FINISHED = 'finished'
+    STATUS_ABANDONED = 'abandoned'
+    STATUS_CHOICES = (
+        (STATUS_STARTED, 'Started'),
+        (STATUS_DOWNLOADED, 'Downloaded'),
+        (STATUS_FINISHED, 'Finished'),
+        (STATUS_ABANDONED, 'Abandoned'),
+    )
+
+    LEVEL_CHOICES = (
+        (Account.LEVEL_ACCOUNT, 'Account'),
+        (Account.LEVEL_CAMPAIGN, 'Campaign'),
+        (Account.LEVEL_AD_GROUP, 'Ad Group'),
+        (Account.LEVEL_AD, 'Ad'),
+    )
+
+    # The model holding the metrics imported at each level
+    LEVEL_METRICS_MODELS = {
+        Account.LEVEL_ACCOUNT: 'dailyaccountmetrics',
+        Account.LEVEL_CAMPAIGN: 'dailycampaignmetrics',
+        Account.LEVEL_AD_GROUP: 'dailyadgroupmetrics',
+        Account.LEVEL_AD: 'dailyadmetrics',
+    }
+
+    account = models.ForeignKey('django_google_adwords.Account', related_name='sync_runs')
+    level = models.CharField(max_length=32, choices=LEVEL_CHOICES)
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=STATUS_STARTED)
+    started = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text='Started to finished')
+    auth_seconds = models.FloatField(null=True, blank=True)
+    download_seconds = models.FloatField(null=True, blank=True)
+    report_bytes = models.BigIntegerField(null=True, blank=True)
+    import_seconds = models.FloatField(null=True, blank=True)
+    parse_seconds = models.FloatField(null=True, blank=True)
+    db_read_seconds = models.FloatField(null=True, blank=True)
+    db_write_seconds = models.FloatField(null=True, blank=True)
+    finish_seconds = models.FloatField(null=True, blank=True)
+    rows = models.IntegerField(null=True, blank=True, help_text='Rows in the report')
+    rows_inserted = models.IntegerField(null=True, blank=True)
+    rows_updated = models.IntegerField(null=True, blank=True)
+    rows_skipped = models.IntegerField(null=True, blank=True)
+
+    objects = QuerySetManager()
+
+    class Meta:
+        get_latest_by = 'started'
+        index_together = (('account', 'level', 'finished'),)
+
+    def __unicode__(self):
+        return '%s %s %s' % (self.account, self.level, self.started)
+
+    @property
+    def rows_per_second(self):
+        if self.rows is None or not self.import_seconds:
+            return None
+        return self.rows / self.import_seconds
+
+    class QuerySet(_QuerySet):
+
+        def account(self, account):
+            return self.filter(account=account)
+
+        def level(self, level):
+            return self.filter(level=level)
+
+        def finished(self):
+            return self.filter(status=SyncRun.STATUS_FINISHED)
+
+        def start_run(self, account, level):
+            """
+            Returns a new SyncRun for account and level. Earlier runs that never finished (ie..
+            a task of their sync died) are marked abandoned so open_run doesn't return them.
+            """
+            self.filter(account=account, level=level).abandon()
+            return self.create(account=account, level=level)
+
+        def abandon(self):
+            """
+            Mark the unfinished runs abandoned, ie.. their download or import failed or died.
+            """
+            return self.filter(finished__isnull=True).update(status=SyncRun.STATUS_ABANDONED, finished=timezone.now())
+
+        def open_run(self, account, level):
+            """
+            Returns the latest unfinished SyncRun for account and level or None.
+            """
+            return self.filter(account=account, level=level, finished__isnull=True).order_by('-started', '-pk').first()
+
+        def record_download(self, account, level, stats):
+            """
+            Record the download stages of stats (see instrumentation.SyncStats) on the open run.
+            """
+            run = self.open_run(account, level)
+            if run is None:
+                return None
+            run.status = SyncRun.STATUS_DOWNLOADED
+            run.auth_seconds = stats.seconds('auth')
+            run.download_seconds = stats.seconds('download')
+            run.report_bytes = stats.counter('download', 'bytes')
+            run.save()
+            return run
+
+        def record_finish(self, account, level, result, stats):
+            """
+            Record the import result (see Account.sync_account) and the finish stages of stats
+            on the open run and mark it finished. The rows inserted and updated are those
+            counted by the loader of the import, see loaders.
+            """
+            run = self.open_run(account, level)
+            if run is None:
+                return None
+
+            if result:
+                stages = result.get('stages', {})
+
+                def seconds(name):
+                    return stages.get(name, {}).get('seconds')
+
+                model_name = SyncRun.LEVEL_METRICS_MODELS[level]
+                run.rows = result.get('rows')
+                run.import_seconds = seconds('import')
+                run.parse_seconds = seconds('parse')
+                run.db_read_seconds = seconds('db_read')
+                run.db_write_seconds = seconds('db_write')
+                run.rows_inserted = stages.get('db_write', {}).get('%s_inserted' % model_name, 0)
+                run.rows_updated = stages.get('db_write', {}).get('%s_updated' % model_name, 0)
+                if run.rows is not None:
+                    run.rows_skipped = run.rows - run.rows_inserted - run.rows_updated
+
+            run.status = SyncRun.STATUS_FINISHED
+            run.finish_seconds = stats.seconds('finish')
+            run.finished = timezone.now()
+            run.duration = (run.finished - run.started).total_seconds()
+            run.save()
+            return run
+
+        def percentiles(self, field='duration', percentiles=(50, 90, 99)):
+            """
+            Returns a dict of percentile to the value of field (ie.. duration, import_seconds)
+            at that percentile, using the nearest rank method. Runs without a value are ignored.
+            """
+            values = list(self.exclude(**{'%s__isnull' % field: True}).order_by(field).values_list(field, flat=True))
+            result = {}
+            for percentile in percentiles:
+                if values:
+                    rank = max(1, int(math.ceil(percentile / 100.0 * len(values))))
+                    result[percentile] = values[rank - 1]
+                else:
+                    result[percentile] = None
+            return result
+
+        def throughput_by_day(self):
+            """
+            Returns a list of (day, runs, rows, import_seconds, rows_per_second) for each day
+            a finished import ran on, oldest first.
+            """
+            days = OrderedDict()
+            runs = self.exclude(rows__isnull=True).exclude(import_seconds__isnull=True) \
+                       .order_by('started').values_list('started', 'rows', 'import_seconds')
+            for started, rows, import_seconds in runs:
+                if timezone.is_aware(started):
+                    started = timezone.localtime(started)
+                day = days.setdefault(started.date(), [0, 0, 0.0])
+                day[0] += 1
+                day[1] += rows
+                day[2] += import_seconds
+            return [(day, runs, rows, seconds, rows / seconds if seconds else None)
+                    for day, (runs, rows, seconds) in days.items()]
+
+
+class MetricsCoverage(models.Model):
+    """
+    The days an account has metrics imported for at a level, kept as run-length ranges of
+    day ordinals (see coverage) so is_synced and the gaps of a period are answered without
+    scanning the metrics.
+
+    Coverage is recorded by the Account.sync_* tasks for the days in the report imported,
+    days AdWords doesn't report (ie.. without impressions) aren't covered. Days whose daily
+    metrics have been compacted (see MetricsRollup.QuerySet.compact) stay covered but only
+    periods the rollups tile are, see rollups.compacted_days.
+    """
+    account = models.ForeignKey('django_google_adwords.Account', related_name='coverage')
+    level = models.CharField(max_length=32, choices=SyncRun.LEVEL_CHOICES)
+    days = models.TextField(default='[]', help_text='JSON list of [first, last] day ordinals')
+    compacted_before = models.DateField(null=True, blank=True,
+                                        help_text='The daily metrics before have been compacted into the rollups')
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = QuerySetManager()
+
+    class Meta:
+        unique_together = (('account', 'level'),)
+
+    def __unicode__(self):
+        return '%s %s' % (self.account, self.level)
+
+    def get_ranges(self):
+        return json.loads(self.days)
+
+    def add_days(self, days):
+        self.days = json.dumps(merge_days(self.get_ranges(), days))
+
+    @property
+    def first_day(self):
+        ranges = self.get_ranges()
+        return date.fromordinal(ranges[0][0]) if ranges else None
+
+    @property
+    def last_day(self):
+        ranges = self.get_ranges()
+        return date.fromordinal(ranges[-1][1]) if ranges else None
+
+    def covers(self, start, finish):
+        return covers(self.get_ranges(), start, finish) and not compacted_days(start, finish, self.compacted_before)
+
+    def gaps(self, start, finish):
+        return gaps(self.get_ranges(), start, finish)
+
+    class QuerySet(_QuerySet):
+
+        def account(self, account):
+            return self.filter(account=account)
+
+        def level(self, level):
+            return self.filter(level=level)
+
+        def get_coverage(self, account, level):
+            """
+            Returns the MetricsCoverage of account at level, unsaved and empty if nothing has
+            been recorded.
+            """
+            coverage = self.filter(account=account, level=level).first()
+            if coverage is None:
+                coverage = MetricsCoverage(account_id=getattr(account, 'pk', account), level=level)
+            return coverage
+
+        def record(self, account, level, days):
+            """
+            Add days, the days imported by a sync, to the coverage of account at level.
+            """
+            if not days:
+                return None
+            with googleadwords_lock(MetricsCoverage, '%s-%s' % (account.pk, level)):
+                coverage = self.get_coverage(account, level)
+                coverage.add_days(days)
+                coverage.save()
+            return coverage
+
+        def trim(self, before):
+            """
+            Remove the days before the day before from the coverage, ie.. after the daily rows
+            of those days have been dropped.
+            """
+            for coverage in self:
+                with googleadwords_lock(MetricsCoverage, '%s-%s' % (coverage.account_id, coverage.level)):
+                    coverage = MetricsCoverage.objects.get(pk=coverage.pk)
+                    coverage.days = json.dumps(trim_days(coverage.get_ranges(), before))
+                    coverage.save()
+
+        def rebuild(self, account, level):
+            """
+            Recompute the coverage of account at level from the daily rows, keeping that of
+            the days compacted.
+            """
+            rollup_model = LEVEL_ROLLUP_MODELS[level]
+            days = rollup_model.DAILY_MODEL.objects.filter(**{rollup_model.ACCOUNT_LOOKUP: account}).dates('day', 'day')
+            with googleadwords_lock(MetricsCoverage, '%s-%s' % (account.pk, level)):
+                coverage = self.get_coverage(account, level)
+                compacted = days_before(coverage.get_ranges(), coverage.compacted_before) if coverage.compacted_before else []
+                coverage.days = json.dumps(merge_days(compacted, days))
+                coverage.save()
+            return coverage
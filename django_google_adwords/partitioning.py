@@ -0,0 +1,311 @@
+"""
+Monthly range partitioning of the daily metrics tables by day on PostgreSQL 11 and later,
+enabled by GOOGLEADWORDS_PARTITION_METRICS.
+
+partition_table converts a daily metrics table into one partitioned by day, with a
+partition per month of its data and the upcoming months plus a default partition for
+the days no partition covers. The imports create the partitions of the months they load
+(see MonthlyPartitions) and the maintain_partitions housekeeping task (see tasks)
+creates the partitions of the upcoming months ahead of the imports, moves any rows
+that landed in the default partition into partitions of their own and, with
+GOOGLEADWORDS_PARTITION_RETENTION_MONTHS, detaches and drops the partitions of the
+months past retention rather than deleting their rows.
+"""
+from datetime import date
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection, connections, router, transaction
+
+from .rollups import add_months, month_start, month_finish, to_date
+
+
+PARTITIONED_MODELS = ('DailyAccountMetrics', 'DailyCampaignMetrics', 'DailyAdGroupMetrics', 'DailyAdMetrics',)
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def supports_partitioning(connection):
+    return connection.vendor == 'postgresql' and connection.pg_version >= 110000
+
+
+def partition_name(table, month):
+    return '%s_p%s' % (table, month.strftime('%Y%m'))
+
+
+def default_partition_name(table):
+    return '%s_default' % table
+
+
+def months(start, finish):
+    """
+    Returns the first day of each month from start to finish inclusive.
+    """
+    month, last = month_start(to_date(start)), month_start(to_date(finish))
+    result = []
+    while month <= last:
+        result.append(month)
+        month = add_months(month, 1)
+    return result
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                   "WHERE c.relname = %s AND pg_table_is_visible(c.oid))", [table])
+    return cursor.fetchone()[0]
+
+
+def partitions(cursor, table):
+    """
+    Returns a list of the (month, name) of the monthly partitions of table, oldest first.
+    """
+    cursor.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                   "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s AND pg_table_is_visible(p.oid)", [table])
+    result = []
+    for name, in cursor.fetchall():
+        match = PARTITION_SUFFIX.search(name)
+        if match and name == partition_name(table, date(int(match.group(1)), int(match.group(2)), 1)):
+            result.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(result)
+
+
+def has_partition(cursor, table, name):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                   "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s AND c.relname = %s "
+                   "AND pg_table_is_visible(p.oid))", [table, name])
+    return cursor.fetchone()[0]
+
+
+def default_months(cursor, table, quote_name):
+    """
+    Returns the first day of each month with rows in the default partition of table.
+    """
+    if not has_partition(cursor, table, default_partition_name(table)):
+        return []
+    cursor.execute("SELECT DISTINCT date_trunc('month', %s)::date FROM %s" % (
+        quote_name('day'), quote_name(default_partition_name(table))))
+    return sorted(month for month, in cursor.fetchall())
+
+
+def create_partition(cursor, table, month, quote_name):
+    cursor.execute('CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)' % (
+        quote_name(partition_name(table, month)), quote_name(table)), [month, add_months(month, 1)])
+
+
+def ensure_partition(connection, model, month):
+    """
+    Create the partition of month of the partitioned table of model if it doesn't exist,
+    moving the rows of the month out of the default partition (which would otherwise keep
+    them, and stop the partition being created).
+
+    :return: True if the partition was created.
+    """
+    table = model._meta.db_table
+    default = default_partition_name(table)
+    quote_name = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table) or has_partition(cursor, table, partition_name(table, month)):
+            return False
+        if not has_partition(cursor, table, default):
+            create_partition(cursor, table, month, quote_name)
+            return True
+
+        cursor.execute('ALTER TABLE %s DETACH PARTITION %s' % (quote_name(table), quote_name(default)))
+        create_partition(cursor, table, month, quote_name)
+        bounds = [month, add_months(month, 1)]
+        cursor.execute('INSERT INTO %s SELECT * FROM %s WHERE %s >= %%s AND %s < %%s' % (
+            quote_name(table), quote_name(default), quote_name('day'), quote_name('day')), bounds)
+        cursor.execute('DELETE FROM %s WHERE %s >= %%s AND %s < %%s' % (
+            quote_name(default), quote_name('day'), quote_name('day')), bounds)
+        cursor.execute('ALTER TABLE %s ATTACH PARTITION %s DEFAULT' % (quote_name(table), quote_name(default)))
+    return True
+
+
+class MonthlyPartitions(object):
+    """
+    Creates the partitions of the months of the days an import loads into the table of
+    model that don't have one, checking each month once, see loaders.
+    """
+
+    def __init__(self, connection, model):
+        self.connection = connection
+        self.model = model
+        self.months = set()
+
+    @classmethod
+    def for_model(cls, model):
+        """
+        Returns the MonthlyPartitions of model with GOOGLEADWORDS_PARTITION_METRICS on a
+        database that supports partitioning, otherwise None.
+        """
+        if not settings.GOOGLEADWORDS_PARTITION_METRICS:
+            return None
+        connection = connections[router.db_for_write(model)]
+        if not supports_partitioning(connection):
+            return None
+        return cls(connection, model)
+
+    def ensure(self, day):
+        month = month_start(to_date(day))
+        if month not in self.months:
+            ensure_partition(self.connection, self.model, month)
+            self.months.add(month)
+
+
+def _definitions(cursor, table, quote_name):
+    """
+    Returns the primary key name and the statements recreating the other indexes and the
+    constraints of table.
+    """
+    cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table])
+    row = cursor.fetchone()
+    primary_key = row[0] if row else '%s_pkey' % table
+    cursor.execute("SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = %s::regclass "
+                   "AND NOT i.indisprimary AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+                   [table])
+    statements = [definition for definition, in cursor.fetchall()]
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass "
+                   "AND contype IN ('f', 'u') ORDER BY contype", [table])
+    statements.extend('ALTER TABLE %s ADD CONSTRAINT %s %s' % (quote_name(table), quote_name(name), definition)
+                      for name, definition in cursor.fetchall())
+    return primary_key, statements
+
+
+def _rebuild(connection, model, partitioned, months_ahead=0):
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    new = '%s_rebuild' % table
+    quote_name = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if is_partitioned(cursor, table) == partitioned:
+            return False
+        primary_key, statements = _definitions(cursor, table, quote_name)
+
+        if partitioned:
+            cursor.execute('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%s)' % (
+                quote_name(new), quote_name(table), quote_name('day')))
+            cursor.execute('SELECT MIN(%s) FROM %s' % (quote_name('day'), quote_name(table)))
+            first = cursor.fetchone()[0] or date.today()
+            for month in months(first, add_months(month_start(date.today()), months_ahead)):
+                cursor.execute('CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)' % (
+                    quote_name(partition_name(table, month)), quote_name(new)), [month, add_months(month, 1)])
+            cursor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT' % (quote_name(default_partition_name(table)), quote_name(new)))
+        else:
+            cursor.execute('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % (quote_name(new), quote_name(table)))
+
+        cursor.execute('INSERT INTO %s SELECT * FROM %s' % (quote_name(new), quote_name(table)))
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, pk])
+        sequence = cursor.fetchone()[0]
+        if sequence:
+            cursor.execute('ALTER SEQUENCE %s OWNED BY %s.%s' % (sequence, quote_name(new), quote_name(pk)))
+        cursor.execute('DROP TABLE %s' % quote_name(table))
+        cursor.execute('ALTER TABLE %s RENAME TO %s' % (quote_name(new), quote_name(table)))
+
+        # A primary key (and any unique constraint) of a partitioned table must include day
+        columns = (quote_name(pk), quote_name('day')) if partitioned else (quote_name(pk),)
+        cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s PRIMARY KEY (%s)' % (
+            quote_name(table), quote_name(primary_key), ', '.join(columns)))
+        for statement in statements:
+            cursor.execute(statement)
+    return True
+
+
+def partition_table(connection, model, months_ahead=None):
+    """
+    Convert the table of model, a daily metrics model, into a table partitioned by month.
+
+    :return: False if the table was already partitioned.
+    """
+    if months_ahead is None:
+        months_ahead = settings.GOOGLEADWORDS_PARTITION_MONTHS_AHEAD
+    return _rebuild(connection, model, True, months_ahead)
+
+
+def unpartition_table(connection, model):
+    """
+    Convert the partitioned table of model back into a plain table.
+
+    :return: False if the table wasn't partitioned.
+    """
+    return _rebuild(connection, model, False)
+
+
+def ensure_partitions(connection, model, months_ahead=None, today=None):
+    """
+    Create the partitions of the current and the upcoming months_ahead months of the
+    partitioned table of model, and of the months with rows in its default partition,
+    those that don't exist.
+    """
+    if months_ahead is None:
+        months_ahead = settings.GOOGLEADWORDS_PARTITION_MONTHS_AHEAD
+    current = month_start(today or date.today())
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return
+        stray = default_months(cursor, table, connection.ops.quote_name)
+    for month in sorted(set(months(current, add_months(current, months_ahead))) | set(stray)):
+        ensure_partition(connection, model, month)
+
+
+def drop_partitions(connection, model, before):
+    """
+    Detach and drop the monthly partitions of the table of model that finish before the
+    day before.
+
+    :return: A list of the months dropped.
+    """
+    table = model._meta.db_table
+    quote_name = connection.ops.quote_name
+    dropped = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return dropped
+        for month, name in partitions(cursor, table):
+            if month_finish(month) >= before:
+                break
+            cursor.execute('ALTER TABLE %s DETACH PARTITION %s' % (quote_name(table), quote_name(name)))
+            cursor.execute('DROP TABLE %s' % quote_name(name))
+            dropped.append(month)
+    return dropped
+
+
+def partitioned_models(apps):
+    return [apps.get_model('django_google_adwords', model_name) for model_name in PARTITIONED_MODELS]
+
+
+def maintain_partitions(connection=None, today=None):
+    """
+    Create the upcoming partitions of the daily metrics tables and, with
+    GOOGLEADWORDS_PARTITION_RETENTION_MONTHS, drop those past retention, trim the
+    MetricsCoverage of the days dropped, refresh the rollups of the week spanning the
+    first day kept and invalidate the cached aggregates of the accounts.
+
+    :return: A dict of the model name to the list of months dropped.
+    """
+    from django.apps import apps
+    from .aggregate_cache import invalidate as invalidate_aggregates
+    from .models import LEVEL_ROLLUP_MODELS, MetricsCoverage
+
+    connection = connection or default_connection
+    if not supports_partitioning(connection):
+        return {}
+    today = today or date.today()
+    levels = dict((rollup_model.DAILY_MODEL, level) for level, rollup_model in LEVEL_ROLLUP_MODELS.items())
+    retention = settings.GOOGLEADWORDS_PARTITION_RETENTION_MONTHS
+    dropped = {}
+    for model in partitioned_models(apps):
+        ensure_partitions(connection, model, today=today)
+        if retention:
+            before = add_months(month_start(today), -retention)
+            dropped[model.__name__] = drop_partitions(connection, model, before)
+            if dropped[model.__name__]:
+                level = levels[model]
+                coverages = MetricsCoverage.objects.level(level).select_related('account')
+                coverages.trim(before)
+                for coverage in coverages:
+                    if settings.GOOGLEADWORDS_METRICS_ROLLUPS:
+                        # The rollups of the whole months dropped are kept
+                        LEVEL_ROLLUP_MODELS[level].objects.refresh(coverage.account, [before])
+                    invalidate_aggregates(coverage.account_id, level)
+    return dropped
@@ -0,0 +1,253 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, FileSystemStorage
+
+
+logger = logging.getLogger(__name__)
+
+PROFILER_CPROFILE = 'cprofile'
+PROFILER_SAMPLING = 'sampling'
+
+# File extensions of the profiles written by each profiler
+EXTENSIONS = {
+    PROFILER_CPROFILE: '.prof',
+    PROFILER_SAMPLING: '.folded',
+}
+
+
+# The profiler of the task being profiled by each thread, see current_profiler
+_current = threading.local()
+
+
+class CProfileProfiler(object):
+    """
+    Profiles the thread that started it and any threads added with cProfile, which only
+    profiles the thread that enables it, the stats of each are merged by dump_stats.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.add_thread()
+
+    def stop(self):
+        self.remove_thread()
+
+    def add_thread(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 and later allow a single active profiler per process
+            logger.debug("Can't profile thread '%s', another profiler is active.", threading.current_thread().name)
+            return
+        self._local.profile = profile
+
+    def remove_thread(self):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        self._local.profile = None
+        with self._lock:
+            self.profiles.append(profile)
+
+    def dump_stats(self, filename):
+        pstats.Stats(*self.profiles).dump_stats(filename)
+
+
+class SamplingProfiler(object):
+    """
+    Samples the stacks of the thread that started it and any threads added every interval
+    seconds, from a background thread, counting each stack in the folded format of
+    flamegraph.pl (ie.. "file:function;file:function 12").
+
+    Unlike cProfile the profiled code runs at (close to) full speed.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = defaultdict(int)
+        self.thread_ids = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.add_thread()
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.remove_thread()
+
+    def add_thread(self):
+        with self._lock:
+            self.thread_ids.add(threading.current_thread().ident)
+
+    def remove_thread(self):
+        with self._lock:
+            self.thread_ids.discard(threading.current_thread().ident)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self.thread_ids)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        names = []
+        while frame is not None:
+            names.append('%s:%s' % (frame.f_code.co_filename, frame.f_code.co_name))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def folded(self):
+        """
+        Returns the sampled stacks in the folded format, most sampled first.
+        """
+        return ''.join('%s %s\n' % (stack, count)
+                       for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]))
+
+
+def get_profile_storage():
+    """
+    Returns the storage and directory profiles are saved to, GOOGLEADWORDS_PROFILE_DIRECTORY
+    on the local file system if set, otherwise the profiles directory next to the report
+    files in the default storage.
+    """
+    if settings.GOOGLEADWORDS_PROFILE_DIRECTORY:
+        return FileSystemStorage(location=settings.GOOGLEADWORDS_PROFILE_DIRECTORY), ''
+    return default_storage, os.path.join(settings.GOOGLEADWORDS_REPORT_FILE_ROOT, 'profiles')
+
+
+def should_profile(account_id):
+    """
+    Returns True if a task for account_id should be profiled, ie.. the account is listed in
+    GOOGLEADWORDS_PROFILE_ACCOUNTS or the task is picked at GOOGLEADWORDS_PROFILE_SAMPLE_RATE.
+    Accounts may be listed with or without dashes, ie.. 5918776172 or '591-877-6172'.
+    """
+    if settings.GOOGLEADWORDS_PROFILE_ACCOUNTS:
+        accounts = set(str(account).replace('-', '') for account in settings.GOOGLEADWORDS_PROFILE_ACCOUNTS)
+        if str(account_id) in accounts:
+            return True
+    rate = settings.GOOGLEADWORDS_PROFILE_SAMPLE_RATE
+    return bool(rate) and random.random() < rate
+
+
+def profile_name(task_name, account_id, report_file=None):
+    return '%s-%s-%s-%s-%s%s' % (task_name,
+                                 account_id,
+                                 report_file.pk if report_file is not None else 'none',
+                                 datetime.utcnow().strftime('%Y%m%dT%H%M%S'),
+                                 os.getpid(),
+                                 EXTENSIONS[settings.GOOGLEADWORDS_PROFILER])
+
+
+def current_profiler():
+    """
+    Returns the profiler of the task being profiled by this thread, or None.
+    """
+    return getattr(_current, 'profiler', None)
+
+
+@contextmanager
+def profile_thread(profiler):
+    """
+    Profile the block, run by another thread (ie.. of a ThreadPool) on behalf of the task
+    being profiled by profiler (see current_profiler), as part of the task's profile. Does
+    nothing if profiler is None.
+    """
+    if profiler is None:
+        yield
+        return
+
+    profiler.add_thread()
+    try:
+        yield
+    finally:
+        profiler.remove_thread()
+
+
+@contextmanager
+def profile_task(task_name, account_id, report_file=None):
+    """
+    Profile the block if should_profile(account_id), saving the profile (see
+    get_profile_storage) named after the task, account and report_file.
+
+    Only the calling thread is profiled, threads working on behalf of the task must be
+    added with profile_thread(current_profiler()).
+    """
+    if not should_profile(account_id):
+        yield
+        return
+
+    name = profile_name(task_name, account_id, report_file)
+    if settings.GOOGLEADWORDS_PROFILER == PROFILER_SAMPLING:
+        profiler = SamplingProfiler(settings.GOOGLEADWORDS_PROFILE_SAMPLING_INTERVAL)
+    else:
+        profiler = CProfileProfiler()
+    profiler.start()
+    previous, _current.profiler = current_profiler(), profiler
+    try:
+        yield
+    finally:
+        _current.profiler = previous
+        profiler.stop()
+        if settings.GOOGLEADWORDS_PROFILER == PROFILER_SAMPLING:
+            save_profile(name, ContentFile(profiler.folded().encode('utf-8')))
+        else:
+            with tempfile.NamedTemporaryFile() as f:
+                profiler.dump_stats(f.name)
+                f.seek(0)
+                save_profile(name, File(f))
+
+
+def save_profile(name, content):
+    storage, root = get_profile_storage()
+    try:
+        name = storage.save(os.path.join(root, name), content)
+        logger.info("Saved profile '%s'.", name)
+    except Exception:
+        # Never fail a task because its profile couldn't be saved.
+        logger.exception("Failed to save profile '%s'.", name)
+
+
+def profiled(func):
+    """
+    Decorator for Account task methods that profiles the task, see profile_task. A
+    ReportFile passed as report_file (or the first argument) is recorded in the profile name.
+    """
+    @wraps(func)
+    def inner(self, *args, **kwargs):
+        report_file = kwargs.get('report_file', args[0] if args else None)
+        if not hasattr(report_file, 'pk'):
+            report_file = None
+        with profile_task(func.__name__, self.account_id, report_file):
+            return func(self, *args, **kwargs)
+    return inner
@@ -0,0 +1,133 @@
+"""
+Planning for the week and month rollups of the daily metrics, see MetricsRollup.
+
+A period is answered from the coarsest rollups that tile it, months then (Monday to
+Sunday) weeks, plus the daily rows of the ragged edges.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models.expressions import F
+from django.utils import six
+
+
+GRAIN_DAY = 'day'
+GRAIN_WEEK = 'week'
+GRAIN_MONTH = 'month'
+
+
+def to_date(day):
+    if isinstance(day, six.string_types):
+        return datetime.strptime(day, '%Y-%m-%d').date()
+    if isinstance(day, datetime):
+        return day.date()
+    return day
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def week_finish(day):
+    return week_start(day) + timedelta(days=6)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_finish(day):
+    if day.month == 12:
+        return date(day.year, 12, 31)
+    return date(day.year, day.month + 1, 1) - timedelta(days=1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def plan_period(start, finish, compacted_before=()):
+    """
+    Returns a list of (grain, start, finish) tiles covering start to finish inclusive.
+
+    Whole months are tiled by month rollups, whole weeks (that don't overlap a whole month)
+    by week rollups and the remaining days, coalesced into runs, by daily rows.
+
+    :param compacted_before: Days the daily rows were compacted before, weeks spanning any
+        of them aren't tiled by week rollups as those aren't refreshed, see
+        MetricsRollup.QuerySet.refresh.
+    """
+    start, finish = to_date(start), to_date(finish)
+    tiles = []
+    day = start
+    while day <= finish:
+        if day.day == 1 and month_finish(day) <= finish:
+            tile = (GRAIN_MONTH, day, month_finish(day))
+        elif (day.weekday() == 0 and week_finish(day) <= finish and not _overlaps_month(day, week_finish(day), finish)
+                and not any(day < before <= week_finish(day) for before in compacted_before)):
+            tile = (GRAIN_WEEK, day, week_finish(day))
+        else:
+            # Up to the next tile that could start a week or month.
+            tile = (GRAIN_DAY, day, min(finish, week_finish(day), month_finish(day)))
+        if tile[0] == GRAIN_DAY and tiles and tiles[-1][0] == GRAIN_DAY:
+            tiles[-1] = (GRAIN_DAY, tiles[-1][1], tile[2])
+        else:
+            tiles.append(tile)
+        day = tile[2] + timedelta(days=1)
+    return tiles
+
+
+def _overlaps_month(start, finish, limit):
+    """
+    Returns True if a month that ends by limit starts between start and finish.
+    """
+    first = month_start(finish)
+    return start < first <= finish and month_finish(first) <= limit
+
+
+def compacted_days(start, finish, compacted_before):
+    """
+    Returns the GRAIN_DAY tiles of plan_period(start, finish) before compacted_before, the
+    days whose daily rows have been compacted into the rollups, see MetricsRollup.compact.
+    """
+    if compacted_before is None or to_date(start) >= compacted_before:
+        return []
+    # The days of a week spanning compacted_before are coalesced with those after
+    last = compacted_before - timedelta(days=1)
+    return [(GRAIN_DAY, tile_start, min(tile_finish, last))
+            for grain, tile_start, tile_finish in plan_period(start, finish, [compacted_before])
+            if grain == GRAIN_DAY and tile_start < compacted_before]
+
+
+def touched_periods(days):
+    """
+    Returns the sorted (grain, start, finish) week and month periods containing days.
+    """
+    periods = set()
+    for day in days:
+        day = to_date(day)
+        periods.add((GRAIN_WEEK, week_start(day), week_finish(day)))
+        periods.add((GRAIN_MONTH, month_start(day), month_finish(day)))
+    return sorted(periods)
+
+
+def aggregate_field(aggregate):
+    """
+    Returns the name of the field aggregate is over or None if it's over an expression.
+    """
+    if hasattr(aggregate, 'lookup'):  # Django < 1.8
+        return aggregate.lookup
+    expressions = aggregate.get_source_expressions()
+    if len(expressions) == 1 and isinstance(expressions[0], F):
+        return expressions[0].name
+    return None
+
+
+def add_totals(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if isinstance(a, float) != isinstance(b, float):
+        return float(a) + float(b)
+    return a + b
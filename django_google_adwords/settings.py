@@ -17,9 +17,15 @@ class GoogleAdWordsConf(AppConf):
     # Defaults - probably don't need to be changed
     CLIENT_VERSION = 'v201702'
     USER_AGENT = 'django-google-adwords'
+    CLIENT_FACTORY = None  # Dotted path to a callable creating the client, see helper.adwords_service
+    FAKE_API_URL = None  # See benchmarks.fake_api
     LOCK_TIMEOUT = 10 * 60  # 10 minutes
     LOCK_ID = "googleadwords-lock"
     LOCK_WAIT = 1
+    LOCK_BACKEND = 'django_google_adwords.lock.CacheLockBackend'
+    LOCK_ACQUIRE_TIMEOUT = None  # Wait forever
+    LOCK_REDIS_URL = 'redis://localhost:6379/0'  # RedisLockBackend
+    LOCK_DATABASE = 'default'  # PostgreSQLAdvisoryLockBackend
 
     # Days ago to start syncing the data from
     NEW_ACCOUNT_ACCOUNT_SYNC_DAYS = 150
@@ -33,10 +39,76 @@ class GoogleAdWordsConf(AppConf):
     EXISTING_AD_SYNC_DAYS = 3
 
     REPORT_FILE_ROOT = 'googleadwords-reportfile'
+    # Local read-through cache of report files, disabled unless a directory is given
+    REPORT_FILE_CACHE_ROOT = None
+    REPORT_FILE_CACHE_SIZE = 1024 * 1024 * 1024  # 1GB
     REPORT_RETRIEVAL_CELERY_QUEUE = 'celery'
     DATA_IMPORT_CELERY_QUEUE = 'celery'
     HOUSEKEEPING_CELERY_QUEUE = 'celery'
 
+    # Retrieve all of an account's reports in one task sharing a single client
+    REPORT_RETRIEVAL_SINGLE_TASK = False
+    REPORT_RETRIEVAL_CONCURRENCY = 4
+
+    # Route imports to a per host queue on the worker that downloaded the report
+    DATA_IMPORT_LOCAL_ROUTING = False
+    DATA_IMPORT_LOCAL_QUEUE = '%(queue)s.%(hostname)s'
+    # Seconds after which an import still waiting for a host no worker consumes the queue of
+    # is rerouted to DATA_IMPORT_CELERY_QUEUE
+    DATA_IMPORT_LOCAL_TIMEOUT = 600
+
+    # Metrics, see django_google_adwords.metrics
+    METRICS_BACKEND = 'django_google_adwords.metrics.NullMetricsBackend'
+    METRICS_PREFIX = 'googleadwords'
+    METRICS_STATSD_HOST = 'localhost'
+    METRICS_STATSD_PORT = 8125
+    METRICS_PROMETHEUS_PUSHGATEWAY = None  # URL of the Pushgateway PrometheusMetricsBackend pushes to
+    METRICS_PROMETHEUS_PUSH_INTERVAL = 15  # Seconds
+    METRICS_PROMETHEUS_PUSH_TIMEOUT = 2  # Seconds
+    # Tag the sync metrics with the account, a series per account (see SyncStats.emit)
+    METRICS_ACCOUNT_TAG = False
+
+    # Maintain week and month rollups of the daily metrics and answer period aggregates from them,
+    # run the gadapi_rebuild_rollups management command after enabling
+    METRICS_ROLLUPS = False
+
+    # Compact the daily metrics older than the months into the rollups (which need METRICS_ROLLUPS),
+    # see the compact_metrics task
+    COMPACT_METRICS_AFTER_MONTHS = None
+    COMPACT_METRICS_LEVELS = ('ad_group', 'ad',)
+    COMPACT_BATCH_SIZE = 1000  # Daily rows deleted per query
+
+    # Cache the period aggregates of the daily metrics per account until its next sync
+    AGGREGATE_CACHE = False
+    AGGREGATE_CACHE_ALIAS = 'default'
+    AGGREGATE_CACHE_TIMEOUT = 24 * 60 * 60  # 1 day
+
+    # Partition the daily metrics tables by month on PostgreSQL 11 and later, see
+    # django_google_adwords.partitioning, run the gadapi_partition_metrics management
+    # command after enabling if migrated without it
+    PARTITION_METRICS = False
+    PARTITION_MONTHS_AHEAD = 3  # Upcoming months maintain_partitions creates partitions for
+    PARTITION_RETENTION_MONTHS = None  # Months of daily metrics kept by maintain_partitions, None keeps all
+
+    # Profile sync and report retrieval tasks, see django_google_adwords.profiling
+    PROFILE_ACCOUNTS = ()  # AdWords account ids to always profile
+    PROFILE_SAMPLE_RATE = 0  # Fraction (0 to 1) of other task executions to profile
+    PROFILER = 'cprofile'  # or 'sampling'
+    PROFILE_SAMPLING_INTERVAL = 0.005  # Seconds between samples of the sampling profiler
+    PROFILE_DIRECTORY = None  # Local directory, defaults to REPORT_FILE_ROOT/profiles in the default storage
+
+    # Bound and track the memory used by imports
+    IMPORT_BOUNDED_MEMORY = False
+    IMPORT_MEMORY_LIMIT = None  # Bytes
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_MEMORY_TRACKING = False
+
+    # How the daily metrics rows of a report are loaded, 'populate', 'replace' or 'copy', see loaders
+    IMPORT_MODE = 'populate'
+
+    # Store the money of the daily metrics as integer micros, see fields. Set before migrating.
+    MONEY_MICROS = False
+
     CELERY_TIMELIMIT = 60 * 60 * 3  # 3 HOURS
     CELERY_SOFTTIMELIMIT = CELERY_TIMELIMIT
 
@@ -0,0 +1,161 @@
+import errno
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+TEMPORARY_PREFIX = '.tmp-'
+
+
+_report_file_caches = {}
+
+
+def get_report_file_cache():
+    """
+    Returns the ReportFileCache as configured by GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT, or
+    None if the cache is disabled. The cache is shared by the process so it keeps a running
+    size.
+    """
+    if not settings.GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT:
+        return None
+    key = (settings.GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT, settings.GOOGLEADWORDS_REPORT_FILE_CACHE_SIZE)
+    if key not in _report_file_caches:
+        _report_file_caches[key] = ReportFileCache(*key)
+    return _report_file_caches[key]
+
+
+class ReportFileCache(object):
+    """
+    A size bounded local read-through cache of report files kept in Django storage.
+
+    Entries are keyed by the storage name of the file and are evicted least recently used
+    first (recency is tracked with each entry's mtime) once the cache grows over max_size
+    bytes, other than the entry just stored. Entries are written to a temporary file and
+    renamed into place so concurrent readers never see a partial file.
+
+    The cache directory is only scanned (see evict) once the running size, the size found
+    by the last scan plus the entries stored since, grows over max_size. Entries stored by
+    other processes are counted at the next scan.
+    """
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # Bytes cached, None until the first scan
+        self.size = None
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def get(self, field_file):
+        """
+        Returns the local path of field_file, reading it from storage if it isn't cached.
+
+        :param field_file: FieldFile
+        """
+        path = self.path(field_file.name)
+        try:
+            os.utime(path, None)  # Mark as recently used
+            return path
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+
+        logger.debug("Report file cache miss: %s", field_file.name)
+        field_file.open('rb')
+        try:
+            self._store(path, field_file.chunks(CHUNK_SIZE))
+        finally:
+            field_file.close()
+        return path
+
+    def put(self, name, f):
+        """
+        Store the contents of the file like object f as name.
+        """
+        f.seek(0)
+        self._store(self.path(name), iter(lambda: f.read(CHUNK_SIZE), b''))
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+
+    def _store(self, path, chunks):
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError as exc:
+            if exc.errno == errno.EEXIST and os.path.isdir(directory):
+                pass
+            else:
+                raise
+
+        fd, temporary_path = tempfile.mkstemp(prefix=TEMPORARY_PREFIX, dir=directory)
+        stored = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    stored += len(chunk)
+            os.rename(temporary_path, path)
+        except:
+            os.remove(temporary_path)
+            raise
+
+        with self.lock:
+            if self.size is not None:
+                self.size += stored
+            full = self.size is None or self.size > self.max_size
+        if full:
+            self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits within max_size, scanning
+        the cache directory and resetting the running size.
+
+        :param keep: The path of an entry that is never removed, ie.. the one just stored
+                     which is about to be read, even if it doesn't fit on its own.
+        """
+        entries = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith(TEMPORARY_PREFIX):
+                    continue
+                path = os.path.join(directory, filename)
+                if path == keep:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed by another process
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        if keep is not None:
+            try:
+                size += os.stat(keep).st_size
+            except OSError:
+                pass
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    raise
+            size -= entry_size
+
+        with self.lock:
+            self.size = size
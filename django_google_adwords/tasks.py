@@ -1,8 +1,11 @@
 from __future__ import absolute_import
+from datetime import date
 from django.conf import settings
-from django_google_adwords.models import Account, Alert
+from django_google_adwords.models import Account, Alert, LEVEL_ROLLUP_MODELS
+from django_google_adwords.rollups import add_months, month_start
 from celery.app import shared_task
 from celery.canvas import chain
+from django_google_adwords import partitioning
 
 
 @shared_task(queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE)
@@ -48,3 +51,28 @@ def sync_adgroups():
 def sync_ads():
     for account in Account.objects.considered_active():
         account.sync(sync_account=False, sync_campaign=False, sync_adgroup=False, sync_ad=True)
+
+
+@shared_task(queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE)
+def maintain_partitions():
+    """
+    Create the upcoming partitions of the daily metrics tables and drop those past
+    retention, see partitioning.maintain_partitions.
+    """
+    if settings.GOOGLEADWORDS_PARTITION_METRICS:
+        partitioning.maintain_partitions()
+
+
+@shared_task(queue=settings.GOOGLEADWORDS_HOUSEKEEPING_CELERY_QUEUE)
+def compact_metrics():
+    """
+    Compact the daily metrics of GOOGLEADWORDS_COMPACT_METRICS_LEVELS older than
+    GOOGLEADWORDS_COMPACT_METRICS_AFTER_MONTHS whole months into the rollups, see
+    MetricsRollup.QuerySet.compact.
+    """
+    if not settings.GOOGLEADWORDS_COMPACT_METRICS_AFTER_MONTHS:
+        return
+    before = add_months(month_start(date.today()), -settings.GOOGLEADWORDS_COMPACT_METRICS_AFTER_MONTHS)
+    for account in Account.objects.all():
+        for level in settings.GOOGLEADWORDS_COMPACT_METRICS_LEVELS:
+            LEVEL_ROLLUP_MODELS[level].objects.compact(account, before)
@@ -1 +1,12 @@
-from .models import *
\ No newline at end of file
+from .models import *
+from .storage import *
+from .lock import *
+from .metrics import *
+from .benchmarks import *
+from .budgets import *
+from .profiling import *
+from .rollups import *
+from .aggregate_cache import *
+from .coverage import *
+from .partitioning import *
+from .fields import *
\ No newline at end of file
@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+
+from datetime import date
+import os
+
+from django.core.cache import caches
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django_google_adwords.models import Account, DailyAccountMetrics, ReportFile
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+@override_settings(GOOGLEADWORDS_AGGREGATE_CACHE=True)
+class AggregateCacheTestCase(TestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def setUp(self):
+        caches['default'].clear()
+        self.account = Account.objects.get(pk=1)
+        self.account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.account.finish_account_sync()
+
+    def test_cached_until_sync(self):
+        start, finish = date(2014, 7, 28), date(2014, 8, 6)
+        clicks = self.account.metrics.total_clicks_for_period(start, finish)
+        summary = self.account.metrics.summary_for_period(start, finish, ['clicks', 'ctr'], group_by='day')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.account.metrics.total_clicks_for_period(start, finish), clicks)
+            self.assertEqual(self.account.metrics.summary_for_period(start, finish, ['clicks', 'ctr'], group_by='day'), summary)
+
+        # A different queryset or period isn't the same entry
+        with self.assertNumQueries(2):
+            self.assertNotEqual(self.account.metrics.desktop().total_clicks_for_period(start, finish), clicks)
+            self.account.metrics.total_clicks_for_period(start, date(2014, 8, 5))
+
+        # The import doesn't invalidate, the finish task does
+        self.account.sync_account(report_file=_get_report_file('account_report_update.gz'))
+        with self.assertNumQueries(0):
+            self.account.metrics.total_clicks_for_period(start, finish)
+        self.account.finish_account_sync()
+        with self.assertNumQueries(1):
+            self.account.metrics.total_clicks_for_period(start, finish)
+
+    def test_not_filtered_by_account(self):
+        start, finish = date(2014, 7, 28), date(2014, 8, 6)
+        DailyAccountMetrics.objects.total_clicks_for_period(start, finish)
+        with self.assertNumQueries(1):
+            DailyAccountMetrics.objects.total_clicks_for_period(start, finish)
@@ -0,0 +1,229 @@
+from __future__ import absolute_import
+
+from multiprocessing.pool import ThreadPool
+
+from celery import current_app
+from django.db import connections
+from django.test.testcases import TransactionTestCase
+from django.test.utils import override_settings
+from django_google_adwords.benchmarks.fake_api import FakeAdWordsServer, FakeAdWordsClient
+from django_google_adwords.benchmarks.generator import ReportGenerator
+from django_google_adwords.benchmarks.suite import ImportBenchmark, PASS_INSERT, PASS_UPDATE
+from django_google_adwords.errors import RateExceededError, InterceptedGoogleAdsError
+from django_google_adwords import models
+from django_google_adwords.helper import paged_request
+from django_google_adwords.models import Account, Campaign, DailyAccountMetrics, DailyAdMetrics, \
+    DailyCampaignMetrics, ReportFile, SyncRun
+
+
+class ReportGeneratorTestCase(TransactionTestCase):
+
+    def test_deterministic(self):
+        generator = ReportGenerator(campaigns=2, ad_groups=2, ads=2, days=3)
+        rows = list(generator.rows(Account.LEVEL_AD))
+        self.assertEqual(len(rows), generator.row_count(Account.LEVEL_AD))
+        self.assertEqual(len(rows), 24)
+        self.assertEqual(rows, list(ReportGenerator(campaigns=2, ad_groups=2, ads=2, days=3).rows(Account.LEVEL_AD)))
+        self.assertNotEqual(rows, list(ReportGenerator(campaigns=2, ad_groups=2, ads=2, days=3, seed=1).rows(Account.LEVEL_AD)))
+
+    def test_import(self):
+        generator = ReportGenerator(campaigns=2, ad_groups=2, ads=2, days=3, devices=2)
+        account, = generator.get_or_create_accounts()
+
+        result = account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        self.assertEqual(result['rows'], 6)
+        self.assertEqual(DailyAccountMetrics.objects.filter(account=account).count(), 6)
+
+        result = account.sync_ad(report_file=generator.report_file(Account.LEVEL_AD))
+        self.assertEqual(result['rows'], 24)
+        self.assertEqual(DailyAdMetrics.objects.count(), 24)
+
+
+class ImportBenchmarkTestCase(TransactionTestCase):
+
+    def test_run(self):
+        generator = ReportGenerator(campaigns=1, ad_groups=1, ads=2, days=2)
+        results = ImportBenchmark(generator, levels=[Account.LEVEL_CAMPAIGN, Account.LEVEL_AD]).run()
+
+        self.assertEqual(results['meta']['generator']['ads'], 2)
+        self.assertEqual([(r['level'], r['pass'], r['rows']) for r in results['results']],
+                         [(Account.LEVEL_CAMPAIGN, PASS_INSERT, 2),
+                          (Account.LEVEL_CAMPAIGN, PASS_UPDATE, 2),
+                          (Account.LEVEL_AD, PASS_INSERT, 4),
+                          (Account.LEVEL_AD, PASS_UPDATE, 4)])
+        for result in results['results']:
+            self.assertGreater(result['queries_per_row'], 0)
+
+    def test_check_indexes(self):
+        benchmark = ImportBenchmark(ReportGenerator(campaigns=1, ad_groups=1, ads=1, days=1))
+        self.assertEqual(benchmark.check_indexes(), [])
+
+
+class FakeAdWordsServerTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.server = FakeAdWordsServer(ReportGenerator(campaigns=2, ad_groups=2, ads=2, days=3),
+                                        entries=25, rate_exceeded_every=2, retry_after_seconds=1).start()
+        self.settings = override_settings(GOOGLEADWORDS_CLIENT_FACTORY='django_google_adwords.benchmarks.fake_api.fake_client_factory',
+                                          GOOGLEADWORDS_FAKE_API_URL=self.server.url)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.server.stop()
+
+    def test_report_download(self):
+        account, = self.server.generator.get_or_create_accounts()
+        report_file = ReportFile.objects.request(report_definition=Account.get_selector(),
+                                                 client_customer_id=account.account_id)
+        self.assertEqual(account.sync_account(report_file=report_file)['rows'], 9)
+
+        with self.assertRaises(RateExceededError) as cm:
+            ReportFile.objects.request(report_definition=Account.get_selector(),
+                                       client_customer_id=account.account_id)
+        self.assertEqual(cm.exception.retry_after_seconds, 1)
+        self.assertEqual(ReportFile.objects.count(), 1)
+
+    def test_paged_request(self):
+        entries = []
+        for page, selector in paged_request('ManagedCustomerService', {}, number_results=10):
+            entries.extend(page)
+        self.assertEqual([entry.id for entry in entries], list(range(25)))
+        # 3 pages and a retry after every second request
+        self.assertEqual(self.server.request_count, 5)
+        self.assertEqual(self.server.rate_exceeded_count, 2)
+
+
+
+class CountingFakeAdWordsClient(FakeAdWordsClient):
+    """
+    A FakeAdWordsClient recording each client created and the report downloaders it returns.
+    """
+    clients = []
+
+    def __init__(self, url, client_customer_id=None):
+        super(CountingFakeAdWordsClient, self).__init__(url, client_customer_id)
+        self.downloaders = []
+        self.clients.append(self)
+
+    def GetReportDownloader(self, version=None, server=None):
+        downloader = super(CountingFakeAdWordsClient, self).GetReportDownloader(version, server)
+        self.downloaders.append(downloader)
+        return downloader
+
+
+def counting_client_factory(client_customer_id=None):
+    from django.conf import settings
+    return CountingFakeAdWordsClient(settings.GOOGLEADWORDS_FAKE_API_URL, client_customer_id)
+
+
+def use_connections(shared):
+    for conn in shared:
+        connections[conn.alias] = conn
+
+
+def shared_connection_pool(processes):
+    """
+    Returns a ThreadPool whose threads use this thread's connections to in memory SQLite
+    test databases, which other connections can't see (as LiveServerTestCase does).
+    """
+    shared = [conn for conn in connections.all()
+              if conn.vendor == 'sqlite' and conn.is_in_memory_db(conn.settings_dict['NAME'])]
+    for conn in shared:
+        conn.allow_thread_sharing = True
+    return ThreadPool(processes, use_connections, (shared,))
+
+
+class SingleTaskRetrievalTestCase(TransactionTestCase):
+    """
+    Account.sync with GOOGLEADWORDS_REPORT_RETRIEVAL_SINGLE_TASK against the fake API, with
+    the tasks run eagerly.
+    """
+
+    def start(self, **kwargs):
+        self.server = FakeAdWordsServer(ReportGenerator(campaigns=2, ad_groups=1, ads=1, days=3), **kwargs).start()
+        self.settings = override_settings(GOOGLEADWORDS_CLIENT_FACTORY='django_google_adwords.tests.benchmarks.counting_client_factory',
+                                          GOOGLEADWORDS_FAKE_API_URL=self.server.url,
+                                          GOOGLEADWORDS_REPORT_RETRIEVAL_SINGLE_TASK=True,
+                                          # One pool thread, as it may share the SQLite connection
+                                          GOOGLEADWORDS_REPORT_RETRIEVAL_CONCURRENCY=1)
+        self.settings.enable()
+        account, = self.server.generator.get_or_create_accounts()
+        return account
+
+    def setUp(self):
+        self.eager = current_app.conf.CELERY_ALWAYS_EAGER
+        current_app.conf.CELERY_ALWAYS_EAGER = True
+        models.ThreadPool = shared_connection_pool
+        del CountingFakeAdWordsClient.clients[:]
+
+    def tearDown(self):
+        current_app.conf.CELERY_ALWAYS_EAGER = self.eager
+        models.ThreadPool = ThreadPool
+        for conn in connections.all():
+            conn.allow_thread_sharing = False
+        self.settings.disable()
+        self.server.stop()
+
+    def assertSynced(self, account):
+        generator = self.server.generator
+        self.assertEqual(DailyAccountMetrics.objects.filter(account=account).count(),
+                         generator.row_count(Account.LEVEL_ACCOUNT))
+        self.assertEqual(DailyCampaignMetrics.objects.filter(campaign__account=account).count(),
+                         generator.row_count(Account.LEVEL_CAMPAIGN))
+        self.assertEqual(set(SyncRun.objects.account(account).values_list('level', 'status')),
+                         set([(Account.LEVEL_ACCOUNT, SyncRun.STATUS_FINISHED),
+                              (Account.LEVEL_CAMPAIGN, SyncRun.STATUS_FINISHED)]))
+        self.assertEqual(Account.objects.get(pk=account.pk).status, Account.STATUS_ACTIVE)
+
+    def test_sync(self):
+        account = self.start()
+        account.sync(sync_account=True, sync_campaign=True)
+
+        # One client and one report downloader for both reports
+        client, = CountingFakeAdWordsClient.clients
+        self.assertEqual(len(client.downloaders), 1)
+        self.assertEqual(self.server.request_count, 2)
+        self.assertSynced(account)
+
+    def test_rate_exceeded(self):
+        account = self.start(rate_exceeded_every=2)
+        account.sync(sync_account=True, sync_campaign=True)
+
+        # The report refused is retrieved by create_report_file with its own client
+        self.assertEqual(self.server.rate_exceeded_count, 1)
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(len(CountingFakeAdWordsClient.clients), 2)
+        self.assertSynced(account)
+
+    def test_download_failure(self):
+        account = self.start()
+        account.start_sync()
+        run_ids = [SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT).pk,
+                   SyncRun.objects.start_run(account, Account.LEVEL_CAMPAIGN).pk]
+        bogus = dict(Campaign.get_selector(), reportType='BOGUS_REPORT')
+
+        with self.assertRaises(InterceptedGoogleAdsError):
+            account.create_report_files([(Account.LEVEL_ACCOUNT, Account.get_selector()),
+                                         (Account.LEVEL_CAMPAIGN, bogus)], run_ids)
+
+        # The other report is imported, the failed report's run abandoned and the sync finished
+        self.assertEqual(DailyAccountMetrics.objects.filter(account=account).count(),
+                         self.server.generator.row_count(Account.LEVEL_ACCOUNT))
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[0]).status, SyncRun.STATUS_FINISHED)
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[1]).status, SyncRun.STATUS_ABANDONED)
+        self.assertEqual(Account.objects.get(pk=account.pk).status, Account.STATUS_ACTIVE)
+
+    def test_import_failure(self):
+        account = self.start()
+        account.start_sync()
+        run_ids = [SyncRun.objects.start_run(account, Account.LEVEL_CAMPAIGN).pk]
+
+        # The account report has no campaign columns, its import fails and abandons the run
+        # (run eagerly the chain re-raises the failure)
+        report_file = ReportFile.objects.request(report_definition=Account.get_selector(),
+                                                 client_customer_id=account.account_id)
+        self.assertRaises(TypeError, account.dispatch_import, Account.LEVEL_CAMPAIGN, report_file, run_ids)
+
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[0]).status, SyncRun.STATUS_ABANDONED)
+        self.assertEqual(Account.objects.get(pk=account.pk).status, Account.STATUS_ACTIVE)
@@ -0,0 +1,65 @@
+from __future__ import absolute_import
+
+import os
+
+from django.test.testcases import TransactionTestCase
+from django_google_adwords.benchmarks.budgets import check_budgets, measure_import, is_transaction_statement, \
+    CaptureCacheOperations, QUERY_BUDGETS, FIXED_QUERIES, CACHE_OPERATION_BUDGETS, FIXED_CACHE_OPERATIONS
+from django_google_adwords.models import Account, ReportFile
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+class QueryBudgetTestCase(TransactionTestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def assertWithinBudget(self, level, name):
+        account = Account.objects.get(pk=1)
+        for report in ('%s_report.gz' % name, '%s_report_update.gz' % name):
+            measurement = measure_import(account, level, _get_report_file(report))
+            self.assertGreater(measurement['rows'], 0)
+            exceeded = check_budgets(level, measurement['rows'], measurement['queries'],
+                                     measurement['cache_operations'])
+            self.assertEqual(exceeded, [], '\n'.join(exceeded))
+
+    def test_sync_account(self):
+        self.assertWithinBudget(Account.LEVEL_ACCOUNT, 'account')
+
+    def test_sync_campaign(self):
+        self.assertWithinBudget(Account.LEVEL_CAMPAIGN, 'campaign')
+
+    def test_sync_ad_group(self):
+        self.assertWithinBudget(Account.LEVEL_AD_GROUP, 'adgroup')
+
+    def test_sync_ad(self):
+        self.assertWithinBudget(Account.LEVEL_AD, 'ad')
+
+    def test_check_budgets(self):
+        queries = QUERY_BUDGETS[Account.LEVEL_AD] * 10 + FIXED_QUERIES
+        cache_operations = CACHE_OPERATION_BUDGETS[Account.LEVEL_AD] * 10 + FIXED_CACHE_OPERATIONS
+        self.assertEqual(check_budgets(Account.LEVEL_AD, 10, queries, cache_operations), [])
+        self.assertEqual(len(check_budgets(Account.LEVEL_AD, 10, queries + 1, cache_operations)), 1)
+        self.assertEqual(len(check_budgets(Account.LEVEL_AD, 10, queries + 1, cache_operations + 1)), 2)
+
+    def test_is_transaction_statement(self):
+        for sql in ('BEGIN', 'COMMIT', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', 'ROLLBACK TO SAVEPOINT "s1"'):
+            self.assertTrue(is_transaction_statement(sql), sql)
+        self.assertFalse(is_transaction_statement('SELECT "begin" FROM "t"'))
+        # As logged by Django 1.9 and earlier on SQLite
+        self.assertTrue(is_transaction_statement("QUERY = u'BEGIN' - PARAMS = ()"))
+        self.assertTrue(is_transaction_statement("QUERY = 'SAVEPOINT \"s1\"' - PARAMS = ()"))
+        self.assertFalse(is_transaction_statement("QUERY = u'SELECT \"begin\" FROM \"t\" WHERE \"id\" = %s' - PARAMS = (1,)"))
+
+    def test_capture_cache_operations(self):
+        from django.core.cache import cache
+        with CaptureCacheOperations() as operations:
+            cache.add('budget-test', 1)
+            cache.get_many(['budget-test'])
+            cache.delete('budget-test')
+        self.assertEqual(operations.operations, ['add', 'get_many', 'delete'])
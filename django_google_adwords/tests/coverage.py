@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+from datetime import date
+import os
+
+from django.test.testcases import TestCase
+from django_google_adwords.coverage import merge_days, covers, gaps
+from django_google_adwords.models import Account, ReportFile, MetricsCoverage, DailyAccountMetrics
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+class CoverageTestCase(TestCase):
+
+    def test_merge_days(self):
+        ranges = merge_days([], [date(2017, 1, 1), date(2017, 1, 2), '2017-01-05', date(2017, 1, 2)])
+        self.assertEqual(ranges, [[date(2017, 1, 1).toordinal(), date(2017, 1, 2).toordinal()],
+                                  [date(2017, 1, 5).toordinal(), date(2017, 1, 5).toordinal()]])
+
+        # Filling the gap joins the ranges
+        ranges = merge_days(ranges, [date(2017, 1, 3), date(2017, 1, 4), date(2017, 1, 10)])
+        self.assertEqual(ranges, [[date(2017, 1, 1).toordinal(), date(2017, 1, 5).toordinal()],
+                                  [date(2017, 1, 10).toordinal(), date(2017, 1, 10).toordinal()]])
+
+    def test_covers(self):
+        ranges = merge_days([], [date(2017, 1, 1), date(2017, 1, 2), date(2017, 1, 3), date(2017, 1, 5)])
+        self.assertTrue(covers(ranges, date(2017, 1, 1), date(2017, 1, 3)))
+        self.assertTrue(covers(ranges, date(2017, 1, 5), date(2017, 1, 5)))
+        self.assertFalse(covers(ranges, date(2017, 1, 1), date(2017, 1, 5)))
+        self.assertFalse(covers(ranges, date(2016, 12, 31), date(2017, 1, 2)))
+        self.assertFalse(covers([], date(2017, 1, 1), date(2017, 1, 1)))
+
+    def test_gaps(self):
+        ranges = merge_days([], [date(2017, 1, 2), date(2017, 1, 3), date(2017, 1, 6)])
+        self.assertEqual(gaps(ranges, date(2017, 1, 1), date(2017, 1, 8)), [
+            (date(2017, 1, 1), date(2017, 1, 1)),
+            (date(2017, 1, 4), date(2017, 1, 5)),
+            (date(2017, 1, 7), date(2017, 1, 8)),
+        ])
+        self.assertEqual(gaps(ranges, date(2017, 1, 2), date(2017, 1, 3)), [])
+
+
+class MetricsCoverageTestCase(TestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def test_is_synced(self):
+        account = Account.objects.get(pk=1)
+        self.assertFalse(account.is_synced(date(2014, 7, 28), date(2014, 8, 6)))
+
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.assertTrue(account.is_synced(date(2014, 7, 28), date(2014, 8, 6)))
+        self.assertFalse(account.is_synced(date(2014, 7, 27), date(2014, 8, 6)))
+        self.assertFalse(account.is_synced(date(2014, 7, 28), date(2014, 8, 6), level=Account.LEVEL_CAMPAIGN))
+        self.assertEqual(account.sync_gaps(date(2014, 7, 25), date(2014, 8, 8)),
+                         [(date(2014, 7, 25), date(2014, 7, 27)), (date(2014, 8, 7), date(2014, 8, 8))])
+
+        self.assertTrue(account.metrics.all().is_synced(date(2014, 8, 1), date(2014, 8, 6)))
+        self.assertFalse(account.metrics.all().is_synced(date(2014, 8, 1), date(2014, 8, 7)))
+        with self.assertRaises(ValueError):
+            DailyAccountMetrics.objects.all().is_synced(date(2014, 8, 1), date(2014, 8, 6))
+
+    def test_rebuild(self):
+        account = Account.objects.get(pk=1)
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        days = MetricsCoverage.objects.get(account=account, level=Account.LEVEL_ACCOUNT).days
+        MetricsCoverage.objects.all().delete()
+
+        coverage = MetricsCoverage.objects.rebuild(account, Account.LEVEL_ACCOUNT)
+        self.assertEqual(coverage.days, days)
+        self.assertEqual((coverage.first_day, coverage.last_day), (date(2014, 7, 28), date(2014, 8, 6)))
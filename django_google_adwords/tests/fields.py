@@ -0,0 +1,165 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+import os
+from unittest import skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations, models
+from django.db.migrations.state import ProjectState
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django_google_adwords import fields
+from django_google_adwords.fields import MicrosMoneyField, MicrosMoneyDescriptor, from_micros, to_micros, NO_CURRENCY, \
+    check_money_micros, money_field, IfMoneyMicros
+from django_google_adwords.models import Account, AdGroup, Ad, ReportFile, DailyAccountMetrics, \
+    DailyAdGroupMetrics, DailyAdMetrics
+import mock
+from moneyed import Money
+
+
+Currency = namedtuple('Currency', ['currency'])
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+def micros_money_field(name, currency_from='account'):
+    field = MicrosMoneyField(currency_from=currency_from, default=0, null=True, blank=True)
+    field.set_attributes_from_name(name)
+    return field
+
+
+class Row(object):
+    cost = MicrosMoneyDescriptor(micros_money_field('cost'))
+
+    def __init__(self, cost_micros, account=None):
+        self.cost_micros = cost_micros
+        self.account = account
+
+
+class MicrosMoneyFieldTestCase(TestCase):
+
+    def test_field(self):
+        field = micros_money_field('cost', currency_from='campaign.account')
+        self.assertEqual(field.attname, 'cost_micros')
+        self.assertEqual(field.column, 'cost')
+        self.assertEqual(field.deconstruct()[3]['currency_from'], 'campaign.account')
+
+    def test_descriptor(self):
+        row = Row(9570000, Currency('AUD'))
+        self.assertEqual(row.cost, Money(Decimal('9.57'), 'AUD'))
+
+        row.cost = Money(Decimal('1.5'), 'AUD')
+        self.assertEqual(row.cost_micros, 1500000)
+        row.cost = Decimal('0.000001')
+        self.assertEqual(row.cost_micros, 1)
+        row.cost = None
+        self.assertIsNone(row.cost)
+
+        self.assertEqual(Row(1000000).cost.currency.code, NO_CURRENCY)
+        self.assertEqual(Row(1000000, Currency(None)).cost.currency.code, NO_CURRENCY)
+
+    def test_micros(self):
+        self.assertEqual(from_micros(1500000), Decimal('1.5'))
+        self.assertEqual(from_micros(Decimal('9570000.00')), Decimal('9.57'))
+        self.assertEqual(from_micros(1500000.0), 1.5)
+        self.assertIsNone(from_micros(None))
+        self.assertEqual(to_micros('9.57'), 9570000)
+        self.assertIsNone(to_micros(None))
+
+    @override_settings(GOOGLEADWORDS_MONEY_MICROS=True)
+    def test_money_field(self):
+        self.assertIsInstance(money_field('Cost'), MicrosMoneyField)
+        with mock.patch.object(fields.django, 'VERSION', (1, 7, 11, 'final', 0)):
+            self.assertRaises(ImproperlyConfigured, money_field, 'Cost')
+
+    def test_if_money_micros(self):
+        operation = IfMoneyMicros(migrations.AddField('dailyaccountmetrics', 'extra', models.IntegerField(null=True)))
+        for micros in (False, True):
+            state = ProjectState.from_apps(apps)
+            with override_settings(GOOGLEADWORDS_MONEY_MICROS=micros):
+                operation.state_forwards('django_google_adwords', state)
+            fields = dict(state.models['django_google_adwords', 'dailyaccountmetrics'].fields)
+            self.assertEqual('extra' in fields, micros)
+
+    def test_check_money_micros(self):
+        # The test database is migrated with the setting
+        self.assertEqual(check_money_micros(None), [])
+
+        with override_settings(GOOGLEADWORDS_MONEY_MICROS=not settings.GOOGLEADWORDS_MONEY_MICROS):
+            errors = check_money_micros(None)
+        self.assertEqual([error.id for error in errors], ['django_google_adwords.E001'])
+
+
+def total(rows, field):
+    return sum((getattr(row, field).amount for row in rows), Decimal(0))
+
+
+def mean(rows, field):
+    amounts = [float(getattr(row, field).amount) for row in rows if getattr(row, field) is not None]
+    return sum(amounts) / len(amounts)
+
+
+@skipUnless(settings.GOOGLEADWORDS_MONEY_MICROS, 'GOOGLEADWORDS_MONEY_MICROS is off')
+class MoneyMicrosTestCase(TestCase):
+    """
+    The money the *_for_period and top_by_* queries return is an amount, not micros. Run
+    with GOOGLEADWORDS_MONEY_MICROS=1 runtests.py.
+    """
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    start = date(2014, 7, 1)
+    finish = date(2014, 8, 31)
+
+    def test_account_metrics(self):
+        account = Account.objects.get(pk=1)
+        account.finish_account_sync(account.sync_account(report_file=_get_report_file('account_report.gz')))
+        rows = list(DailyAccountMetrics.objects.filter(account=account))
+        metrics = account.metrics
+
+        self.assertEqual(metrics.total_cost_for_period(self.start, self.finish)['cost__sum'], total(rows, 'cost'))
+        self.assertAlmostEqual(float(metrics.average_cpc_for_period(self.start, self.finish)['avg_cpc__avg']),
+                               mean(rows, 'avg_cpc'))
+        self.assertAlmostEqual(float(metrics.average_cost_conv_for_period(self.start, self.finish)['cost_conv__avg']),
+                               mean(rows, 'cost_conv'))
+        self.assertEqual(metrics.summary_for_period(self.start, self.finish, ['cost'])[0], total(rows, 'cost'))
+        self.assertEqual(Account.objects.filter(pk=account.pk).spend_for_period(self.start, self.finish)[0].spend,
+                         total(rows, 'cost'))
+
+        for row in metrics.daily_cost_for_period(self.start, self.finish):
+            self.assertEqual(row['cost'], total([r for r in rows if r.day == row['day']], 'cost'))
+        for row in metrics.daily_average_cpc_for_period(self.start, self.finish):
+            # The averages are converted from micros to six decimal places
+            self.assertAlmostEqual(float(row['cpc']), mean([r for r in rows if r.day == row['day']], 'avg_cpc'), places=6)
+        for row in metrics.daily_average_cost_conv_for_period(self.start, self.finish):
+            self.assertAlmostEqual(float(row['cost_conv']), mean([r for r in rows if r.day == row['day']], 'cost_conv'))
+
+    def assertTopByMoney(self, objects, metrics_model, parent):
+        for obj in objects.top_by_clicks(self.start, self.finish):
+            rows = metrics_model.objects.filter(**{parent: obj})
+            self.assertEqual(obj.cost, total(rows, 'cost'))
+        for obj in objects.top_by_conversion_rate(self.start, self.finish):
+            rows = metrics_model.objects.filter(**{parent: obj})
+            self.assertEqual(obj.cost, total(rows, 'cost'))
+            self.assertAlmostEqual(float(obj.cost_conv), mean(rows, 'cost_conv'))
+            self.assertAlmostEqual(float(obj.avg_cpc), mean(rows, 'avg_cpc'))
+
+    def test_ad_group_top_by(self):
+        account = Account.objects.get(pk=1)
+        account.finish_ad_group_sync(account.sync_ad_group(report_file=_get_report_file('adgroup_report.gz')))
+        self.assertTopByMoney(AdGroup.objects.filter(account=account), DailyAdGroupMetrics, 'ad_group')
+
+    def test_ad_top_by(self):
+        account = Account.objects.get(pk=1)
+        account.finish_ad_sync(account.sync_ad(report_file=_get_report_file('ad_report.gz')))
+        self.assertTopByMoney(Ad.objects.filter(account=account), DailyAdMetrics, 'ad')
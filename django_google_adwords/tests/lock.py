@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+
+import threading
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django_google_adwords.errors import LockTimeoutError
+from django_google_adwords.lock import acquire_googleadwords_lock, \
+    release_googleadwords_lock, googleadwords_lock
+from django_google_adwords.metrics import get_metrics_backend
+from django_google_adwords.models import Account
+
+
+def redis_available():
+    try:
+        import redis
+    except ImportError:
+        return False
+    try:
+        return redis.StrictRedis.from_url(settings.GOOGLEADWORDS_LOCK_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+class CacheLockBackendTestCase(TestCase):
+
+    def tearDown(self):
+        release_googleadwords_lock(Account, 'lock-test')
+
+    def test_acquire_release(self):
+        self.assertTrue(acquire_googleadwords_lock(Account, 'lock-test'))
+        self.assertFalse(acquire_googleadwords_lock(Account, 'lock-test'))
+        self.assertFalse(acquire_googleadwords_lock(Account, 'lock-test', blocking=True, timeout=0.05))
+        release_googleadwords_lock(Account, 'lock-test')
+        self.assertTrue(acquire_googleadwords_lock(Account, 'lock-test', blocking=True, timeout=0.05))
+
+    def test_context_manager_timeout(self):
+        with googleadwords_lock(Account, 'lock-test'):
+            with self.assertRaises(LockTimeoutError):
+                with googleadwords_lock(Account, 'lock-test', timeout=0.05):
+                    pass
+        # Released on leaving the block
+        self.assertTrue(acquire_googleadwords_lock(Account, 'lock-test'))
+
+    @override_settings(GOOGLEADWORDS_METRICS_BACKEND='django_google_adwords.metrics.PrometheusMetricsBackend')
+    def test_metrics(self):
+        metrics = get_metrics_backend()
+        metrics.reset()
+
+        with googleadwords_lock(Account, 'lock-test'):
+            with self.assertRaises(LockTimeoutError):
+                with googleadwords_lock(Account, 'lock-test', timeout=0.05):
+                    pass
+
+        tags = (('model', 'Account'),)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters'][('lock.acquired', tags)], 1)
+        self.assertEqual(snapshot['counters'][('lock.contended', tags)], 1)
+        self.assertEqual(snapshot['counters'][('lock.timeout', tags)], 1)
+        self.assertEqual(snapshot['histograms'][('lock.held', tags)]['count'], 1)
+        self.assertGreaterEqual(snapshot['histograms'][('lock.held', tags)]['sum'], 0.05)
+        self.assertIn('googleadwords_lock_acquired_total{model="Account"} 1', metrics.render())
+
+
+class LockBackendTestMixin(object):
+    """
+    Tests of a lock backend whose locks are held per thread (and connection), so the
+    contending acquires are made from other threads.
+    """
+    backend = None
+
+    def setUp(self):
+        self.settings = override_settings(GOOGLEADWORDS_LOCK_BACKEND=self.backend)
+        self.settings.enable()
+
+    def tearDown(self):
+        release_googleadwords_lock(Account, 'lock-test')
+        self.settings.disable()
+
+    def in_thread(self, function):
+        result = []
+
+        def target():
+            try:
+                result.append(function())
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread, result
+
+    def acquire_release(self, **kwargs):
+        acquired = acquire_googleadwords_lock(Account, 'lock-test', **kwargs)
+        if acquired:
+            release_googleadwords_lock(Account, 'lock-test')
+        return acquired
+
+    def test_acquire_release(self):
+        self.assertTrue(acquire_googleadwords_lock(Account, 'lock-test'))
+
+        thread, result = self.in_thread(lambda: self.acquire_release())
+        thread.join()
+        self.assertEqual(result, [False])
+        thread, result = self.in_thread(lambda: self.acquire_release(blocking=True, timeout=0.05))
+        thread.join()
+        self.assertEqual(result, [False])
+
+        self.assertTrue(release_googleadwords_lock(Account, 'lock-test'))
+        thread, result = self.in_thread(lambda: self.acquire_release())
+        thread.join()
+        self.assertEqual(result, [True])
+
+    def test_release_wakes_waiter(self):
+        self.assertTrue(acquire_googleadwords_lock(Account, 'lock-test'))
+
+        def wait():
+            started = time.time()
+            return self.acquire_release(blocking=True, timeout=5), time.time() - started
+
+        thread, result = self.in_thread(wait)
+        time.sleep(0.1)
+        release_googleadwords_lock(Account, 'lock-test')
+        thread.join()
+        acquired, waited = result[0]
+        self.assertTrue(acquired)
+        # Woken by the release rather than polling every GOOGLEADWORDS_LOCK_WAIT
+        self.assertLess(waited, 0.9)
+
+
+@skipUnless(redis_available(), 'The Redis lock backend needs redis at GOOGLEADWORDS_LOCK_REDIS_URL')
+class RedisLockBackendTestCase(LockBackendTestMixin, TestCase):
+    backend = 'django_google_adwords.lock.RedisLockBackend'
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Advisory locks need PostgreSQL')
+class PostgreSQLAdvisoryLockBackendTestCase(LockBackendTestMixin, TestCase):
+    backend = 'django_google_adwords.lock.PostgreSQLAdvisoryLockBackend'
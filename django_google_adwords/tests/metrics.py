@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+import threading
+
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django.utils.six.moves import BaseHTTPServer
+from django_google_adwords.instrumentation import SyncStats
+from django_google_adwords.metrics import get_metrics_backend, InProcessMetricsBackend
+
+
+class PushgatewayRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):
+        self.server.pushes.append((self.path, self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')))
+        self.send_response(200)
+        self.end_headers()
+
+
+class PrometheusPushTestCase(TestCase):
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), PushgatewayRequestHandler)
+        self.server.pushes = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_push(self):
+        with override_settings(GOOGLEADWORDS_METRICS_BACKEND='django_google_adwords.metrics.PrometheusMetricsBackend',
+                               GOOGLEADWORDS_METRICS_PROMETHEUS_PUSHGATEWAY='http://127.0.0.1:%s/' % self.server.server_port,
+                               GOOGLEADWORDS_METRICS_PROMETHEUS_PUSH_INTERVAL=60):
+            metrics = get_metrics_backend()
+            metrics.reset()
+            metrics.pushed = None
+            metrics.incr('lock.acquired', tags={'model': 'Account'})
+            # The push is made by a background thread
+            pusher = metrics.pusher
+            self.assertIsNotNone(pusher)
+            pusher.join(5)
+            # Within the interval of the first push
+            metrics.incr('lock.acquired', tags={'model': 'Account'})
+            self.assertIs(metrics.pusher, pusher)
+
+        self.assertEqual(len(self.server.pushes), 1)
+        path, body = self.server.pushes[0]
+        self.assertTrue(path.startswith('/metrics/job/googleadwords/instance/'))
+        self.assertIn('googleadwords_lock_acquired_total{model="Account"} 1', body)
+
+
+class SyncStatsTestCase(TestCase):
+
+    def emit(self):
+        metrics = InProcessMetricsBackend()
+        stats = SyncStats(42, 'account')
+        stats.add('parse', 0.5, rows=10)
+        stats.emit(metrics)
+        return metrics.snapshot()
+
+    def test_emit(self):
+        tags = (('level', 'account'),)
+        snapshot = self.emit()
+        self.assertEqual(snapshot['counters'], {('sync.parse.calls', tags): 1, ('sync.parse.rows', tags): 10})
+        self.assertEqual(snapshot['histograms'][('sync.parse', tags)]['sum'], 0.5)
+
+    @override_settings(GOOGLEADWORDS_METRICS_ACCOUNT_TAG=True)
+    def test_emit_account_tag(self):
+        tags = (('account', 42), ('level', 'account'))
+        self.assertEqual(self.emit()['counters'][('sync.parse.rows', tags)], 10)
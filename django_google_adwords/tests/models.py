@@ -3,17 +3,37 @@ from __future__ import absolute_import
 from datetime import date, datetime
 from decimal import Decimal
 import os
+from unittest import skipUnless
 
+from celery import current_app
+from django.conf import settings
+import mock
+
+from django_google_adwords import models
+from django_google_adwords.errors import ImportMemoryLimitError, AdWordsDataInconsistencyError
+from django_google_adwords.helper import data_import_queue, local_data_import_queue, queue_consumed
+from django_google_adwords.loaders import CopyLoader, ReplaceLoader, supports_upsert
 from django_google_adwords.models import ReportFile, Account, Campaign, AdGroup, \
     DailyAccountMetrics, DailyCampaignMetrics, DailyAdGroupMetrics, Ad, \
-    DailyAdMetrics
+    DailyAdMetrics, SyncRun
+from django.core.management import call_command
+from django.db import connection
 from django.test.testcases import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 
 
 def _get_test_media_file_path(name):
     return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name)
 
 
+def _cents(money):
+    """
+    Returns the amount of money to two decimal places as a MoneyField stores it, the micros
+    of GOOGLEADWORDS_MONEY_MICROS keep the report's precision.
+    """
+    return money.amount.quantize(Decimal('0.01'))
+
+
 def _get_report_file(name):
     report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
     report_file.save_path(_get_test_media_file_path(name))
@@ -236,8 +256,8 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
 
         # Check the fields of one of them
         account_metric = DailyAccountMetrics.objects.get(account=account, device=DailyAccountMetrics.DEVICE_DESKTOP, day=date(2014, 7, 28))
-        self.assertEqual(account_metric.avg_cpc.amount, Decimal('1.91'))
-        self.assertEqual(account_metric.avg_cpm.amount, Decimal('1.85'))
+        self.assertEqual(_cents(account_metric.avg_cpc), Decimal('1.91'))
+        self.assertEqual(_cents(account_metric.avg_cpm), Decimal('1.85'))
         self.assertEqual(account_metric.avg_position, Decimal('1.0'))
         self.assertEqual(account_metric.clicks, 5)
         self.assertEqual(account_metric.content_lost_is_budget, Decimal('23.39'))
@@ -247,9 +267,9 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
         self.assertEqual(account_metric.conv_rate, Decimal('0.0'))
         self.assertEqual(account_metric.converted_clicks, 0)
         self.assertEqual(account_metric.converted_clicks, 0)
-        self.assertEqual(account_metric.cost.amount, Decimal('9.57'))
-        self.assertEqual(account_metric.cost_converted_click.amount, Decimal('0.00'))
-        self.assertEqual(account_metric.cost_conv.amount, Decimal('0.00'))
+        self.assertEqual(_cents(account_metric.cost), Decimal('9.57'))
+        self.assertEqual(_cents(account_metric.cost_converted_click), Decimal('0.00'))
+        self.assertEqual(_cents(account_metric.cost_conv), Decimal('0.00'))
         self.assertEqual(account_metric.ctr, Decimal('0.10'))
         self.assertEqual(account_metric.impressions, 5183)
         self.assertEqual(account_metric.invalid_click_rate, Decimal('0.00'))
@@ -282,8 +302,8 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
 
         # Check the fields of one of them to ensure the update occurred correctly
         account_metric = DailyAccountMetrics.objects.get(account=account, device=DailyAccountMetrics.DEVICE_DESKTOP, day=date(2014, 7, 28))
-        self.assertEqual(account_metric.avg_cpc.amount, Decimal('1.81'))
-        self.assertEqual(account_metric.avg_cpm.amount, Decimal('1.85'))
+        self.assertEqual(_cents(account_metric.avg_cpc), Decimal('1.81'))
+        self.assertEqual(_cents(account_metric.avg_cpm), Decimal('1.85'))
         self.assertEqual(account_metric.avg_position, Decimal('1.0'))
         self.assertEqual(account_metric.clicks, 5)
         self.assertEqual(account_metric.content_lost_is_budget, Decimal('23.39'))
@@ -293,9 +313,9 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
         self.assertEqual(account_metric.conv_rate, Decimal('0.0'))
         self.assertEqual(account_metric.converted_clicks, 0)
         self.assertEqual(account_metric.converted_clicks, 0)
-        self.assertEqual(account_metric.cost.amount, Decimal('9.57'))
-        self.assertEqual(account_metric.cost_converted_click.amount, Decimal('0.00'))
-        self.assertEqual(account_metric.cost_conv.amount, Decimal('0.00'))
+        self.assertEqual(_cents(account_metric.cost), Decimal('9.57'))
+        self.assertEqual(_cents(account_metric.cost_converted_click), Decimal('0.00'))
+        self.assertEqual(_cents(account_metric.cost_conv), Decimal('0.00'))
         self.assertEqual(account_metric.ctr, Decimal('0.10'))
         self.assertEqual(account_metric.impressions, 5183)
         self.assertEqual(account_metric.invalid_click_rate, Decimal('0.00'))
@@ -559,6 +579,307 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
         self.assertEqual(ad_metric.value_conv, Decimal('0.0'))
         self.assertEqual(ad_metric.view_through_conv, None)
 
+    def test_bounded_memory_import(self):
+        report_file = _get_report_file('account_report.gz')
+        account = Account.objects.get(pk=1)
+
+        with override_settings(GOOGLEADWORDS_IMPORT_BOUNDED_MEMORY=True,
+                               GOOGLEADWORDS_IMPORT_CHUNK_SIZE=7):
+            result = account.sync_account(report_file=report_file)
+
+        # 4 full chunks of 7 rows and a final checkpoint for the remaining 2 rows
+        self.assertEqual(result['rows'], 30)
+        self.assertEqual(result['chunks'], 5)
+        self.assertEqual(DailyAccountMetrics.objects.filter(account=account).count(), 30)
+
+        # No final checkpoint when the last chunk is full
+        with override_settings(GOOGLEADWORDS_IMPORT_BOUNDED_MEMORY=True,
+                               GOOGLEADWORDS_IMPORT_CHUNK_SIZE=10):
+            self.assertEqual(account.sync_account(report_file=report_file)['chunks'], 3)
+
+        # The peak is sampled on finishing an unbounded import
+        self.assertGreater(account.sync_account(report_file=report_file)['peak_rss'], 0)
+
+        with override_settings(GOOGLEADWORDS_IMPORT_BOUNDED_MEMORY=True,
+                               GOOGLEADWORDS_IMPORT_MEMORY_LIMIT=1):
+            self.assertRaises(ImportMemoryLimitError, account.sync_account, report_file=report_file)
+
+    def test_sync_stats(self):
+        report_file = _get_report_file('account_report.gz')
+        account = Account.objects.get(pk=1)
+        result = account.sync_account(report_file=report_file)
+
+        self.assertEqual(result['account'], account.account_id)
+        self.assertEqual(result['level'], Account.LEVEL_ACCOUNT)
+        self.assertEqual(result['stages']['parse']['rows'], 30)
+        # The account is updated and a DailyAccountMetrics inserted for each row
+        self.assertEqual(result['stages']['db_write']['inserted'], 30)
+        self.assertEqual(result['stages']['db_write']['updated'], 30)
+        self.assertEqual(result['stages']['db_read']['calls'], 60)
+
+        result = account.finish_account_sync()
+        self.assertEqual(result['stages']['finish']['calls'], 1)
+
+    def test_sync_run(self):
+        report_file = _get_report_file('account_report.gz')
+        account = Account.objects.get(pk=1)
+        run = SyncRun.objects.create(account=account, level=Account.LEVEL_ACCOUNT)
+
+        result = account.sync_account(report_file=report_file)
+        account.finish_account_sync(result)
+
+        run = SyncRun.objects.get(pk=run.pk)
+        self.assertEqual(run.status, SyncRun.STATUS_FINISHED)
+        self.assertIsNotNone(run.finished)
+        self.assertEqual(run.rows, 30)
+        self.assertEqual(run.rows_inserted, 30)
+        self.assertEqual(run.rows_updated, 0)
+        self.assertEqual(run.rows_skipped, 0)
+        self.assertIsNotNone(run.import_seconds)
+        self.assertIsNotNone(run.finish_seconds)
+        self.assertIsNone(SyncRun.objects.open_run(account, Account.LEVEL_ACCOUNT))
+
+        percentiles = SyncRun.objects.account(account).finished().percentiles('rows', percentiles=(50, 100))
+        self.assertEqual(percentiles, {50: 30, 100: 30})
+        throughput = SyncRun.objects.throughput_by_day()
+        self.assertEqual(len(throughput), 1)
+        self.assertEqual(throughput[0][1:3], (1, 30))
+
+    def test_start_run(self):
+        account = Account.objects.get(pk=1)
+        abandoned = SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT)
+        other = SyncRun.objects.start_run(account, Account.LEVEL_AD)
+        run = SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT)
+
+        # The run whose sync died is closed, the new run is the open one
+        abandoned = SyncRun.objects.get(pk=abandoned.pk)
+        self.assertEqual(abandoned.status, SyncRun.STATUS_ABANDONED)
+        self.assertIsNotNone(abandoned.finished)
+        self.assertEqual(SyncRun.objects.open_run(account, Account.LEVEL_ACCOUNT), run)
+        self.assertEqual(SyncRun.objects.open_run(account, Account.LEVEL_AD), other)
+        self.assertFalse(SyncRun.objects.finished().exists())
+
+    def test_finish_sync_if_imported(self):
+        account = Account.objects.get(pk=1)
+        # A stale run of an earlier sync, at a level this sync doesn't import
+        SyncRun.objects.start_run(account, Account.LEVEL_AD)
+        account.start_sync()
+        run_ids = [SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT).pk,
+                   SyncRun.objects.start_run(account, Account.LEVEL_CAMPAIGN).pk]
+
+        # The account import finishing first leaves the sync running
+        account.finish_account_sync(account.sync_account(report_file=_get_report_file('account_report.gz')))
+        account.finish_sync_if_imported(run_ids)
+        self.assertEqual(Account.objects.get(pk=1).status, Account.STATUS_SYNC)
+
+        # The last import finishes it
+        account.finish_campaign_sync(account.sync_campaign(report_file=_get_report_file('campaign_report.gz')))
+        account.finish_sync_if_imported(run_ids)
+        self.assertEqual(Account.objects.get(pk=1).status, Account.STATUS_ACTIVE)
+
+    def test_abandon_sync_runs(self):
+        account = Account.objects.get(pk=1)
+        account.start_sync()
+        run_ids = [SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT).pk,
+                   SyncRun.objects.start_run(account, Account.LEVEL_CAMPAIGN).pk]
+
+        # A failed import closes its run, the sync waits for the other
+        account.abandon_sync_runs(run_ids, Account.LEVEL_CAMPAIGN)
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[1]).status, SyncRun.STATUS_ABANDONED)
+        self.assertIsNotNone(SyncRun.objects.open_run(account, Account.LEVEL_ACCOUNT))
+        self.assertEqual(Account.objects.get(pk=1).status, Account.STATUS_SYNC)
+
+        account.finish_account_sync(account.sync_account(report_file=_get_report_file('account_report.gz')))
+        account.finish_sync_if_imported(run_ids)
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[0]).status, SyncRun.STATUS_FINISHED)
+        self.assertEqual(Account.objects.get(pk=1).status, Account.STATUS_ACTIVE)
+
+    def test_data_import_queue(self):
+        shared_queue = settings.GOOGLEADWORDS_DATA_IMPORT_CELERY_QUEUE
+        local_queue = local_data_import_queue()
+        self.assertEqual(local_data_import_queue('worker-1'), '%s.worker-1' % shared_queue)
+        self.assertEqual(data_import_queue(), shared_queue)
+
+        with override_settings(GOOGLEADWORDS_DATA_IMPORT_LOCAL_ROUTING=True):
+            # The worker doesn't consume its host's queue
+            self.assertEqual(data_import_queue(), shared_queue)
+
+            with mock.patch.object(type(current_app.amqp.queues), 'consume_from',
+                                   new_callable=mock.PropertyMock, return_value={local_queue: None}):
+                self.assertEqual(data_import_queue(), local_queue)
+
+    def test_queue_consumed(self):
+        with mock.patch.object(current_app.control, 'inspect') as inspect:
+            inspect.return_value.active_queues.return_value = {'celery@worker-1': [{'name': 'adwords.worker-1'}]}
+            self.assertTrue(queue_consumed('adwords.worker-1'))
+            self.assertFalse(queue_consumed('adwords.worker-2'))
+
+            # No worker replied
+            inspect.return_value.active_queues.return_value = None
+            self.assertFalse(queue_consumed('adwords.worker-1'))
+
+    def test_reroute_import(self):
+        account = Account.objects.get(pk=1)
+        account.start_sync()
+        run_ids = [SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT).pk]
+        report_file = _get_report_file('account_report.gz')
+        report_file.host = 'worker-1'
+        report_file.save()
+
+        # The host's worker is alive, the import is left in its queue
+        with mock.patch.object(models, 'queue_consumed', return_value=True) as queue_consumed:
+            self.assertFalse(account.reroute_import(Account.LEVEL_ACCOUNT, report_file, run_ids))
+        queue_consumed.assert_called_once_with(local_data_import_queue('worker-1'))
+        self.assertFalse(DailyAccountMetrics.objects.filter(account=account).exists())
+
+        # The host's worker has gone, the import is rerouted to the shared queue (run eagerly)
+        current_app.conf.CELERY_ALWAYS_EAGER = True
+        try:
+            with mock.patch.object(models, 'queue_consumed', return_value=False):
+                self.assertTrue(account.reroute_import(Account.LEVEL_ACCOUNT, report_file, run_ids))
+        finally:
+            current_app.conf.CELERY_ALWAYS_EAGER = False
+        self.assertTrue(DailyAccountMetrics.objects.filter(account=account).exists())
+        self.assertEqual(SyncRun.objects.get(pk=run_ids[0]).status, SyncRun.STATUS_FINISHED)
+        self.assertEqual(Account.objects.get(pk=1).status, Account.STATUS_ACTIVE)
+
+        # Once its run has closed the import is never rerouted
+        with mock.patch.object(models, 'queue_consumed') as queue_consumed:
+            self.assertFalse(account.reroute_import(Account.LEVEL_ACCOUNT, report_file, run_ids))
+        self.assertFalse(queue_consumed.called)
+
+    def test_spend_for_period(self):
+        account = Account.objects.get(pk=1)
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        account.finish_account_sync()
+        account = Account.objects.get(pk=1)
+        other = Account.objects.create(account_id=1234)
+
+        with self.assertNumQueries(3):
+            spends = Account.objects.filter(pk__in=[account.pk, other.pk]).order_by('pk') \
+                .spend_for_period(date(2014, 7, 28), date(2014, 8, 6))
+        self.assertEqual([spend.account for spend in spends], [account, other])
+        self.assertEqual(spends[0].spend, account.spend(date(2014, 7, 28), date(2014, 8, 6)))
+        self.assertIsNone(spends[0].error)
+        self.assertEqual(spends[1].spend, 0)
+        self.assertIsInstance(spends[1].error, AdWordsDataInconsistencyError)
+
+        # The same semantics as Account.spend
+        spend = Account.objects.filter(pk=account.pk).spend_for_period(date(2014, 7, 27), date(2014, 8, 6))[0]
+        self.assertIsInstance(spend.error, AdWordsDataInconsistencyError)
+        with self.assertRaises(AdWordsDataInconsistencyError):
+            account.spend(date(2014, 7, 27), date(2014, 8, 6))
+        spend = Account.objects.filter(pk=account.pk).spend_for_period(date(2014, 7, 27), date(2014, 8, 6),
+                                                                       complain_if_insufficient_data=False)[0]
+        self.assertIsNone(spend.error)
+        self.assertEqual(spend.spend, account.spend(date(2014, 7, 27), date(2014, 8, 6), complain_if_insufficient_data=False))
+
+    def test_last_synced(self):
+        account = Account.objects.get(pk=1)
+        result = account.sync_campaign(report_file=_get_report_file('campaign_report.gz'))
+        self.assertEqual(result['last_day'], date(2014, 8, 6))
+
+        # A single conditional update, no aggregate over the metrics
+        with CaptureQueriesContext(connection) as queries:
+            account.finish_campaign_sync(result)
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertFalse([sql for sql in statements if DailyCampaignMetrics._meta.db_table in sql or 'MAX(' in sql.upper()])
+        # Django 1.9 and earlier log SQLite statements as QUERY = u'...' - PARAMS = (...)
+        self.assertEqual(len([sql for sql in statements if 'UPDATE "%s"' % Account._meta.db_table in sql]), 1)
+        self.assertEqual(Account.objects.get(pk=1).campaign_last_synced, date(2014, 8, 6))
+
+        # Only moves forward
+        account.finish_campaign_sync(dict(result, last_day=date(2014, 8, 1)))
+        self.assertEqual(Account.objects.get(pk=1).campaign_last_synced, date(2014, 8, 6))
+
+        DailyCampaignMetrics.objects.filter(day=date(2014, 8, 6)).delete()
+        call_command('gadapi_repair_last_synced', '591-877-6172', levels=Account.LEVEL_CAMPAIGN)
+        account = Account.objects.get(pk=1)
+        self.assertEqual(account.campaign_last_synced, date(2014, 8, 5))
+        self.assertIsNone(account.ad_last_synced)
+
+    def test_denormalized_account(self):
+        account = Account.objects.get(pk=1)
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+
+        self.assertEqual(DailyAdMetrics.objects.filter(account=account).count(),
+                         DailyAdMetrics.objects.filter(ad__ad_group__campaign__account=account).count())
+        self.assertFalse(DailyAdMetrics.objects.filter(account__isnull=True).exists())
+        self.assertFalse(Ad.objects.filter(account__isnull=True).exists())
+        self.assertFalse(AdGroup.objects.filter(account__isnull=True).exists())
+        self.assertEqual(list(account.ads.order_by('pk')), list(Ad.objects.filter(ad_group__campaign__account=account).order_by('pk')))
+
+        # A row imported before the backfill gets its account on the next import
+        DailyAdMetrics.objects.update(account=None)
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+        self.assertFalse(DailyAdMetrics.objects.filter(account__isnull=True).exists())
+
+    @override_settings(GOOGLEADWORDS_IMPORT_MODE='replace')
+    def test_replace_import_mode(self):
+        account = Account.objects.get(pk=1)
+        result = account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.assertEqual(result['stages']['db_write']['dailyaccountmetrics_inserted'], 30)
+        metrics = DailyAccountMetrics.objects.filter(account=account)
+        self.assertEqual(metrics.count(), 30)
+        account_metric = metrics.get(device=DailyAccountMetrics.DEVICE_DESKTOP, day=date(2014, 7, 28))
+        self.assertEqual(account_metric.cost.amount, Decimal('9.57'))
+        self.assertEqual(account_metric.clicks, 5)
+
+        # Rows of the report's days missing from the report are removed, others are kept
+        account_metric.pk = None
+        account_metric.device = DailyAccountMetrics.DEVICE_UNKNOWN
+        account_metric.save()
+        account_metric.pk = None
+        account_metric.day = date(2014, 7, 27)
+        account_metric.save()
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.assertEqual(metrics.count(), 31)
+        self.assertFalse(metrics.filter(device=DailyAccountMetrics.DEVICE_UNKNOWN, day=date(2014, 7, 28)).exists())
+        self.assertTrue(metrics.filter(day=date(2014, 7, 27)).exists())
+
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+        self.assertFalse(DailyAdMetrics.objects.filter(account__isnull=True).exists())
+        count = DailyAdMetrics.objects.filter(account=account).count()
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+        self.assertEqual(DailyAdMetrics.objects.filter(account=account).count(), count)
+
+    def test_replace_loader_repeated_rows(self):
+        account = Account.objects.get(pk=1)
+        row = next(iter(_get_report_file('account_report.gz').dehydrate()))
+        loader = ReplaceLoader(DailyAccountMetrics.objects.all(), account, batch_size=1)
+
+        # The last row of a repeated natural key is inserted
+        loader.load(row, account=Account.objects.populate(row, account))
+        loader.load(dict(row, Clicks='99'), account=account)
+        self.assertEqual(loader.finish(), set([date(2014, 7, 28)]))
+        metrics = DailyAccountMetrics.objects.filter(account=account)
+        self.assertEqual(metrics.count(), 1)
+        self.assertEqual(metrics.get().clicks, 99)
+
+    @override_settings(GOOGLEADWORDS_IMPORT_MODE='copy')
+    def test_copy_import_mode(self):
+        # Merged through a staging table on PostgreSQL, populated elsewhere
+        account = Account.objects.get(pk=1)
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        metrics = DailyAccountMetrics.objects.filter(account=account)
+        self.assertEqual(metrics.count(), 30)
+        account_metric = metrics.get(device=DailyAccountMetrics.DEVICE_DESKTOP, day=date(2014, 7, 28))
+        self.assertEqual(account_metric.cost.amount, Decimal('9.57'))
+        self.assertEqual(account_metric.cost.currency.code, 'AUD')
+
+        metrics.update(clicks=0)
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.assertEqual(metrics.count(), 30)
+        updated = metrics.get(pk=account_metric.pk)
+        self.assertEqual(updated.clicks, 5)
+        self.assertEqual(updated.created, account_metric.created)
+
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+        count = DailyAdMetrics.objects.filter(account=account).count()
+        self.assertTrue(count)
+        account.sync_ad(report_file=_get_report_file('ad_report.gz'))
+        self.assertEqual(DailyAdMetrics.objects.filter(account=account).count(), count)
+
     def test_auto_now(self):
         account = Account.objects.create(account_id=1234)
         #: :type account: Account
@@ -570,3 +891,42 @@ class DjangoGoogleAdWordsTestCase(TransactionTestCase):
         account.save()
         self.assertEqual(account.created, created)
         self.assertNotEqual(account.updated, updated)
+
+
+@skipUnless(supports_upsert(connection), 'The copy import mode needs PostgreSQL 9.5 or later')
+@override_settings(GOOGLEADWORDS_IMPORT_MODE='copy')
+class CopyLoaderTestCase(TransactionTestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def test_merge(self):
+        account = Account.objects.get(pk=1)
+        run = SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT)
+        result = account.sync_account(report_file=_get_report_file('account_report.gz'))
+        self.assertEqual(result['stages']['db_write']['dailyaccountmetrics_inserted'], 30)
+        self.assertEqual(result['stages']['db_write']['dailyaccountmetrics_updated'], 0)
+
+        account.finish_account_sync(result)
+        run = SyncRun.objects.get(pk=run.pk)
+        self.assertEqual((run.rows, run.rows_inserted, run.rows_updated, run.rows_skipped), (30, 30, 0, 0))
+
+        # Merged into the existing rows
+        run = SyncRun.objects.start_run(account, Account.LEVEL_ACCOUNT)
+        account.finish_account_sync(account.sync_account(report_file=_get_report_file('account_report.gz')))
+        run = SyncRun.objects.get(pk=run.pk)
+        self.assertEqual((run.rows, run.rows_inserted, run.rows_updated, run.rows_skipped), (30, 0, 30, 0))
+        self.assertEqual(DailyAccountMetrics.objects.filter(account=account).count(), 30)
+
+    def test_repeated_rows(self):
+        account = Account.objects.get(pk=1)
+        row = next(iter(_get_report_file('account_report.gz').dehydrate()))
+        loader = CopyLoader(DailyAccountMetrics.objects.all(), account, 'default')
+
+        # The last row of a repeated natural key is merged
+        loader.load(row, account=Account.objects.populate(row, account))
+        loader.load(dict(row, Clicks='99'), account=account)
+        loader.finish()
+        metrics = DailyAccountMetrics.objects.filter(account=account)
+        self.assertEqual(metrics.count(), 1)
+        self.assertEqual(metrics.get().clicks, 99)
@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+from datetime import date
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.testcases import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django_google_adwords.benchmarks.generator import ReportGenerator
+from django_google_adwords.coverage import merge_days, trim_days
+from django_google_adwords.models import Account, DailyAccountMetrics
+from django_google_adwords.partitioning import add_months, months, partition_name, supports_partitioning, \
+    partition_table, unpartition_table, partitions, drop_partitions, ensure_partitions, default_months
+
+
+class PartitioningTestCase(TestCase):
+
+    def test_months(self):
+        self.assertEqual(add_months(date(2017, 11, 1), 3), date(2018, 2, 1))
+        self.assertEqual(add_months(date(2017, 1, 1), -1), date(2016, 12, 1))
+        self.assertEqual(months(date(2016, 12, 15), '2017-02-01'), [date(2016, 12, 1), date(2017, 1, 1), date(2017, 2, 1)])
+        self.assertEqual(partition_name('metrics', date(2017, 2, 1)), 'metrics_p201702')
+
+    def test_trim_days(self):
+        ranges = merge_days([], [date(2017, 1, 30), date(2017, 1, 31), date(2017, 2, 1), date(2017, 2, 5)])
+        self.assertEqual(trim_days(ranges, date(2017, 2, 1)), [[date(2017, 2, 1).toordinal(), date(2017, 2, 1).toordinal()],
+                                                               [date(2017, 2, 5).toordinal(), date(2017, 2, 5).toordinal()]])
+        self.assertEqual(trim_days(ranges, date(2017, 3, 1)), [])
+
+
+@skipUnless(supports_partitioning(connection), 'Partitioning needs PostgreSQL 11 or later')
+@override_settings(GOOGLEADWORDS_PARTITION_METRICS=True)
+class PartitionTableTestCase(TransactionTestCase):
+
+    def tearDown(self):
+        unpartition_table(connection, DailyAccountMetrics)
+
+    def test_partition_table(self):
+        generator = ReportGenerator(campaigns=1, days=70)
+        account = generator.get_or_create_accounts()[0]
+        account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        rows = DailyAccountMetrics.objects.count()
+
+        self.assertTrue(partition_table(connection, DailyAccountMetrics, months_ahead=0))
+        self.assertFalse(partition_table(connection, DailyAccountMetrics))
+        self.assertEqual(DailyAccountMetrics.objects.count(), rows)
+
+        # Re-syncing updates the rows in their partitions
+        account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        self.assertEqual(DailyAccountMetrics.objects.count(), rows)
+
+        with connection.cursor() as cursor:
+            first = partitions(cursor, DailyAccountMetrics._meta.db_table)[0][0]
+        ensure_partitions(connection, DailyAccountMetrics, months_ahead=1)
+        self.assertEqual(drop_partitions(connection, DailyAccountMetrics, add_months(first, 1)), [first])
+        self.assertFalse(DailyAccountMetrics.objects.filter(day__lt=add_months(first, 1)).exists())
+
+    def assertNoDefaultRows(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(default_months(cursor, DailyAccountMetrics._meta.db_table, connection.ops.quote_name), [])
+
+    def test_import_creates_partitions(self):
+        # Partitioned while empty, ie.. only the current month has a partition
+        self.assertTrue(partition_table(connection, DailyAccountMetrics, months_ahead=0))
+        generator = ReportGenerator(campaigns=1, days=70)
+        account = generator.get_or_create_accounts()[0]
+        account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+
+        with connection.cursor() as cursor:
+            partitioned = [month for month, _ in partitions(cursor, DailyAccountMetrics._meta.db_table)]
+        imported = months(DailyAccountMetrics.objects.order_by('day').first().day,
+                          DailyAccountMetrics.objects.order_by('day').last().day)
+        self.assertTrue(set(imported) <= set(partitioned))
+        self.assertNoDefaultRows()
+
+    def test_ensure_partitions_moves_default_rows(self):
+        self.assertTrue(partition_table(connection, DailyAccountMetrics, months_ahead=0))
+        generator = ReportGenerator(campaigns=1, days=70)
+        account = generator.get_or_create_accounts()[0]
+        with override_settings(GOOGLEADWORDS_PARTITION_METRICS=False):
+            account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        rows = DailyAccountMetrics.objects.count()
+        with connection.cursor() as cursor:
+            self.assertTrue(default_months(cursor, DailyAccountMetrics._meta.db_table, connection.ops.quote_name))
+
+        ensure_partitions(connection, DailyAccountMetrics, months_ahead=0)
+        self.assertNoDefaultRows()
+        self.assertEqual(DailyAccountMetrics.objects.count(), rows)
@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+
+from multiprocessing.pool import ThreadPool
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from django_google_adwords.models import Account, ReportFile
+from django_google_adwords.profiling import current_profiler, profile_task, profile_thread, should_profile
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+class ProfilingTestCase(TestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_should_profile(self):
+        self.assertFalse(should_profile(5918776172))
+        with override_settings(GOOGLEADWORDS_PROFILE_ACCOUNTS=('591-877-6172',)):
+            self.assertTrue(should_profile(5918776172))
+            self.assertFalse(should_profile(1234567890))
+        with override_settings(GOOGLEADWORDS_PROFILE_SAMPLE_RATE=1):
+            self.assertTrue(should_profile(1234567890))
+
+    def assertProfiled(self, extension):
+        report_file = _get_report_file('account_report.gz')
+        account = Account.objects.get(pk=1)
+        account.sync_account(report_file=report_file)
+
+        names = os.listdir(self.directory)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith('sync_account-5918776172-%s-' % report_file.pk))
+        self.assertTrue(names[0].endswith(extension))
+
+        out = StringIO()
+        call_command('gadapi_profiles', 'list', stdout=out)
+        self.assertIn(names[0], out.getvalue())
+
+        out = StringIO()
+        call_command('gadapi_profiles', 'summary', names[0], limit=1000, stdout=out)
+        self.assertIn('sync_account', out.getvalue())
+
+    def test_cprofile(self):
+        with override_settings(GOOGLEADWORDS_PROFILE_ACCOUNTS=(5918776172,),
+                               GOOGLEADWORDS_PROFILE_DIRECTORY=self.directory):
+            self.assertProfiled('.prof')
+
+    def test_sampling(self):
+        with override_settings(GOOGLEADWORDS_PROFILE_ACCOUNTS=(5918776172,),
+                               GOOGLEADWORDS_PROFILER='sampling',
+                               GOOGLEADWORDS_PROFILE_SAMPLING_INTERVAL=0.0001,
+                               GOOGLEADWORDS_PROFILE_DIRECTORY=self.directory):
+            self.assertProfiled('.folded')
+
+    def profile_pool(self):
+        def spin_in_pool_thread():
+            finish = time.time() + 0.05
+            while time.time() < finish:
+                pass
+
+        def download():
+            # cProfile records the functions called once the thread is added
+            with profile_thread(profiler):
+                spin_in_pool_thread()
+
+        with profile_task('pool', 5918776172):
+            profiler = current_profiler()
+            pool = ThreadPool(1)
+            try:
+                pool.apply(download)
+            finally:
+                pool.close()
+                pool.join()
+        self.assertIsNone(current_profiler())
+
+        name, = os.listdir(self.directory)
+        return os.path.join(self.directory, name)
+
+    def test_cprofile_threads(self):
+        with override_settings(GOOGLEADWORDS_PROFILE_ACCOUNTS=(5918776172,),
+                               GOOGLEADWORDS_PROFILE_DIRECTORY=self.directory):
+            path = self.profile_pool()
+        functions = [function for _, _, function in pstats.Stats(path).stats]
+        self.assertIn('spin_in_pool_thread', functions)
+
+    def test_sampling_threads(self):
+        with override_settings(GOOGLEADWORDS_PROFILE_ACCOUNTS=(5918776172,),
+                               GOOGLEADWORDS_PROFILER='sampling',
+                               GOOGLEADWORDS_PROFILE_SAMPLING_INTERVAL=0.0001,
+                               GOOGLEADWORDS_PROFILE_DIRECTORY=self.directory):
+            path = self.profile_pool()
+        with open(path) as f:
+            self.assertIn(':spin_in_pool_thread', f.read())
@@ -0,0 +1,195 @@
+from __future__ import absolute_import
+
+from datetime import date
+import os
+
+from django.db.models.aggregates import Sum, Avg
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django_google_adwords.benchmarks.generator import ReportGenerator
+from django_google_adwords.errors import AdWordsDataInconsistencyError
+from django_google_adwords.fields import money_aggregate
+from django.db.models.expressions import F
+from django_google_adwords.models import Account, DailyAccountMetrics, ReportFile, \
+    DailyCampaignMetrics, AccountMetricsRollup, CampaignMetricsRollup
+from django_google_adwords.rollups import GRAIN_DAY, GRAIN_WEEK, GRAIN_MONTH, plan_period, compacted_days
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+class PlanPeriodTestCase(TestCase):
+
+    def test_plan_period(self):
+        # Sat 2017-01-07 to Mon 2017-04-03
+        self.assertEqual(plan_period(date(2017, 1, 7), date(2017, 4, 3)), [
+            (GRAIN_DAY, date(2017, 1, 7), date(2017, 1, 8)),
+            (GRAIN_WEEK, date(2017, 1, 9), date(2017, 1, 15)),
+            (GRAIN_WEEK, date(2017, 1, 16), date(2017, 1, 22)),
+            (GRAIN_WEEK, date(2017, 1, 23), date(2017, 1, 29)),
+            (GRAIN_DAY, date(2017, 1, 30), date(2017, 1, 31)),
+            (GRAIN_MONTH, date(2017, 2, 1), date(2017, 2, 28)),
+            (GRAIN_MONTH, date(2017, 3, 1), date(2017, 3, 31)),
+            (GRAIN_DAY, date(2017, 4, 1), date(2017, 4, 3)),
+        ])
+
+    def test_plan_period_days(self):
+        self.assertEqual(plan_period('2017-01-03', '2017-01-05'), [(GRAIN_DAY, date(2017, 1, 3), date(2017, 1, 5))])
+
+    def test_plan_period_compacted(self):
+        # Mon 2017-05-29 to Sun 2017-06-04 spans the compaction of May
+        self.assertEqual(plan_period(date(2017, 5, 29), date(2017, 6, 4), [date(2017, 6, 1)]), [
+            (GRAIN_DAY, date(2017, 5, 29), date(2017, 6, 4)),
+        ])
+        self.assertEqual(plan_period(date(2017, 5, 29), date(2017, 6, 4), [date(2017, 5, 1)]), [
+            (GRAIN_WEEK, date(2017, 5, 29), date(2017, 6, 4)),
+        ])
+        self.assertEqual(compacted_days(date(2017, 5, 29), date(2017, 6, 4), date(2017, 6, 1)), [
+            (GRAIN_DAY, date(2017, 5, 29), date(2017, 5, 31)),
+        ])
+
+
+@override_settings(GOOGLEADWORDS_METRICS_ROLLUPS=True)
+class RollupTestCase(TestCase):
+    PERIODS = [
+        (date(2017, 1, 1), date(2017, 3, 10)),
+        (date(2017, 1, 7), date(2017, 2, 28)),
+        (date(2017, 2, 1), date(2017, 2, 28)),
+        (date(2017, 1, 9), date(2017, 1, 15)),
+        (date(2017, 1, 3), date(2017, 1, 5)),
+    ]
+
+    def setUp(self):
+        generator = ReportGenerator(campaigns=2, days=70)
+        self.account = generator.get_or_create_accounts()[0]
+        self.account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        self.account.sync_campaign(report_file=generator.report_file(Account.LEVEL_CAMPAIGN))
+
+    def assertRollupsMatch(self, queryset, *aggregates):
+        for start, finish in self.PERIODS:
+            rolled_up = queryset.aggregate_for_period(start, finish, *aggregates)
+            with override_settings(GOOGLEADWORDS_METRICS_ROLLUPS=False):
+                daily = queryset.aggregate_for_period(start, finish, *aggregates)
+            self.assertEqual(sorted(rolled_up), sorted(daily))
+            for alias in daily:
+                self.assertAlmostEqual(rolled_up[alias], daily[alias], places=6)
+
+    def test_refresh(self):
+        self.assertTrue(AccountMetricsRollup.objects.account(self.account).filter(grain=GRAIN_MONTH).exists())
+        self.assertEqual(AccountMetricsRollup.objects.account(self.account).filter(grain=GRAIN_MONTH)
+                         .aggregate(Sum('rows'))['rows__sum'], DailyAccountMetrics.objects.filter(account=self.account).count())
+        self.assertEqual(CampaignMetricsRollup.objects.account(self.account).filter(grain=GRAIN_WEEK)
+                         .aggregate(Sum('rows'))['rows__sum'], DailyCampaignMetrics.objects.filter(campaign__account=self.account).count())
+
+    def test_account_metrics(self):
+        self.assertIsNotNone(self.account.metrics.all()._rollup_plan(date(2017, 1, 1), date(2017, 3, 10),
+                                                                     {'cost__sum': Sum('cost')}))
+        self.assertRollupsMatch(self.account.metrics.all(), Sum('cost'), Sum('clicks'), Avg('ctr'), Avg('avg_cpc'))
+        self.assertRollupsMatch(self.account.metrics.desktop(), Sum('impressions'), Avg('cost_conv'))
+        self.assertEqual(self.account.metrics.total_cost_for_period(date(2017, 1, 1), date(2017, 1, 31)),
+                         DailyAccountMetrics.objects.filter(account=self.account)
+                         .within_period(date(2017, 1, 1), date(2017, 1, 31)).aggregate(cost__sum=money_aggregate(Sum('cost'))))
+
+    def test_campaign_metrics(self):
+        queryset = DailyCampaignMetrics.objects.filter(campaign__account=self.account)
+        self.assertRollupsMatch(queryset, Sum('clicks'), Avg('ctr'))
+
+    def test_summary_for_period(self):
+        start, finish = date(2017, 1, 1), date(2017, 3, 10)
+        metrics = self.account.metrics.all()
+        impressions, cost, ctr = metrics.summary_for_period(start, finish, ['impressions', 'cost', 'ctr'])
+        self.assertEqual(impressions, metrics.total_impressions_for_period(start, finish)['impressions__sum'])
+        self.assertEqual(cost, metrics.total_cost_for_period(start, finish)['cost__sum'])
+        self.assertAlmostEqual(ctr, metrics.average_ctr_for_period(start, finish)['ctr__avg'], places=6)
+
+        by_device = metrics.summary_for_period(start, finish, ['clicks'], group_by='device')
+        self.assertEqual([device for device, _ in by_device], sorted(device for device, _ in by_device))
+        self.assertEqual(sum(clicks for _, clicks in by_device), metrics.total_clicks_for_period(start, finish)['clicks__sum'])
+
+        by_day = DailyCampaignMetrics.objects.filter(campaign__account=self.account) \
+            .summary_for_period(start, date(2017, 1, 2), ['clicks', 'avg_cpc'], group_by=['day', 'campaign'])
+        self.assertEqual(len(by_day), 4)
+        self.assertEqual(len(by_day[0]), 4)
+
+        with self.assertRaises(ValueError):
+            metrics.summary_for_period(start, finish, ['day'])
+
+    def test_not_dimensions(self):
+        # Filters on other fields can't be answered from the rollups
+        self.assertIsNone(self.account.metrics.filter(clicks__gt=10)._rollup_plan(
+            date(2017, 1, 1), date(2017, 3, 10), {'cost__sum': Sum('cost')}))
+        self.assertIsNone(self.account.metrics.exclude(device=DailyAccountMetrics.DEVICE_TABLET)._rollup_plan(
+            date(2017, 1, 1), date(2017, 3, 10), {'cost__sum': Sum('cost')}))
+
+
+@override_settings(GOOGLEADWORDS_METRICS_ROLLUPS=True)
+class CompactionTestCase(TestCase):
+
+    def setUp(self):
+        generator = ReportGenerator(campaigns=2, days=70)  # 2017-01-01 to 2017-03-11
+        self.account = generator.get_or_create_accounts()[0]
+        self.account.sync_account(report_file=generator.report_file(Account.LEVEL_ACCOUNT))
+        self.account.finish_account_sync()
+        self.account.sync_campaign(report_file=generator.report_file(Account.LEVEL_CAMPAIGN))
+        self.account = Account.objects.get(pk=self.account.pk)
+
+    def test_compact(self):
+        start, finish = date(2017, 1, 1), date(2017, 3, 10)
+        metrics = self.account.metrics.all()
+        before = metrics.summary_for_period(start, finish, ['cost', 'clicks', 'ctr', 'avg_cpc'])
+        spend = self.account.spend(start, finish)
+        rows = DailyAccountMetrics.objects.filter(account=self.account, day__lt=date(2017, 3, 1)).count()
+
+        deleted = AccountMetricsRollup.objects.compact(self.account, date(2017, 3, 1), batch_size=7)
+        self.assertEqual(deleted, rows)
+        self.assertFalse(DailyAccountMetrics.objects.filter(account=self.account, day__lt=date(2017, 3, 1)).exists())
+        campaign_rows = DailyCampaignMetrics.objects.filter(campaign__account=self.account, day__lt=date(2017, 2, 1)).count()
+        self.assertEqual(CampaignMetricsRollup.objects.compact(self.account, date(2017, 2, 1)), campaign_rows)
+
+        # Whole months before compaction are answered from the rollups
+        after = self.account.metrics.all().summary_for_period(start, finish, ['cost', 'clicks', 'ctr', 'avg_cpc'])
+        for value, expected in zip(after, before):
+            self.assertAlmostEqual(value, expected, places=6)
+        self.assertEqual(self.account.spend(start, finish), spend)
+        self.assertEqual(Account.objects.filter(pk=self.account.pk).spend_for_period(start, finish)[0].spend, spend)
+        self.assertTrue(self.account.is_synced(start, finish))
+
+        # Days that aren't tiled by the rollups aren't
+        self.assertFalse(self.account.is_synced(date(2017, 1, 5), finish))
+        with self.assertRaises(AdWordsDataInconsistencyError):
+            self.account.spend(date(2017, 1, 5), finish)
+
+        # Rebuilding keeps the compacted periods
+        AccountMetricsRollup.objects.rebuild(self.account)
+        self.assertEqual(self.account.spend(start, finish), spend)
+
+        with self.assertRaises(ValueError):
+            AccountMetricsRollup.objects.compact(self.account, date(2017, 3, 2))
+
+
+@override_settings(GOOGLEADWORDS_METRICS_ROLLUPS=True)
+class CompactedWeekTestCase(TestCase):
+    fixtures = [
+        'django_google_adwords.yaml'
+    ]
+
+    def test_week_spanning_compaction(self):
+        account = Account.objects.get(pk=1)
+        account.sync_account(report_file=_get_report_file('account_report.gz'))
+        account.finish_account_sync()
+        account = Account.objects.get(pk=1)
+        AccountMetricsRollup.objects.compact(account, date(2014, 8, 1))
+
+        # A change to Mon 2014-07-28 to Sun 2014-08-03 after compaction doesn't refresh its week
+        DailyAccountMetrics.objects.filter(account=account, day=date(2014, 8, 2)).update(clicks=F('clicks') + 100)
+        AccountMetricsRollup.objects.refresh(account, [date(2014, 8, 2)])
+
+        start, finish = date(2014, 7, 28), date(2014, 8, 3)
+        clicks = DailyAccountMetrics.objects.filter(account=account).within_period(start, finish) \
+            .aggregate(Sum('clicks'))['clicks__sum']
+        self.assertEqual(account.metrics.all().aggregate_for_period(start, finish, Sum('clicks'))['clicks__sum'], clicks)
+        self.assertFalse(account.is_synced(start, finish))
+        self.assertTrue(account.is_synced(date(2014, 8, 1), finish))
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+from io import BytesIO
+import os
+import shutil
+import tempfile
+
+from django.test.testcases import TransactionTestCase
+from django.test.utils import override_settings
+from django_google_adwords import storage
+from django_google_adwords.models import ReportFile
+from django_google_adwords.storage import ReportFileCache
+import mock
+
+
+def _get_report_file(name):
+    report_file = ReportFile.objects.create()  #: :type report_file: ReportFile
+    report_file.save_path(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media', name))
+    return report_file
+
+
+class ReportFileCacheTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_dehydrate_reads_through_cache(self):
+        report_file = _get_report_file('account_report.gz')
+
+        with override_settings(GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT=self.root):
+            rows = list(report_file.dehydrate())
+            self.assertEqual(len(rows), 30)
+            self.assertTrue(os.path.exists(ReportFileCache(self.root, 0).path(report_file.file.name)))
+
+            # A second read is served from the cache
+            self.assertEqual(list(report_file.dehydrate()), rows)
+
+    def test_evicts_least_recently_used(self):
+        cache = ReportFileCache(self.root, max_size=10)
+        cache.put('a.gz', BytesIO(b'12345678'))
+        os.utime(cache.path('a.gz'), (0, 0))
+        cache.put('b.gz', BytesIO(b'12345678'))
+
+        self.assertFalse(os.path.exists(cache.path('a.gz')))
+        self.assertTrue(os.path.exists(cache.path('b.gz')))
+
+    def test_keeps_entry_stored(self):
+        cache = ReportFileCache(self.root, max_size=4)
+        cache.put('a.gz', BytesIO(b'12345678'))
+        self.assertTrue(os.path.exists(cache.path('a.gz')))
+
+        cache.put('b.gz', BytesIO(b'12345678'))
+        self.assertFalse(os.path.exists(cache.path('a.gz')))
+        self.assertTrue(os.path.exists(cache.path('b.gz')))
+
+    def test_open_stream_evicted(self):
+        report_file = _get_report_file('account_report.gz')
+        # The entry is removed by another process between get and open
+        with mock.patch.object(ReportFileCache, 'get', autospec=True,
+                               side_effect=lambda cache, field_file: cache.path('evicted.gz')), \
+                override_settings(GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT=self.root):
+            self.assertEqual(len(list(report_file.dehydrate())), 30)
+
+    def test_running_size(self):
+        cache = ReportFileCache(self.root, max_size=20)
+        with mock.patch.object(storage.os, 'walk', wraps=os.walk) as walk:
+            cache.put('a.gz', BytesIO(b'12345678'))
+            self.assertEqual((cache.size, walk.call_count), (8, 1))
+
+            # Within max_size the cache directory isn't scanned again
+            cache.put('b.gz', BytesIO(b'12345678'))
+            self.assertEqual((cache.size, walk.call_count), (16, 1))
+
+            # Over it the least recently used entry is evicted
+            os.utime(cache.path('a.gz'), (0, 0))
+            cache.put('c.gz', BytesIO(b'12345678'))
+            self.assertEqual((cache.size, walk.call_count), (16, 2))
+        self.assertFalse(os.path.exists(cache.path('a.gz')))
+
+    def test_get_report_file_cache(self):
+        with override_settings(GOOGLEADWORDS_REPORT_FILE_CACHE_ROOT=self.root):
+            self.assertIs(storage.get_report_file_cache(), storage.get_report_file_cache())
+        self.assertIsNone(storage.get_report_file_cache())
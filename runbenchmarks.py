@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Run the import benchmarks, options are passed to the gadapi_benchmark management command.
+
+Benchmarks run against SQLite unless BENCHMARK_DATABASE_ENGINE is set, ie..
+
+    BENCHMARK_DATABASE_ENGINE=django.db.backends.postgresql_psycopg2 \\
+    BENCHMARK_DATABASE_NAME=django_google_adwords ./runbenchmarks.py --levels=ad --output=results.json
+"""
+import sys
+
+from django.conf import settings
+from django.core.management import execute_from_command_line
+import os
+import shutil
+import tempfile
+
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='dga-benchmarks-')
+
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django_google_adwords',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': os.environ.get('BENCHMARK_DATABASE_ENGINE', 'django.db.backends.sqlite3'),
+                'NAME': os.environ.get('BENCHMARK_DATABASE_NAME', ':memory:'),
+                'USER': os.environ.get('BENCHMARK_DATABASE_USER', ''),
+                'PASSWORD': os.environ.get('BENCHMARK_DATABASE_PASSWORD', ''),
+                'HOST': os.environ.get('BENCHMARK_DATABASE_HOST', ''),
+                'PORT': os.environ.get('BENCHMARK_DATABASE_PORT', ''),
+            }
+        },
+        LOGGING={
+            'version': 1,
+            'disable_existing_loggers': False,
+            'loggers': {
+                'django_google_adwords': {
+                    'propagate': False,
+                    'level': 'WARNING',
+                },
+            }
+        },
+        MEDIA_ROOT=MEDIA_ROOT,
+        GOOGLEADWORDS_REPORT_FILE_ROOT='dga-benchmark-reports',
+        MIDDLEWARE_CLASSES={},
+    )
+
+
+def runbenchmarks():
+    argv = sys.argv[:1] + ['gadapi_benchmark', '--noinput'] + sys.argv[1:]
+    try:
+        execute_from_command_line(argv)
+    finally:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    runbenchmarks()
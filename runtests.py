@@ -42,6 +42,8 @@ if not settings.configured:
         },
         MEDIA_ROOT=os.path.abspath(os.path.join(os.path.dirname(__file__), 'django_google_adwords', 'tests', 'media')),
         GOOGLEADWORDS_REPORT_FILE_ROOT='dga-test-reports',
+        # The MicrosMoneyField tests run with GOOGLEADWORDS_MONEY_MICROS=1 runtests.py
+        GOOGLEADWORDS_MONEY_MICROS=bool(os.environ.get('GOOGLEADWORDS_MONEY_MICROS')),
         MIDDLEWARE_CLASSES={},
         TEST_RUNNER='django_nose.NoseTestSuiteRunner',
         NOSE_ARGS=['--logging-clear-handlers',